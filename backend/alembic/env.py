@@ -22,6 +22,10 @@ from app.models.industrial_settings import IndustrialSettings
 from app.models.roi_scenario import RoiScenario
 from app.models.residential import ResidentialProfile, ResidentialAsset, ConsumptionReading
 from app.models.gamification import GamificationProfile, Mission, UserMission
+from app.models.ai_insight import AIInsightSnapshot
+from app.models.chat import ChatConversation, ChatMessage
+from app.models.llm_usage import LLMUsageEvent
+from app.models.plant_summary import PlantSummary
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,39 @@
+"""add_ai_insight_snapshots
+
+Revision ID: a3c9e1f27b40
+Revises: 985051fe5578
+Create Date: 2026-10-19 09:12:44.120391
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c9e1f27b40'
+down_revision = '985051fe5578'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ai_insight_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('profile_type', sa.String(length=20), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('context_hash', sa.String(length=64), nullable=False),
+    sa.Column('source', sa.String(length=20), nullable=True),
+    sa.Column('generated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'profile_type', name='uq_ai_insight_user_profile')
+    )
+    op.create_index(op.f('ix_ai_insight_snapshots_id'), 'ai_insight_snapshots', ['id'], unique=False)
+    op.create_index(op.f('ix_ai_insight_snapshots_user_id'), 'ai_insight_snapshots', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_ai_insight_snapshots_user_id'), table_name='ai_insight_snapshots')
+    op.drop_index(op.f('ix_ai_insight_snapshots_id'), table_name='ai_insight_snapshots')
+    op.drop_table('ai_insight_snapshots')
@@ -0,0 +1,53 @@
+"""add_chat_memory_tables
+
+Revision ID: b7d2f4a91c63
+Revises: a3c9e1f27b40
+Create Date: 2026-10-19 10:03:18.554021
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2f4a91c63'
+down_revision = 'a3c9e1f27b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('chat_conversations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('profile_type', sa.String(length=20), nullable=False),
+    sa.Column('summary', sa.Text(), nullable=True),
+    sa.Column('summarized_until_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'profile_type', name='uq_chat_conversation_user_profile')
+    )
+    op.create_index(op.f('ix_chat_conversations_id'), 'chat_conversations', ['id'], unique=False)
+    op.create_index(op.f('ix_chat_conversations_user_id'), 'chat_conversations', ['user_id'], unique=False)
+    op.create_table('chat_messages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('conversation_id', sa.Integer(), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['conversation_id'], ['chat_conversations.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_chat_messages_id'), 'chat_messages', ['id'], unique=False)
+    op.create_index('ix_chat_messages_conversation_id_id', 'chat_messages', ['conversation_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_chat_messages_conversation_id_id', table_name='chat_messages')
+    op.drop_index(op.f('ix_chat_messages_id'), table_name='chat_messages')
+    op.drop_table('chat_messages')
+    op.drop_index(op.f('ix_chat_conversations_user_id'), table_name='chat_conversations')
+    op.drop_index(op.f('ix_chat_conversations_id'), table_name='chat_conversations')
+    op.drop_table('chat_conversations')
@@ -0,0 +1,43 @@
+"""add_llm_usage_events
+
+Revision ID: c4e8a2d1f9b5
+Revises: b7d2f4a91c63
+Create Date: 2026-10-19 17:12:40.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a2d1f9b5'
+down_revision = 'b7d2f4a91c63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('llm_usage_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('endpoint', sa.String(length=40), nullable=False),
+    sa.Column('model', sa.String(length=80), nullable=True),
+    sa.Column('outcome', sa.String(length=20), nullable=False),
+    sa.Column('prompt_chars', sa.Integer(), nullable=True),
+    sa.Column('response_chars', sa.Integer(), nullable=True),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+    sa.Column('response_tokens', sa.Integer(), nullable=True),
+    sa.Column('latency_ms', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_llm_usage_events_id'), 'llm_usage_events', ['id'], unique=False)
+    op.create_index('ix_llm_usage_events_user_id_created_at', 'llm_usage_events', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_llm_usage_events_created_at', 'llm_usage_events', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_llm_usage_events_created_at', table_name='llm_usage_events')
+    op.drop_index('ix_llm_usage_events_user_id_created_at', table_name='llm_usage_events')
+    op.drop_index(op.f('ix_llm_usage_events_id'), table_name='llm_usage_events')
+    op.drop_table('llm_usage_events')
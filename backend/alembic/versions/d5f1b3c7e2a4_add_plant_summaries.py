@@ -0,0 +1,70 @@
+"""add_plant_summaries
+
+Revision ID: d5f1b3c7e2a4
+Revises: c4e8a2d1f9b5
+Create Date: 2026-10-19 21:03:17.402215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# Física por activo de IndustrialService.consumption_columns, congelada en SQL para que la
+# migración no dependa del código de la aplicación
+ASSET_PHYSICS = """
+    SELECT user_id,
+           COALESCE(NULLIF(location, ''), 'General') AS zone,
+           real_kw,
+           monthly_kwh,
+           monthly_kwh * (1.0 - COALESCE(NULLIF(efficiency_percentage, 0), 85.0) / 100.0)
+               + CASE WHEN pf < 0.90 THEN monthly_kwh * (0.90 - pf) * 0.1 ELSE 0.0 END AS waste_kwh,
+           COALESCE(efficiency_percentage, 85.0) * monthly_kwh AS weighted_eff
+    FROM (
+        SELECT user_id, location, efficiency_percentage, real_kw,
+               real_kw * COALESCE(daily_usage_hours, 0.0) * COALESCE(NULLIF(op_days_per_month, 0), 22) AS monthly_kwh,
+               COALESCE(NULLIF(power_factor, 0), 0.85) AS pf
+        FROM (
+            SELECT *, COALESCE(nominal_power_kw, 0.0) * COALESCE(NULLIF(load_factor, 0), 0.75) AS real_kw
+            FROM industrial_assets
+        ) AS with_kw
+    ) AS physics
+"""
+BACKFILL = """
+    INSERT INTO plant_summaries (user_id, zone, asset_count, real_kw, monthly_kwh, waste_kwh, weighted_eff_sum)
+    SELECT user_id, {zone}, COUNT(*), SUM(real_kw), SUM(monthly_kwh), SUM(waste_kwh), SUM(weighted_eff)
+    FROM ({physics}) AS assets
+    GROUP BY {group_by}
+"""
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f1b3c7e2a4'
+down_revision = 'c4e8a2d1f9b5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('plant_summaries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('zone', sa.String(length=100), nullable=False),
+    sa.Column('asset_count', sa.Integer(), nullable=False),
+    sa.Column('real_kw', sa.Float(), nullable=False),
+    sa.Column('monthly_kwh', sa.Float(), nullable=False),
+    sa.Column('waste_kwh', sa.Float(), nullable=False),
+    sa.Column('weighted_eff_sum', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'zone', name='uq_plant_summaries_user_zone')
+    )
+    op.create_index(op.f('ix_plant_summaries_id'), 'plant_summaries', ['id'], unique=False)
+    # Proyección de los activos existentes: una fila por zona y una con el total de la planta
+    op.execute(sa.text(BACKFILL.format(zone="zone", physics=ASSET_PHYSICS, group_by="user_id, zone")))
+    op.execute(sa.text(BACKFILL.format(zone="''", physics=ASSET_PHYSICS, group_by="user_id")))
+
+
+def downgrade():
+    op.drop_index(op.f('ix_plant_summaries_id'), table_name='plant_summaries')
+    op.drop_table('plant_summaries')
@@ -1,14 +1,21 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.db.session import get_async_session
 from app.models.industrial_asset import IndustrialAsset as AssetModel
 from app.models.user import User
 from app.api.deps import get_current_active_user
-from app.schemas.industrial_asset import IndustrialAssetCreate, IndustrialAssetRead, IndustrialAssetBatchCreate, IndustrialDashboardInsights
+from app.core.sse import SSE_HEADERS, sse_event
+from app.schemas.industrial_asset import IndustrialAssetCreate, IndustrialAssetRead, IndustrialAssetBatchCreate, IndustrialAssetImportReport, IndustrialAssetPage, IndustrialDashboardInsights
+from app.services.asset_import import AssetImportError, asset_importer
+from app.services.asset_listing import AssetListingError, asset_listing
 from app.services.industrial import industrial_service
 from app.services.gemini_service import gemini_service
+from app.services.chat_memory import chat_memory
+from app.services.prompt_builder import plant_prompt_builder
+from app.services.zone_analysis import zone_analysis
 from app.models.roi_scenario import RoiScenario as RoiModel
 from app.schemas.roi_scenario import RoiScenarioCreate, RoiScenario as RoiRead
 from app.models.industrial_settings import IndustrialSettings as SettingsModel
@@ -22,20 +29,26 @@ async def create_assets_batch(
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_async_session)
 ) -> List[IndustrialAssetRead]:
-    """Crea múltiples activos industriales a la vez"""
-    new_assets = []
-    for asset_in in assets_in.assets:
-        asset_data = asset_in.model_dump()
-        asset_data["user_id"] = current_user.id
-        asset = AssetModel(**asset_data)
-        db.add(asset)
-        new_assets.append(asset)
-    
+    """Crea múltiples activos industriales a la vez (un INSERT multi-fila con RETURNING)"""
+    new_assets = await asset_importer.insert_assets(db, current_user.id, assets_in.assets)
     await db.commit()
-    for asset in new_assets:
-        await db.refresh(asset)
+    zone_analysis.invalidate(current_user.id)
     return new_assets
 
+@router.post("/assets/import", response_model=IndustrialAssetImportReport)
+async def import_assets(
+    file: UploadFile = File(..., description="Inventario en CSV o Excel (.xlsx), una fila por activo"),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_session)
+) -> IndustrialAssetImportReport:
+    """Importa el inventario de activos por chunks; las filas inválidas se reportan sin detener la carga"""
+    try:
+        report = await asset_importer.import_file(db, current_user.id, file.file, file.filename, file.content_type)
+    except AssetImportError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    zone_analysis.invalidate(current_user.id)
+    return report
+
 @router.post("/assets", response_model=IndustrialAssetRead, status_code=status.HTTP_201_CREATED)
 async def create_asset(
     asset_in: IndustrialAssetCreate, 
@@ -48,6 +61,7 @@ async def create_asset(
     asset = AssetModel(**asset_data)
     db.add(asset)
     await db.commit()
+    zone_analysis.invalidate(current_user.id)
     await db.refresh(asset)
     return asset
 
@@ -60,6 +74,29 @@ async def list_assets(
     result = await db.execute(select(AssetModel).where(AssetModel.user_id == current_user.id))
     return result.scalars().all()
 
+@router.get("/assets/page", response_model=IndustrialAssetPage)
+async def list_assets_page(
+    fields: Optional[str] = Query(None, description="Campos separados por coma, p. ej. name,location,waste_kwh"),
+    sort: Literal["location", "waste"] = "location",
+    asset_type: Optional[str] = None,
+    location: Optional[str] = None,
+    min_efficiency: Optional[float] = Query(None, ge=0, le=100),
+    max_efficiency: Optional[float] = Query(None, ge=0, le=100),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_session)
+) -> IndustrialAssetPage:
+    """Activos de la planta por páginas (keyset), con filtros y solo los campos pedidos"""
+    try:
+        return await asset_listing.page(
+            db, current_user.id, fields=fields, sort=sort, cursor=cursor, limit=limit,
+            asset_type=asset_type, location=location,
+            min_efficiency=min_efficiency, max_efficiency=max_efficiency,
+        )
+    except AssetListingError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
 @router.delete("/assets/{asset_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_asset(
     asset_id: int,
@@ -75,6 +112,7 @@ async def delete_asset(
     
     await db.delete(asset)
     await db.commit()
+    zone_analysis.invalidate(current_user.id)
     return None
 
 @router.get("/dashboard-insights", response_model=IndustrialDashboardInsights)
@@ -85,6 +123,25 @@ async def get_dashboard_insights(
     """Calcula métricas de la planta solicitando interpretación a la IA"""
     return await industrial_service.get_dashboard_insights(db, current_user.id)
 
+@router.get("/dashboard-insights/stream")
+async def stream_dashboard_insights(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Métricas de la planta al instante y campos de IA cuando estén listos (Server-Sent Events)"""
+    events = await industrial_service.open_dashboard_stream(db, current_user.id)
+
+    async def event_stream():
+        async for event, data in events:
+            yield sse_event(event, data)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+async def _plant_chat_context(db: AsyncSession, user_id: int) -> dict:
+    """Contexto agregado de la planta para el chat, acotado al presupuesto de tokens."""
+    result = await db.execute(select(AssetModel).where(AssetModel.user_id == user_id))
+    return plant_prompt_builder.build_plant_context(result.scalars().all())
+
 @router.post("/assistant/chat")
 async def chat_with_assistant(
     message: str,
@@ -92,63 +149,61 @@ async def chat_with_assistant(
     db: AsyncSession = Depends(get_async_session)
 ):
     """Conversación directa con el experto de la planta (Gemini)"""
-    from app.services.gemini_service import gemini_service
-    
-    # Obtener activos para contexto
-    result = await db.execute(select(AssetModel).where(AssetModel.user_id == current_user.id))
-    assets = result.scalars().all()
+    plant_context = await _plant_chat_context(db, current_user.id)
+    history = await chat_memory.load_history(db, current_user.id, "industrial")
     
-    plant_context = {
-        "assets": [
-            {
-                "name": a.name, 
-                "type": a.asset_type, 
-                "power_kw": a.nominal_power_kw, 
-                "efficiency": a.efficiency_percentage
-            } for a in assets
-        ]
-    }
-    
-    return await gemini_service.get_chat_response(
+    # Consultar el motor centralizado de IA
+    reply = await gemini_service.get_chat_response(
         message=message,
         context=plant_context,
-        profile_type="industrial"
+        profile_type="industrial",
+        history=history,
+        user_id=current_user.id
     )
+    answer = reply.get("response", "")
+    if answer and not gemini_service.is_fallback_reply(answer):
+        await chat_memory.record_exchange(db, current_user.id, "industrial", message, answer)
+    return reply
+
+@router.post("/assistant/chat/stream")
+async def stream_chat_with_assistant(
+    message: str,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Chat con el experto de la planta transmitido token a token como Server-Sent Events"""
+    plant_context = await _plant_chat_context(db, current_user.id)
+    history = await chat_memory.load_history(db, current_user.id, "industrial")
+    user_id = current_user.id
+
+    async def event_stream():
+        async for event, data in gemini_service.stream_chat_response(
+            message, plant_context, "industrial", history, user_id=user_id
+        ):
+            if event == "done" and data and not gemini_service.is_fallback_reply(data):
+                # La sesión del request ya se cerró: el turno se guarda con una propia
+                await chat_memory.persist_exchange(user_id, "industrial", message, data)
+            payload = {"delta": data} if event == "token" else {"response": data}
+            yield sse_event(event, payload)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.delete("/assistant/conversation", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_assistant_conversation(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Olvida el historial del chat con el experto del planta"""
+    await chat_memory.clear(db, current_user.id, "industrial")
+    return None
 
 @router.get("/consumption-analysis")
 async def get_consumption_analysis(
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_async_session)
 ):
-    """Análisis avanzado por zonas usando IndustrialService"""
-    result = await db.execute(select(AssetModel).where(AssetModel.user_id == current_user.id))
-    assets = result.scalars().all()
-    
-    if not assets: return []
-    
-    analysis = {}
-    for asset in assets:
-        loc = asset.location or "General"
-        if loc not in analysis:
-            analysis[loc] = {"name": loc, "consumption": 0, "machines": 0, "weighted_eff_sum": 0}
-        
-        stats = industrial_service.calculate_asset_consumption(asset)
-        analysis[loc]["consumption"] += stats["monthly_kwh"]
-        analysis[loc]["machines"] += 1
-        analysis[loc]["weighted_eff_sum"] += (asset.efficiency_percentage * stats["monthly_kwh"])
-        
-    final_zones = []
-    for loc, data in analysis.items():
-        avg_eff = data["weighted_eff_sum"] / data["consumption"] if data["consumption"] > 0 else 85
-        final_zones.append({
-            "name": loc,
-            "consumption": round(data["consumption"]),
-            "machines": data["machines"],
-            "status": "optimal" if avg_eff > 85 else "warning" if avg_eff > 75 else "critical",
-            "efficiency": round(avg_eff, 1),
-            "change": round((100 - avg_eff) / 2, 1)
-        })
-    return final_zones
+    """Análisis avanzado por zonas: filas de plant_summaries, cacheadas hasta que cambien los activos"""
+    return await zone_analysis.get_user_zones(db, current_user.id)
 
 
 # === NUEVO ENDPOINT: Predicción Industrial con ONNX ===
@@ -1,17 +1,24 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 from app.db.session import get_async_session
 from app.models.residential import ResidentialProfile as ProfileModel, ResidentialAsset as AssetModel, ConsumptionReading as ReadingModel
 from app.models.user import User
 from app.api.deps import get_current_active_user
+from app.core.sse import SSE_HEADERS, sse_event
 from app.schemas.residential import (
     ResidentialProfile, ResidentialProfileCreate,
     ResidentialAsset, ResidentialAssetCreate,
-    ConsumptionReading, ConsumptionReadingCreate
+    ConsumptionReading, ConsumptionReadingCreate,
+    StandbyEstimate, PeerComparison
 )
 from app.services.residential import residential_service
+from app.services.gemini_service import gemini_service
+from app.services.chat_memory import chat_memory
+from app.services.standby import standby_model
+from app.services.peer_stats import peer_stats
 
 router = APIRouter(tags=["Residential Efficiency"])
 
@@ -44,6 +51,7 @@ async def update_profile(
         db.add(profile)
     
     await db.commit()
+    await peer_stats.refresh_user(db, current_user.id)
     await db.refresh(profile)
     return profile
 
@@ -98,6 +106,7 @@ async def add_assets(
         new_assets.append(asset)
     
     await db.commit()
+    standby_model.invalidate(current_user.id)
     for asset in new_assets: await db.refresh(asset)
     return new_assets
 
@@ -113,6 +122,7 @@ async def delete_all_assets(
     """Elimina TODOS los electrodomésticos del usuario para reiniciar la calibración"""
     await db.execute(delete(AssetModel).where(AssetModel.user_id == current_user.id))
     await db.commit()
+    standby_model.invalidate(current_user.id)
     return None
 
 @router.delete("/assets/{asset_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -127,6 +137,7 @@ async def delete_asset(
     if not asset: raise HTTPException(status_code=404, detail="No encontrado")
     await db.delete(asset)
     await db.commit()
+    standby_model.invalidate(current_user.id)
     return None
 
 @router.patch("/assets/{asset_id}", response_model=ResidentialAsset)
@@ -154,9 +165,25 @@ async def update_asset(
     asset.monthly_cost_estimate = residential_service.calculate_appliance_cost(asset.power_watts, asset.daily_hours, kwh_price)
     
     await db.commit()
+    standby_model.invalidate(current_user.id)
     await db.refresh(asset)
     return asset
 
+@router.get("/standby", response_model=StandbyEstimate)
+async def get_standby_estimate(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Consumo y costo mensual en standby (vampiro) del hogar, cacheado hasta que cambien sus equipos"""
+    standby_kwh = await standby_model.get_user_kwh(db, current_user.id)
+    stratum = await db.scalar(select(ProfileModel.stratum).where(ProfileModel.user_id == current_user.id))
+    kwh_price = residential_service.get_kwh_price(stratum if stratum is not None else 3)
+    return {
+        "standby_kwh_monthly": round(standby_kwh, 2),
+        "standby_cost_monthly": round(standby_kwh * kwh_price),
+        "kwh_price": kwh_price,
+    }
+
 
 
 # --- CONSUMPTION ENDPOINTS ---
@@ -166,11 +193,12 @@ async def get_consumption_history(
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_async_session)
 ):
-    """Historial de lecturas de consumo ordenado cronológicamente"""
+    """Historial de lecturas de consumo ordenado cronológicamente, valorado con la tarifa de cada fecha"""
     result = await db.execute(
         select(ReadingModel).where(ReadingModel.user_id == current_user.id).order_by(ReadingModel.date.desc())
     )
-    return result.scalars().all()
+    stratum = await db.scalar(select(ProfileModel.stratum).where(ProfileModel.user_id == current_user.id))
+    return residential_service.bill_readings(result.scalars().all(), stratum)
 
 @router.post("/consumption", response_model=ConsumptionReading)
 async def add_consumption_reading(
@@ -182,40 +210,94 @@ async def add_consumption_reading(
     reading = ReadingModel(**reading_in.model_dump(), user_id=current_user.id)
     db.add(reading)
     await db.commit()
+    await peer_stats.refresh_user(db, current_user.id)
     await db.refresh(reading)
     return reading
 
-# --- ASSISTANT ---
-
-@router.post("/assistant/chat")
-async def chat_with_assistant(
-    message: str,
+@router.get("/consumption/peers", response_model=Optional[PeerComparison])
+async def get_peer_comparison(
     current_user: User = Depends(get_current_active_user),
     db: AsyncSession = Depends(get_async_session)
 ):
-    """Conversación directa con el experto del hogar (Gemini)"""
-    from app.services.gemini_service import gemini_service
-    
-    # Eager load para evitar múltiples queries (Senior Pattern)
-    result_profile = await db.execute(select(ProfileModel).where(ProfileModel.user_id == current_user.id))
+    """Percentiles de consumo del hogar frente a hogares de su estrato y ciudad (null sin pares suficientes)"""
+    member = peer_stats.member(current_user.id)
+    profile = await db.scalar(select(ProfileModel).where(ProfileModel.user_id == current_user.id))
+    if member is None or profile is None:
+        return None
+    comparison = peer_stats.compare(profile.stratum, profile.city, member[0], profile.occupants)
+    return {**comparison, "kwh_monthly": round(member[0], 1)} if comparison else None
+
+# --- ASSISTANT ---
+
+async def _home_chat_context(db: AsyncSession, user_id: int) -> dict:
+    """Contexto del hogar que se inyecta en el chat (perfil + electrodomésticos)."""
+    result_profile = await db.execute(select(ProfileModel).where(ProfileModel.user_id == user_id))
     profile = result_profile.scalar_one_or_none()
     
-    result_assets = await db.execute(select(AssetModel).where(AssetModel.user_id == current_user.id))
+    result_assets = await db.execute(select(AssetModel).where(AssetModel.user_id == user_id))
     assets = result_assets.scalars().all()
     
-    home_context = {
+    return {
         "stratum": profile.stratum if profile else 3,
         "housing": profile.house_type if profile else "apartamento",
         "appliances": [f"{a.name} ({a.icon})" for a in assets],
         "city": profile.city if profile else "Colombia"
     }
+
+@router.post("/assistant/chat")
+async def chat_with_assistant(
+    message: str,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Conversación directa con el experto del hogar (Gemini)"""
+    home_context = await _home_chat_context(db, current_user.id)
+    history = await chat_memory.load_history(db, current_user.id, "residential")
     
-    # 2. Consultar el motor centralizado de IA
-    return await gemini_service.get_chat_response(
+    # Consultar el motor centralizado de IA
+    reply = await gemini_service.get_chat_response(
         message=message,
         context=home_context,
-        profile_type="residential"
+        profile_type="residential",
+        history=history,
+        user_id=current_user.id
     )
+    answer = reply.get("response", "")
+    if answer and not gemini_service.is_fallback_reply(answer):
+        await chat_memory.record_exchange(db, current_user.id, "residential", message, answer)
+    return reply
+
+@router.post("/assistant/chat/stream")
+async def stream_chat_with_assistant(
+    message: str,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Chat con el experto del hogar transmitido token a token como Server-Sent Events"""
+    home_context = await _home_chat_context(db, current_user.id)
+    history = await chat_memory.load_history(db, current_user.id, "residential")
+    user_id = current_user.id
+
+    async def event_stream():
+        async for event, data in gemini_service.stream_chat_response(
+            message, home_context, "residential", history, user_id=user_id
+        ):
+            if event == "done" and data and not gemini_service.is_fallback_reply(data):
+                # La sesión del request ya se cerró: el turno se guarda con una propia
+                await chat_memory.persist_exchange(user_id, "residential", message, data)
+            payload = {"delta": data} if event == "token" else {"response": data}
+            yield sse_event(event, payload)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.delete("/assistant/conversation", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_assistant_conversation(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Olvida el historial del chat con el experto del hogar"""
+    await chat_memory.clear(db, current_user.id, "residential")
+    return None
 
 # --- DASHBOARD INSIGHTS ---
 
@@ -226,3 +308,17 @@ async def get_residential_insights(
 ):
     """Métricas y consejos de IA para el hogar usando ResidentialService (Truth Engine)"""
     return await residential_service.get_dashboard_insights(db, current_user.id)
+
+@router.get("/dashboard-insights/stream")
+async def stream_dashboard_insights(
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """Métricas del hogar al instante y consejos de IA cuando estén listos (Server-Sent Events)"""
+    events = await residential_service.open_dashboard_stream(db, current_user.id)
+
+    async def event_stream():
+        async for event, data in events:
+            yield sse_event(event, data)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,33 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_current_active_user
+from app.core.config import get_settings
+from app.db.session import get_async_session
+from app.models.user import User
+from app.schemas.usage import UsageReport
+from app.services.usage_ledger import usage_ledger
+
+router = APIRouter()
+
+@router.get("/report", response_model=UsageReport)
+async def get_usage_report(
+    days: int = Query(1, ge=1, le=90),
+    user_id: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_session)
+):
+    """
+    Uso del LLM agregado por usuario y endpoint (llamadas, tokens, latencia, fallbacks).
+    Los administradores (LLM_USAGE_ADMIN_USERNAMES) ven todos los usuarios; el resto solo el suyo.
+    """
+    is_admin = current_user.username in get_settings().llm_usage_admin_usernames
+    if not is_admin:
+        if user_id is not None and user_id != current_user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo puedes consultar tu propio uso")
+        user_id = current_user.id
+
+    rows = await usage_ledger.report(db, days=days, user_id=user_id)
+    return {"days": days, "scope": "all" if is_admin and user_id is None else "self", "rows": rows}
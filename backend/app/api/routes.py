@@ -10,6 +10,7 @@ from app.api.endpoints import (
     settings, 
     residential, 
     gamification,
+    usage,
     prediction # <-- NUEVO: Importamos el archivo de la IA
 )
 
@@ -22,6 +23,7 @@ api_router.include_router(industrial.router, prefix="/industrial", tags=["indust
 api_router.include_router(residential.router, prefix="/residential", tags=["residential"])
 api_router.include_router(gamification.router, prefix="/gamification", tags=["gamification"])
 api_router.include_router(settings.router, prefix="/settings", tags=["settings"])
+api_router.include_router(usage.router, prefix="/usage", tags=["usage"])
 
 # 2. Registramos la ruta de la IA
 # El prefijo "/ia" significa que tus URLs serán: /api/v1/ia/predict
@@ -0,0 +1,146 @@
+"""Circuit breaker for calls to slow or failing external services."""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open."""
+
+
+class CircuitBreaker:
+    """Rolling-window circuit breaker tracking error rate and latency.
+
+    - CLOSED: calls pass through; the outcome of the last ``window_size`` calls is kept.
+      Calls slower than ``slow_call_seconds`` count as failures.
+    - OPEN: once ``min_calls`` are recorded and the failure rate reaches
+      ``failure_rate_threshold`` every call is rejected immediately with
+      ``CircuitOpenError`` for ``open_seconds``.
+    - HALF_OPEN: after that pause a single probe call is let through; success closes
+      the circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        *,
+        name: str = "circuit",
+        window_size: int = 20,
+        min_calls: int = 5,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: Optional[float] = None,
+        open_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self._clock = clock
+
+        self._state = self.CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window_size)  # True = fallo
+        self._latencies: Deque[float] = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a call may proceed now (reserving the probe when half-open)."""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def release(self) -> None:
+        """Give back a reserved probe without recording an outcome (e.g. caller cancelled)."""
+        # La cancelación del llamador no dice nada de la salud del servicio
+        self._probe_in_flight = False
+
+    def record_success(self, latency: float) -> None:
+        if self.slow_call_seconds is not None and latency > self.slow_call_seconds:
+            self.record_failure(latency)
+            return
+        self._latencies.append(latency)
+        if self._state == self.HALF_OPEN:
+            self._close()
+            return
+        self._outcomes.append(False)
+
+    def record_failure(self, latency: float = 0.0) -> None:
+        self._latencies.append(latency)
+        if self._state == self.HALF_OPEN:
+            self._open()
+            return
+        self._outcomes.append(True)
+        if len(self._outcomes) >= self.min_calls and self.failure_rate >= self.failure_rate_threshold:
+            self._open()
+
+    @property
+    def failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(self._outcomes) / len(self._outcomes)
+
+    async def call(self, work: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Run ``work`` under the breaker, optionally bounded by ``timeout`` seconds."""
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+        start = self._clock()
+        try:
+            if timeout is None:
+                result = await work()
+            else:
+                result = await asyncio.wait_for(work(), timeout=timeout)
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        except Exception:
+            self.record_failure(self._clock() - start)
+            raise
+        self.record_success(self._clock() - start)
+        return result
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self._probe_in_flight = False
+        self.times_opened += 1
+
+    def _close(self) -> None:
+        self._state = self.CLOSED
+        self._outcomes.clear()
+        self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+        return {
+            "state": self.state,
+            "failure_rate": round(self.failure_rate, 3),
+            "window_calls": len(self._outcomes),
+            "p50_latency_s": round(latencies[len(latencies) // 2], 3) if latencies else None,
+            "max_latency_s": round(latencies[-1], 3) if latencies else None,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+        }
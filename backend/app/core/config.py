@@ -30,6 +30,87 @@ class Settings(BaseSettings):
     # Gemini settings
     gemini_api_key: str | None = None
     gemini_model_name: str = "gemini-2.5-flash-lite" # Requested by user
+    # Endpoint alternativo de la API (p. ej. scripts/fake_gemini_server.py para pruebas de carga)
+    gemini_base_url: str | None = None
+    # Máximo que se espera a Gemini antes de contar la llamada como fallida
+    gemini_timeout_seconds: float = 12.0
+    # Salida estructurada: se declara el esquema JSON de cada respuesta al modelo.
+    # Si la respuesta no lo cumple se pide una reparación (0 = sin reintento)
+    gemini_structured_output: bool = True
+    gemini_reply_repair_attempts: int = 1
+    # Circuit breaker: ventana de llamadas, tasa de fallo que lo abre y pausa antes de sondear
+    gemini_breaker_window: int = 20
+    gemini_breaker_min_calls: int = 5
+    gemini_breaker_failure_rate: float = 0.5
+    gemini_breaker_slow_call_seconds: float = 8.0
+    gemini_breaker_open_seconds: float = 30.0
+    # Gobernador de llamadas salientes al LLM: concurrencia global, token bucket
+    # (llamadas/seg y ráfaga) y espera máxima en cola por clase antes del fallback
+    llm_max_concurrency: int = 8
+    llm_rate_per_second: float = 5.0
+    llm_rate_burst: int = 10
+    llm_max_wait_interactive_seconds: float = 8.0
+    llm_max_wait_dashboard_seconds: float = 3.0
+    llm_max_wait_background_seconds: float = 30.0
+    # Medición de uso del LLM: el ledger se escribe por lotes fuera del request.
+    # Cuotas diarias por usuario (0 = sin límite); al superarlas se sirven respuestas
+    # de caché o por reglas. Los admins ven el reporte de uso de todos los usuarios.
+    llm_usage_batch_size: int = 100
+    llm_usage_flush_seconds: float = 5.0
+    llm_daily_request_quota: int = 200
+    llm_daily_token_quota: int = 300_000
+    llm_usage_admin_usernames: List[str] | str = []
+    # Presupuesto de tokens del contexto de planta en el prompt y activos listados individualmente
+    llm_prompt_token_budget: int = 1500
+    llm_prompt_top_assets: int = 15
+
+    # Insights del dashboard (stale-while-revalidate): edad máxima antes de regenerar en
+    # segundo plano, y reintento más corto cuando el último insight vino del fallback por reglas
+    insight_freshness_seconds: int = 6 * 60 * 60
+    insight_fallback_retry_seconds: int = 60
+    # Job nocturno de insights (scripts/generate_insights.py): usuarios por página,
+    # llamadas simultáneas a Gemini y archivo de checkpoint para reanudar
+    insight_batch_chunk_size: int = 200
+    insight_batch_concurrency: int = 4
+    insight_batch_checkpoint_path: str = "logs/insight_batch.checkpoint.json"
+    # Facturación masiva de la cartera residencial: filas por chunk del cursor
+    billing_batch_chunk_size: int = 5000
+    # Importación de activos industriales (CSV/XLSX): filas validadas e insertadas por
+    # chunk y máximo de filas rechazadas que se detallan en el reporte
+    asset_import_chunk_size: int = 500
+    asset_import_max_errors: int = 200
+
+    # Caché semántica de respuestas del chat (preguntas autocontenidas): similitud coseno
+    # mínima para reutilizar una respuesta y tamaño máximo (LRU). Subir el umbral evita
+    # servir la respuesta de una pregunta distinta que comparte palabras (más llamadas a
+    # Gemini); bajarlo reutiliza más paráfrasis (más riesgo de respuestas ajenas)
+    chat_cache_enabled: bool = True
+    chat_cache_similarity_threshold: float = 0.5
+    chat_cache_max_entries: int = 2000
+
+    # Memoria del chat: turnos (pregunta + respuesta) que se conservan textuales y
+    # presupuesto total de tokens del historial (resumen rodante + turnos recientes)
+    chat_memory_recent_turns: int = 4
+    chat_memory_token_budget: int = 800
+    # Caché por hogar del consumo standby (vampiro); se invalida al cambiar sus equipos
+    standby_cache_max_entries: int = 10000
+    standby_cache_ttl_seconds: float = 600.0
+    # Caché por planta del análisis por zonas; se invalida al cambiar sus activos
+    zone_cache_max_entries: int = 10000
+    zone_cache_ttl_seconds: float = 600.0
+    # Tarifas versionadas por operador (fecha de vigencia y franja horaria opcional).
+    # Sin ruta se usa app/data/tariffs.json; sin operador, el default del archivo
+    tariff_schedule_path: str | None = None
+    tariff_operator: str | None = None
+    # Serie de factores de emisión de la red (mensual u horaria); sin ruta se usa
+    # app/data/emission_factors.json
+    emission_factors_path: str | None = None
+    # Estadísticas de pares (sketches de cuantiles de kWh por estrato y ciudad): error
+    # relativo de los cuantiles, hogares mínimos por grupo y recarga en segundo plano desde
+    # la base de datos (0 = solo la carga inicial)
+    peer_stats_relative_accuracy: float = 0.02
+    peer_stats_min_peers: int = 20
+    peer_stats_refresh_seconds: float = 3600.0
 
     # Support running from root or backend folder
     model_config = SettingsConfigDict(
@@ -38,10 +119,10 @@ class Settings(BaseSettings):
         extra="ignore"
     )
 
-    @field_validator("backend_cors_origins", mode="before")
+    @field_validator("backend_cors_origins", "llm_usage_admin_usernames", mode="before")
     @classmethod
     def split_origins(cls, value: List[str] | str) -> List[str]:
-        """Ensure CORS origins can be provided as a comma separated string."""
+        """Ensure list settings (CORS origins, admin usernames) can be provided as a comma separated string."""
         if isinstance(value, str):
             return [origin.strip() for origin in value.split(",") if origin]
         return value
@@ -0,0 +1,122 @@
+"""Grid emission factors (kg CO2e/kWh) by month and hour, with vectorized CO2 accounting."""
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from app.core.config import get_settings
+from app.core.energy_logic import EnergyCalculators
+from app.core.timeutils import as_datetime64
+
+DEFAULT_FACTORS_PATH = Path(__file__).resolve().parent.parent / "data" / "emission_factors.json"
+HOURS = 24
+
+
+class EmissionFactorError(ValueError):
+    """The emission factor file is inconsistent."""
+
+
+class EmissionFactors:
+    """Compiled grid emission-factor series.
+
+    The series is packed once into a dense ``factors[m, h]`` array (kg CO2e/kWh
+    for month row ``m`` and local hour ``h``), so the factor of any timestamp is
+    pure indexing:
+
+    * row 0 holds the default factor, used for months outside the series or
+      missing from it;
+    * row ``m >= 1`` is the ``m - 1``-th month after the first month of the series.
+
+    A month given as a single number has a flat factor over the day (monthly
+    resolution); a list of 24 numbers is an hourly profile for that month.
+    """
+
+    def __init__(self, spec: Dict[str, Any]) -> None:
+        series = spec.get("series", {})
+        self.source = spec.get("source")
+        self.default_factor = float(spec.get("default_factor", EnergyCalculators.CO2_FACTOR))
+        self.offset = np.timedelta64(int(round(spec.get("utc_offset_hours", 0) * 60)), "m")
+
+        months = np.array(sorted(series), dtype="datetime64[M]")
+        self.first_month = months[0] if len(months) else np.datetime64("1970-01", "M")
+        span = int((months[-1] - months[0]) // np.timedelta64(1, "M")) + 1 if len(months) else 0
+
+        self.factors = np.full((span + 1, HOURS), self.default_factor, dtype=np.float64)
+        for key, value in series.items():
+            row = int((np.datetime64(key, "M") - self.first_month) // np.timedelta64(1, "M")) + 1
+            profile = np.asarray(value, dtype=np.float64)
+            if profile.ndim == 1 and profile.shape != (HOURS,):
+                raise EmissionFactorError(f"{key}: an hourly profile needs {HOURS} values, got {profile.size}")
+            if profile.ndim > 1 or np.any(profile < 0):
+                raise EmissionFactorError(f"{key}: factors must be a number or a list of {HOURS} non-negative numbers")
+            self.factors[row] = profile
+        # Factor medio de cada mes (consumo repartido por igual entre las horas del día)
+        self.monthly_mean = self.factors.mean(axis=1)
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "EmissionFactors":
+        with open(path or DEFAULT_FACTORS_PATH, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _rows(self, local_months: np.ndarray) -> np.ndarray:
+        offset = ((local_months - self.first_month) // np.timedelta64(1, "M")).astype(np.int64) + 1
+        return np.where((offset >= 1) & (offset < len(self.factors)), offset, 0)
+
+    def _locate(self, timestamps: ArrayLike):
+        local = as_datetime64(timestamps) + self.offset
+        hours = ((local - local.astype("datetime64[D]")) // np.timedelta64(1, "h")).astype(np.intp)
+        return self._rows(local.astype("datetime64[M]")), hours
+
+    def factors_at(self, timestamps: ArrayLike) -> np.ndarray:
+        """kg CO2e/kWh of the grid at each timestamp."""
+        rows, hours = self._locate(timestamps)
+        return self.factors[rows, hours]
+
+    def mean_factor(self, when: datetime | date) -> float:
+        """Average factor of the month containing ``when`` (flat daily profile)."""
+        rows, _ = self._locate([when])
+        return float(self.monthly_mean[rows[0]])
+
+    @staticmethod
+    def _trees(co2: np.ndarray) -> np.ndarray:
+        return np.round(co2 / EnergyCalculators.TREE_COMPENSATION).astype(np.int64)
+
+    def impact(self, kwh: ArrayLike, timestamps: ArrayLike) -> Dict[str, Any]:
+        """CO2 of each reading with the factor in force when it was taken, plus totals."""
+        co2 = np.asarray(kwh, dtype=np.float64) * self.factors_at(timestamps)
+        total = float(co2.sum())
+        return {
+            "co2_kg": np.round(co2, 2),
+            "trees": self._trees(co2),
+            "total_co2_kg": round(total, 2),
+            "total_trees": int(round(total / EnergyCalculators.TREE_COMPENSATION)),
+        }
+
+    def profile_impact(self, hourly_kwh: ArrayLike, months: ArrayLike) -> Dict[str, np.ndarray]:
+        """Monthly CO2 of daily load profiles.
+
+        ``hourly_kwh`` has shape ``(..., 24)``: kWh consumed on a typical day at each
+        local hour. For every month in ``months`` the profile is weighted by that
+        month's hourly factors and scaled by its number of days, as a single
+        matrix product: the result ``co2_kg`` has shape ``(..., len(months))``.
+        """
+        hourly_kwh = np.asarray(hourly_kwh, dtype=np.float64)
+        if hourly_kwh.shape[-1:] != (HOURS,):
+            raise EmissionFactorError(f"load profiles need {HOURS} hourly values")
+        month_starts = as_datetime64(months).astype("datetime64[M]")
+        days = ((month_starts + 1).astype("datetime64[D]") - month_starts.astype("datetime64[D]")).astype(np.float64)
+        weights = self.factors[self._rows(month_starts)] * days[:, None]  # (meses, 24)
+        co2 = hourly_kwh @ weights.T
+        return {"co2_kg": np.round(co2, 2), "trees": self._trees(co2)}
+
+
+@lru_cache
+def get_emission_factors() -> EmissionFactors:
+    """Return the cached factor series for the configured file."""
+    return EmissionFactors.from_file(get_settings().emission_factors_path)
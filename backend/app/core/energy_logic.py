@@ -1,4 +1,7 @@
-from typing import Dict, List, Any, Protocol
+from typing import Dict, List, Any, Optional, Protocol, Tuple
+
+import numpy as np
+from numpy.typing import ArrayLike
 
 
 class AssetLike(Protocol):
@@ -7,6 +10,15 @@ class AssetLike(Protocol):
     is_high_impact: bool
 
 
+def _lookup_vector(table: Dict[int, float], default: float) -> np.ndarray:
+    """Tabla por estrato como vector: posición 0 = valor por defecto, 1..6 = estratos."""
+    vector = np.full(max(table) + 1, default, dtype=np.float64)
+    for stratum, value in table.items():
+        vector[stratum] = value
+    vector.setflags(write=False)
+    return vector
+
+
 class EnergyCalculators:
     """
     Núcleo matemático de EccoIA. 
@@ -44,8 +56,22 @@ class EnergyCalculators:
         6: 372.2
     }
     
+    # Consumo standby (vampiro) mensual por (tipo de equipo, alto impacto) en kWh.
+    # Los equipos modernos consumen muy poco (~0.7 kWh/mes); combinaciones ausentes = 0.
+    STANDBY_KWH_TABLE: Dict[Tuple[str, bool], float] = {
+        **{(icon, True): 2.5 for icon in ("tv", "monitor", "console", "desktop")},
+        **{(icon, False): 0.7 for icon in ("tv", "monitor", "console", "desktop")},
+        ("fridge", True): 8.0,
+        ("ac", True): 1.5,
+    }
+
     CO2_FACTOR = 0.164  # kg CO2e / kWh
     TREE_COMPENSATION = 20.0  # kg CO2 / year per tree
+
+    # Vectores de búsqueda para la API de arrays (mismos defaults que los métodos escalares)
+    TARIFF_VECTOR = _lookup_vector(ESTRATO_TARIFFS, 657.80)
+    SUBSIDY_VECTOR = _lookup_vector(ESTRATO_SUBSIDIO, 0.0)
+    AVERAGE_KWH_VECTOR = _lookup_vector(ESTRATO_PROMEDIO_KWH, 153.0)
     
     @classmethod
     def get_kwh_price(cls, stratum: int) -> float:
@@ -128,28 +154,104 @@ class EnergyCalculators:
         score = 100 - (max(0, kwh_per_person - 35) * 1.5)
         return int(max(0, min(100, score)))
 
+    @classmethod
+    def get_standby_kwh(cls, icon: str, is_high_impact: bool) -> float:
+        """Consumo standby mensual de un equipo según la tabla STANDBY_KWH_TABLE."""
+        return cls.STANDBY_KWH_TABLE.get((icon, bool(is_high_impact)), 0.0)
+
     @classmethod
     def get_vampire_estimate(cls, assets: List[AssetLike]) -> float:
         """
         Estima el consumo standby (vampiro) basado en el tipo de equipo y su antigüedad.
         """
-        vampire_kwh = 0.0
-        for a in assets:
-            # Lógica refinada: equipos modernos consumen muy poco (~0.7 kWh/mes)
-            if a.icon in ["tv", "monitor", "console", "desktop"]:
-                vampire_kwh += 2.5 if a.is_high_impact else 0.7
-            elif a.icon == "fridge" and a.is_high_impact:
-                vampire_kwh += 8.0
-            elif a.icon == "ac" and a.is_high_impact:
-                vampire_kwh += 1.5
-        return vampire_kwh
-
-    @classmethod
-    def calculate_environmental_impact(cls, total_kwh: float) -> Dict[str, Any]:
-        co2 = total_kwh * cls.CO2_FACTOR
+        return sum((cls.get_standby_kwh(a.icon, a.is_high_impact) for a in assets), 0.0)
+
+    @classmethod
+    def calculate_environmental_impact(cls, total_kwh: float, co2_factor: Optional[float] = None) -> Dict[str, Any]:
+        """Huella de CO2; `co2_factor` permite usar el factor de la red del periodo (ver core/emissions)."""
+        co2 = total_kwh * (cls.CO2_FACTOR if co2_factor is None else co2_factor)
         return {
             "co2_kg": round(co2, 2),
             "trees": int(round(co2 / cls.TREE_COMPENSATION))
         }
 
+    # ------------------------------------------------------------------
+    # API vectorizada: mismas fórmulas sobre arrays de NumPy (carteras completas).
+    # Cada método devuelve un dict de columnas con las mismas claves que su versión escalar.
+    # Los montos en COP coinciden exactamente; en los campos redondeados a 1-2 decimales
+    # np.round puede resolver un empate distinto que round() (una unidad del último decimal).
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def stratum_index(cls, strata: ArrayLike) -> np.ndarray:
+        """Índice en los vectores de tarifas; estratos fuera de 1..6 caen en el default (posición 0)."""
+        strata = np.asarray(strata, dtype=np.int64)
+        valid = (strata >= 1) & (strata < len(cls.TARIFF_VECTOR))
+        return np.where(valid, strata, 0)
+
+    @classmethod
+    def get_kwh_price_array(cls, strata: ArrayLike) -> np.ndarray:
+        return cls.TARIFF_VECTOR[cls.stratum_index(strata)]
+
+    @classmethod
+    def calculate_stratum_comparison_array(cls, user_kwh: ArrayLike, strata: ArrayLike) -> Dict[str, np.ndarray]:
+        """Versión vectorizada de `calculate_stratum_comparison` (sin el mensaje de texto)."""
+        user_kwh = np.asarray(user_kwh, dtype=np.float64)
+        average = cls.AVERAGE_KWH_VECTOR[cls.stratum_index(strata)]
+        diff_kwh = user_kwh - average
+        return {
+            "promedio_estrato_kwh": average,
+            "consumo_usuario_kwh": user_kwh,
+            "diferencia_kwh": np.round(diff_kwh, 1),
+            "diferencia_porcentaje": np.round(diff_kwh / average * 100, 1),
+            "es_eficiente": user_kwh <= average,
+        }
+
+    @classmethod
+    def calculate_leak_cost_array(cls, otros_fugas_kwh: ArrayLike, strata: ArrayLike) -> Dict[str, np.ndarray]:
+        """Versión vectorizada de `calculate_leak_cost`."""
+        otros_fugas_kwh = np.asarray(otros_fugas_kwh, dtype=np.float64)
+        kwh_price = cls.get_kwh_price_array(strata)
+        return {
+            "fugas_kwh": np.round(otros_fugas_kwh, 2),
+            "fugas_costo_cop": np.round(otros_fugas_kwh * kwh_price).astype(np.int64),
+            "tarifa_kwh": kwh_price,
+        }
+
+    @classmethod
+    def calculate_bill_from_kwh_array(cls, total_kwh: ArrayLike, strata: ArrayLike) -> Dict[str, np.ndarray]:
+        """Versión vectorizada de `calculate_bill_from_kwh`."""
+        total_kwh = np.asarray(total_kwh, dtype=np.float64)
+        index = cls.stratum_index(strata)
+        kwh_price = cls.TARIFF_VECTOR[index]
+        subsidio = cls.SUBSIDY_VECTOR[index]
+        return {
+            "consumo_kwh": np.round(total_kwh, 1),
+            "tarifa_kwh": kwh_price,
+            "factura_estimada_cop": np.round(total_kwh * kwh_price).astype(np.int64),
+            "subsidio_contribucion_porcentaje": subsidio * 100,
+            "tipo_tarifa": np.where(subsidio < 0, "Subsidiada", np.where(subsidio > 0, "Contribución", "Plena")),
+        }
+
+    @classmethod
+    def calculate_efficiency_score_array(cls, total_kwh: ArrayLike, occupants: ArrayLike) -> np.ndarray:
+        """Versión vectorizada de `calculate_efficiency_score`."""
+        total_kwh = np.asarray(total_kwh, dtype=np.float64)
+        occupants = np.asarray(occupants, dtype=np.int64)
+        kwh_per_person = total_kwh / np.where(occupants <= 0, 1, occupants)
+        score = 100 - (np.maximum(0, kwh_per_person - 35) * 1.5)
+        return np.clip(score, 0, 100).astype(np.int64)
+
+    @classmethod
+    def calculate_environmental_impact_array(
+        cls, total_kwh: ArrayLike, co2_factor: Optional[ArrayLike] = None
+    ) -> Dict[str, np.ndarray]:
+        """Versión vectorizada de `calculate_environmental_impact` (factor escalar o por elemento)."""
+        factor = cls.CO2_FACTOR if co2_factor is None else np.asarray(co2_factor, dtype=np.float64)
+        co2 = np.asarray(total_kwh, dtype=np.float64) * factor
+        return {
+            "co2_kg": np.round(co2, 2),
+            "trees": np.round(co2 / cls.TREE_COMPENSATION).astype(np.int64),
+        }
+
 energy_calculators = EnergyCalculators()
@@ -0,0 +1,129 @@
+"""Incremental extraction of a JSON string field from a streamed LLM reply."""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Dict
+
+
+class JsonFieldStreamParser:
+    """Decode the value of one string field of a JSON object while it streams in.
+
+    The model is asked to answer ``{"response": "..."}``; instead of waiting for the
+    whole completion and regex-extracting the object, each chunk is fed here and the
+    decoded characters of the field value are returned as soon as they arrive.
+    Markdown fences before the object are skipped. If the reply does not start with
+    a JSON object at all, the raw text is relayed unchanged.
+    """
+
+    _SEEK, _VALUE, _RAW, _DONE = range(4)
+    _HEX4 = re.compile(r"[0-9a-fA-F]{4}")
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self, field: str = "response") -> None:
+        self.field = field
+        self._key_re = re.compile(r'"' + re.escape(field) + r'"\s*:\s*"')
+        self._state = self._SEEK
+        self._buffer = ""   # texto crudo aún no interpretado
+        self._pending = ""  # escape incompleto (p. ej. '\\u00' partido entre chunks)
+        self._raw = []      # todo lo recibido, para el fallback final
+        self._decoded = []  # valor decodificado del campo
+
+    @property
+    def done(self) -> bool:
+        return self._state == self._DONE
+
+    @property
+    def matched(self) -> bool:
+        """True once the field was found in a JSON object (not raw relay)."""
+        return self._state in (self._VALUE, self._DONE)
+
+    @property
+    def value(self) -> str:
+        return "".join(self._decoded)
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk and return the newly decoded part of the field value."""
+        if not chunk:
+            return ""
+        self._raw.append(chunk)
+
+        if self._state == self._RAW:
+            self._decoded.append(chunk)
+            return chunk
+        if self._state == self._DONE:
+            return ""
+
+        if self._state == self._SEEK:
+            self._buffer += chunk
+            head = self._buffer.lstrip()
+            if head and head[0] not in "{`":
+                # No es JSON: se retransmite tal cual
+                self._state = self._RAW
+                text, self._buffer = self._buffer, ""
+                self._decoded.append(text)
+                return text
+            match = self._key_re.search(self._buffer)
+            if not match:
+                return ""
+            self._state = self._VALUE
+            text, self._buffer = self._buffer[match.end():], ""
+            return self._decode(text)
+
+        return self._decode(chunk)
+
+    def _decode(self, text: str) -> str:
+        text = self._pending + text
+        self._pending = ""
+        out = []
+        i, n = 0, len(text)
+        while i < n:
+            ch = text[i]
+            if ch == '"':
+                self._state = self._DONE
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
+                continue
+            if i + 1 >= n:
+                self._pending = text[i:]
+                break
+            code = text[i + 1]
+            if code == "u":
+                if i + 6 > n:
+                    self._pending = text[i:]
+                    break
+                if not self._HEX4.fullmatch(text, i + 2, i + 6):
+                    # Escape \u mal formado: se emite tal cual y se sigue con lo que viene detrás
+                    out.append(text[i:i + 2])
+                    i += 2
+                    continue
+                out.append(chr(int(text[i + 2:i + 6], 16)))
+                i += 6
+                continue
+            out.append(self._ESCAPES.get(code, code))
+            i += 2
+
+        decoded = "".join(out)
+        # Pares sustitutos (emojis) llegan como dos escapes \\uXXXX que pueden partirse entre chunks
+        if decoded and "\ud800" <= decoded[-1] <= "\udbff" and self._state != self._DONE:
+            self._pending = f"\\u{ord(decoded[-1]):04x}" + self._pending
+            decoded = decoded[:-1]
+        if decoded:
+            decoded = decoded.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+        self._decoded.append(decoded)
+        return decoded
+
+    def result(self) -> Dict[str, Any]:
+        """Final payload once the stream is exhausted, mirroring the non-streaming reply."""
+        if self._state in (self._VALUE, self._DONE, self._RAW):
+            return {self.field: self.value}
+        raw = "".join(self._raw)
+        start, end = raw.find("{"), raw.rfind("}")
+        if start != -1 and end > start:
+            try:
+                return json.loads(raw[start:end + 1])
+            except ValueError:
+                pass
+        return {self.field: raw}
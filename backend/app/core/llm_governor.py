@@ -0,0 +1,173 @@
+"""Admission control for outbound LLM calls: concurrency cap, rate limit and priorities."""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+
+class Priority(IntEnum):
+    """Lower value is served first."""
+
+    INTERACTIVE = 0  # chat: a user is waiting for the answer
+    DASHBOARD = 1    # dashboard insights: a rule-based fallback exists
+    BACKGROUND = 2   # stale-while-revalidate refreshes and batch jobs
+
+
+# Priority used when the caller does not pass one explicitly. Background tasks set it
+# at their start; asyncio tasks copy the context so it never leaks to the request.
+llm_priority: ContextVar[Priority] = ContextVar("llm_priority", default=Priority.DASHBOARD)
+
+
+class GovernorTimeout(Exception):
+    """Raised when a call waited longer than its class allows for a slot."""
+
+
+class LLMGovernor:
+    """Global gate in front of the LLM provider.
+
+    A call needs both a free concurrency slot (``max_concurrency``) and a token from a
+    bucket refilled at ``rate_per_second`` (up to ``burst``). Waiting calls are served
+    strictly by priority, then FIFO. Each class has a maximum queue time after which
+    ``GovernorTimeout`` is raised so the caller can fall back instead of piling up.
+    """
+
+    SAMPLE_SIZE = 200
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = 8,
+        rate_per_second: float = 5.0,
+        burst: int = 10,
+        max_wait: Optional[Dict[Priority, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_wait = max_wait or {
+            Priority.INTERACTIVE: 8.0,
+            Priority.DASHBOARD: 3.0,
+            Priority.BACKGROUND: 30.0,
+        }
+        self._clock = clock
+
+        self._tokens = float(burst)
+        self._refilled_at = clock()
+        self._in_flight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+        self._admitted = {p: 0 for p in Priority}
+        self._timeouts = {p: 0 for p in Priority}
+        self._waits: Dict[Priority, Deque[float]] = {p: deque(maxlen=self.SAMPLE_SIZE) for p in Priority}
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_per_second)
+        self._refilled_at = now
+
+    def _can_admit(self) -> bool:
+        self._refill()
+        return self._in_flight < self.max_concurrency and self._tokens >= 1
+
+    def _admit(self) -> None:
+        self._tokens -= 1
+        self._in_flight += 1
+
+    def _dispatch(self) -> None:
+        """Hand free slots to the highest-priority waiters; re-arm a timer if the bucket is empty."""
+        while self._waiters and self._in_flight < self.max_concurrency:
+            _, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)  # waiter gave up
+                continue
+            self._refill()
+            if self._tokens < 1:
+                if self._wakeup is None:
+                    delay = (1 - self._tokens) / self.rate_per_second
+                    self._wakeup = asyncio.get_running_loop().call_later(delay, self._on_wakeup)
+                return
+            heapq.heappop(self._waiters)
+            self._admit()
+            future.set_result(True)
+
+    def _on_wakeup(self) -> None:
+        self._wakeup = None
+        self._dispatch()
+
+    async def acquire(self, priority: Priority) -> None:
+        """Wait for a slot; raise ``GovernorTimeout`` after the class's maximum wait."""
+        start = self._clock()
+        if not self._waiters and self._can_admit():
+            self._admit()
+            self._record_admission(priority, 0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), future))
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.max_wait[priority])
+        except asyncio.TimeoutError:
+            if not self._abandon(future):
+                self._record_admission(priority, self._clock() - start)
+                return
+            self._timeouts[priority] += 1
+            raise GovernorTimeout(f"LLM queue wait exceeded {self.max_wait[priority]}s for {priority.name}")
+        except asyncio.CancelledError:
+            if not self._abandon(future):
+                self.release()
+            raise
+        self._record_admission(priority, self._clock() - start)
+
+    def _abandon(self, future: asyncio.Future) -> bool:
+        """Withdraw a waiter; False if it had already been granted a slot."""
+        if future.done():
+            return False
+        future.cancel()
+        return True
+
+    def release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _record_admission(self, priority: Priority, waited: float) -> None:
+        self._admitted[priority] += 1
+        self._waits[priority].append(waited)
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        classes = {}
+        for p in Priority:
+            waits = sorted(self._waits[p])
+            classes[p.name.lower()] = {
+                "admitted": self._admitted[p],
+                "timeouts": self._timeouts[p],
+                "queued": sum(1 for prio, _, f in self._waiters if prio == p and not f.done()),
+                "p50_wait_s": round(waits[len(waits) // 2], 3) if waits else None,
+                "p95_wait_s": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else None,
+                "max_wait_s": round(waits[-1], 3) if waits else None,
+            }
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "tokens": round(self._tokens, 2),
+            "classes": classes,
+        }
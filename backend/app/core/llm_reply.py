@@ -0,0 +1,84 @@
+"""Schema validation of JSON replies from the LLM."""
+from __future__ import annotations
+
+import json
+from collections import Counter
+from typing import Any, Dict
+
+from pydantic import TypeAdapter, ValidationError
+
+_decoder = json.JSONDecoder()
+
+
+class MalformedReplyError(ValueError):
+    """The reply is not a JSON object matching the declared schema.
+
+    ``text`` keeps the raw reply so callers can fall back to it or ask the
+    model to repair it; ``detail`` is a short, prompt-friendly error summary.
+    """
+
+    def __init__(self, detail: str, text: str) -> None:
+        super().__init__(detail)
+        self.detail = detail
+        self.text = text
+
+
+def _summarize(exc: ValidationError, limit: int = 5) -> str:
+    parts = [
+        f"{'.'.join(str(p) for p in err['loc']) or '<root>'}: {err['msg']}"
+        for err in exc.errors(include_url=False)[:limit]
+    ]
+    return "; ".join(parts)
+
+
+def parse_json_reply(text: str, adapter: TypeAdapter) -> Any:
+    """Validate an LLM reply against ``adapter`` and return the parsed model.
+
+    With structured output the whole reply is the JSON document, so it is
+    validated in one pass straight from the string. Otherwise (markdown fences,
+    leading prose) exactly one object is decoded from the first ``{`` with
+    ``raw_decode`` — it stops at the matching brace instead of regex-scanning
+    to the last one in the text.
+    """
+    stripped = (text or "").strip()
+    try:
+        return adapter.validate_json(stripped)
+    except ValidationError as exc:
+        if not any(err["type"] == "json_invalid" for err in exc.errors(include_url=False)):
+            # JSON válido pero fuera del esquema
+            raise MalformedReplyError(_summarize(exc), text) from exc
+
+    start = stripped.find("{")
+    if start == -1:
+        raise MalformedReplyError("the reply contains no JSON object", text)
+    try:
+        payload, _ = _decoder.raw_decode(stripped, start)
+    except json.JSONDecodeError as exc:
+        raise MalformedReplyError(f"invalid JSON: {exc.msg} at char {exc.pos - start}", text) from exc
+    try:
+        return adapter.validate_python(payload)
+    except ValidationError as exc:
+        raise MalformedReplyError(_summarize(exc), text) from exc
+
+
+class ReplyStats:
+    """Per-endpoint counts of valid, malformed and repaired LLM replies."""
+
+    OUTCOMES = ("valid", "malformed", "repaired", "unrepaired")
+
+    def __init__(self) -> None:
+        self._counts: Dict[str, Counter] = {}
+
+    def record(self, endpoint: str, outcome: str) -> None:
+        self._counts.setdefault(endpoint, Counter())[outcome] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for endpoint, counts in self._counts.items():
+            # Cada respuesta del primer intento es "valid" o "malformed"
+            first_attempts = counts["valid"] + counts["malformed"]
+            result[endpoint] = {
+                **{outcome: counts[outcome] for outcome in self.OUTCOMES},
+                "malformed_rate": round(counts["malformed"] / first_attempts, 3) if first_attempts else 0.0,
+            }
+        return result
@@ -0,0 +1,103 @@
+"""Mergeable quantile sketch with relative-error logarithmic buckets."""
+from __future__ import annotations
+
+import math
+from typing import Optional
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+
+class LogHistogram:
+    """Fixed-size histogram over logarithmic buckets (DDSketch-style).
+
+    Bucket ``i`` covers ``(gamma**(i-1), gamma**i]`` with
+    ``gamma = (1 + alpha) / (1 - alpha)``, so any quantile is returned with a
+    relative error of at most ``alpha``. Values below ``min_value`` share bucket 0
+    (reported as 0) and values above ``max_value`` are clamped into the last bucket.
+
+    Every sketch built with the same parameters has the same bucket layout, so
+    merging is an element-wise sum of counts and removing a value is adding it
+    with weight -1. The cumulative counts are cached between updates: rank and
+    quantile queries are O(1) and O(log buckets) respectively.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.02, min_value: float = 0.1, max_value: float = 1e6) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        if not 0 < min_value < max_value:
+            raise ValueError("expected 0 < min_value < max_value")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._offset = math.ceil(math.log(min_value) / self._log_gamma) - 1
+        size = math.ceil(math.log(max_value) / self._log_gamma) - self._offset + 1
+        self.counts = np.zeros(size, dtype=np.int64)
+        self._cdf: Optional[np.ndarray] = None
+
+    @property
+    def count(self) -> int:
+        return int(self._cumulative()[-1])
+
+    def _same_layout(self, other: "LogHistogram") -> bool:
+        return (self.relative_accuracy, self.min_value, self.max_value) == (
+            other.relative_accuracy, other.min_value, other.max_value
+        )
+
+    def _indices(self, values: ArrayLike) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        raw = np.ceil(np.log(np.maximum(values, self.min_value)) / self._log_gamma) - self._offset
+        raw = np.clip(raw, 1, len(self.counts) - 1).astype(np.intp)
+        return np.where(values < self.min_value, 0, raw)
+
+    def _cumulative(self) -> np.ndarray:
+        if self._cdf is None:
+            self._cdf = np.cumsum(self.counts)
+        return self._cdf
+
+    def _value(self, index: int) -> float:
+        if index == 0:
+            return 0.0
+        # Punto del bucket equidistante en error relativo de sus dos bordes
+        return 2 * self.gamma ** (index + self._offset) / (self.gamma + 1)
+
+    def add(self, values: ArrayLike, weight: int = 1) -> None:
+        """Add one value or an array of values (``weight=-1`` removes them)."""
+        np.add.at(self.counts, np.atleast_1d(self._indices(values)), weight)
+        self._cdf = None
+
+    def remove(self, values: ArrayLike) -> None:
+        self.add(values, -1)
+
+    def merge(self, other: "LogHistogram") -> "LogHistogram":
+        """Add the counts of ``other`` (same parameters) into this sketch."""
+        if not self._same_layout(other):
+            raise ValueError("cannot merge sketches with different parameters")
+        self.counts += other.counts
+        self._cdf = None
+        return self
+
+    def copy(self) -> "LogHistogram":
+        clone = LogHistogram(self.relative_accuracy, self.min_value, self.max_value)
+        clone.counts = self.counts.copy()
+        return clone
+
+    def rank(self, value: float) -> float:
+        """Fraction of values below ``value`` (values in its bucket count half)."""
+        total = self.count
+        if total == 0:
+            return 0.0
+        index = int(self._indices(value))
+        cdf = self._cumulative()
+        below = cdf[index - 1] if index > 0 else 0
+        return float((below + self.counts[index] / 2) / total)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile ``q`` in [0, 1]; None if the sketch is empty."""
+        total = self.count
+        if total == 0:
+            return None
+        index = int(np.searchsorted(self._cumulative(), q * (total - 1), side="right"))
+        return self._value(min(index, len(self.counts) - 1))
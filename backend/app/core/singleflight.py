@@ -0,0 +1,56 @@
+"""Single-flight coalescing of identical concurrent async calls."""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Share one in-flight awaitable among concurrent callers with the same key.
+
+    The first caller for a key (the leader) starts the work as its own task;
+    callers arriving while it is still running await the same task instead of
+    repeating it. Every caller, the leader included, awaits the task through
+    ``asyncio.shield``, so cancelling any one of them (a client disconnect)
+    never cancels the shared call for the others. Once the task settles the
+    key is released, so later calls run again.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.requests = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    def _release(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark as retrieved so an error whose callers all left is not logged
+            task.exception()
+
+    async def do(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        """Run ``work`` once per key among concurrent callers and return its result."""
+        self.requests += 1
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(work())
+            self._inflight[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda done: self._release(key, done))
+        return await asyncio.shield(task)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._inflight)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "requests": self.requests,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight,
+        }
@@ -0,0 +1,17 @@
+"""Helpers for Server-Sent Events responses."""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+# Evita que proxies (nginx) acumulen la respuesta antes de enviarla
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Serialize one SSE frame with a JSON payload."""
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"event: {event}\ndata: {payload}\n\n"
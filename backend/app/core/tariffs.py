@@ -0,0 +1,162 @@
+"""Versioned tariff schedules with O(1) (stratum, timestamp) price lookup."""
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from app.core.config import get_settings
+from app.core.timeutils import as_datetime64
+
+DEFAULT_SCHEDULE_PATH = Path(__file__).resolve().parent.parent / "data" / "tariffs.json"
+BASE_BAND = "base"
+MAX_STRATUM = 6
+
+
+class TariffError(ValueError):
+    """The tariff schedule file is inconsistent or an operator is unknown."""
+
+
+def _stratum_index(strata: ArrayLike) -> np.ndarray:
+    strata = np.asarray(strata, dtype=np.int64)
+    return np.where((strata >= 1) & (strata <= MAX_STRATUM), strata, 0)
+
+
+class OperatorTariffs:
+    """Compiled schedule of one operator.
+
+    Every version of the schedule is packed into dense arrays so that a price
+    lookup is pure indexing:
+
+    * ``prices[v, s, b]`` — COP/kWh for version ``v``, stratum ``s`` and band ``b``
+      (row ``s = 0`` holds the default stratum, used for unknown strata);
+    * ``subsidies[v, s]`` — subsidy (negative) or contribution (positive) of stratum
+      ``s`` under version ``v``, as a fraction of the full tariff (0 when not listed);
+    * ``hour_band[v, h]`` — time-of-use band of local hour ``h`` under version ``v``;
+    * ``day_version[d]`` — version in force ``d`` days after the first effective date.
+
+    Dates before the first version use the first version; dates after the last
+    effective date use the last one.
+    """
+
+    def __init__(self, code: str, spec: Dict[str, Any]) -> None:
+        versions = sorted(spec.get("versions", []), key=lambda v: v["effective_from"])
+        if not versions:
+            raise TariffError(f"operator {code!r} has no tariff versions")
+
+        self.code = code
+        self.name = spec.get("name", code)
+        self.versions = versions
+        self.offset = np.timedelta64(int(round(spec.get("utc_offset_hours", 0) * 60)), "m")
+        self.bands: List[str] = [BASE_BAND] + sorted(
+            {band for v in versions for band in v["bands"]} - {BASE_BAND}
+        )
+        default_stratum = str(spec.get("default_stratum", 3))
+
+        self.prices = np.empty((len(versions), MAX_STRATUM + 1, len(self.bands)), dtype=np.float64)
+        self.subsidies = np.zeros((len(versions), MAX_STRATUM + 1), dtype=np.float64)
+        self.hour_band = np.zeros((len(versions), 24), dtype=np.intp)
+        for i, version in enumerate(versions):
+            base = version["bands"].get(BASE_BAND)
+            missing = [s for s in range(1, MAX_STRATUM + 1) if str(s) not in (base or {})]
+            if missing:
+                raise TariffError(
+                    f"{code} {version['effective_from']}: base band lacks strata {missing}"
+                )
+            for b, band in enumerate(self.bands):
+                # Una franja sin precio para un estrato cobra la tarifa base
+                table = {**base, **version["bands"].get(band, {})}
+                self.prices[i, 0, b] = table[default_stratum]
+                for s in range(1, MAX_STRATUM + 1):
+                    self.prices[i, s, b] = table[str(s)]
+            subsidy = version.get("subsidy", {})
+            self.subsidies[i, 0] = subsidy.get(default_stratum, 0.0)
+            for s in range(1, MAX_STRATUM + 1):
+                self.subsidies[i, s] = subsidy.get(str(s), 0.0)
+            for band, hours in version.get("hours", {}).items():
+                if band not in self.bands:
+                    raise TariffError(f"{code} {version['effective_from']}: hours for unpriced band {band!r}")
+                self.hour_band[i, hours] = self.bands.index(band)
+
+        starts = np.array([v["effective_from"] for v in versions], dtype="datetime64[D]")
+        if len(np.unique(starts)) != len(starts):
+            raise TariffError(f"operator {code!r} has two versions with the same effective date")
+        self.first_day = starts[0]
+        span = int((starts[-1] - starts[0]) // np.timedelta64(1, "D")) + 1
+        self.day_version = np.searchsorted(starts, self.first_day + np.arange(span), side="right") - 1
+
+    def _locate(self, timestamps: ArrayLike):
+        local = as_datetime64(timestamps) + self.offset
+        days = local.astype("datetime64[D]")
+        hours = ((local - days) // np.timedelta64(1, "h")).astype(np.intp)
+        offset = ((days - self.first_day) // np.timedelta64(1, "D")).astype(np.int64)
+        versions = self.day_version[np.clip(offset, 0, len(self.day_version) - 1)]
+        return versions, self.hour_band[versions, hours]
+
+    def prices_at(self, strata: ArrayLike, timestamps: ArrayLike) -> np.ndarray:
+        """COP/kWh for each (stratum, timestamp); both arguments broadcast."""
+        versions, bands = self._locate(timestamps)
+        return self.prices[versions, _stratum_index(strata), bands]
+
+    def subsidies_at(self, strata: ArrayLike, timestamps: ArrayLike) -> np.ndarray:
+        """Subsidy/contribution fraction for each (stratum, timestamp); both arguments broadcast."""
+        versions, _ = self._locate(timestamps)
+        return self.subsidies[versions, _stratum_index(strata)]
+
+    def version_at(self, when: Any) -> Dict[str, Any]:
+        versions, _ = self._locate([when])
+        return self.versions[int(versions[0])]
+
+
+class TariffEngine:
+    """Tariff schedules of every operator, compiled from a JSON file."""
+
+    def __init__(self, schedules: Dict[str, Any], default_operator: Optional[str] = None) -> None:
+        self.operators = {
+            code: OperatorTariffs(code, spec) for code, spec in schedules.get("operators", {}).items()
+        }
+        self.default_operator = default_operator or schedules.get("default_operator")
+        if self.default_operator not in self.operators:
+            raise TariffError(f"default tariff operator {self.default_operator!r} is not defined")
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None, default_operator: Optional[str] = None) -> "TariffEngine":
+        with open(path or DEFAULT_SCHEDULE_PATH, encoding="utf-8") as f:
+            return cls(json.load(f), default_operator)
+
+    def operator(self, code: Optional[str] = None) -> OperatorTariffs:
+        code = code or self.default_operator
+        try:
+            return self.operators[code]
+        except KeyError:
+            raise TariffError(f"unknown tariff operator {code!r}") from None
+
+    def price(self, stratum: int, when: datetime | date, operator: Optional[str] = None) -> float:
+        """Price of one kWh for a stratum at a given moment."""
+        return float(self.operator(operator).prices_at(stratum, [when])[0])
+
+    def prices(self, strata: ArrayLike, timestamps: ArrayLike, operator: Optional[str] = None) -> np.ndarray:
+        """Vectorized ``price`` over arrays of strata and timestamps."""
+        return self.operator(operator).prices_at(strata, timestamps)
+
+    def subsidies(self, strata: ArrayLike, timestamps: ArrayLike, operator: Optional[str] = None) -> np.ndarray:
+        """Subsidy (< 0) or contribution (> 0) in force for each stratum and timestamp."""
+        return self.operator(operator).subsidies_at(strata, timestamps)
+
+    def bill(
+        self, kwh: ArrayLike, strata: ArrayLike, timestamps: ArrayLike, operator: Optional[str] = None
+    ) -> np.ndarray:
+        """Cost in COP of each reading, priced with the tariff in force when it was taken."""
+        return np.asarray(kwh, dtype=np.float64) * self.prices(strata, timestamps, operator)
+
+
+@lru_cache
+def get_tariff_engine() -> TariffEngine:
+    """Return the cached engine for the configured schedule file."""
+    settings = get_settings()
+    return TariffEngine.from_file(settings.tariff_schedule_path, settings.tariff_operator)
@@ -0,0 +1,24 @@
+"""Timestamp normalization shared by the vectorized tariff and emission engines."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+
+def to_utc(value: Any) -> Any:
+    # Fechas con zona -> UTC; las naive se asumen ya en UTC (así las guarda la base de datos)
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def as_datetime64(values: ArrayLike) -> np.ndarray:
+    """Datetimes, dates or datetime64 values as a UTC ``datetime64[s]`` array of the same shape."""
+    array = np.asarray(values)
+    if array.dtype.kind == "M":
+        return array.astype("datetime64[s]")
+    flat = [to_utc(v) for v in array.ravel()]
+    return np.array(flat, dtype="datetime64[s]").reshape(array.shape)
@@ -1,6 +1,6 @@
 """Database session management."""
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.core.config import get_settings
 from typing import AsyncGenerator
@@ -11,6 +11,7 @@ settings = get_settings()
 # Lazily create the engine to avoid requiring DB driver packages during
 # import-time (useful for lightweight test environments).
 _engine = None
+_session_factory = None
 
 logger = logging.getLogger("app.db")
 
@@ -31,15 +32,37 @@ def get_async_engine():
 # Export for scripts
 async_engine = get_async_engine()
 
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    """Yield a database session in async context."""
-    logger.info("Solicitando sesión asíncrona...")
-    engine = get_async_engine()
-    AsyncSessionLocal = sessionmaker(
+
+class AppSession(Session):
+    """Sync session behind the app's AsyncSessions; the write listeners target this class only."""
+
+
+def make_session_factory(engine: AsyncEngine) -> sessionmaker:
+    """AsyncSession factory for `engine` with the app's write listeners registered."""
+    from app.services.plant_summary import plant_summary
+
+    plant_summary.register(AppSession, engine.dialect.name)
+    return sessionmaker(
         bind=engine,
         class_=AsyncSession,
+        sync_session_class=AppSession,
         expire_on_commit=False,
     )
+
+
+def get_session_factory() -> sessionmaker:
+    """Return the lazily-initialized session factory bound to the current app engine."""
+    global _session_factory
+    engine = get_async_engine()
+    if _session_factory is None or _session_factory.kw["bind"] is not engine:
+        _session_factory = make_session_factory(engine)
+    return _session_factory
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """Yield a database session in async context."""
+    logger.info("Solicitando sesión asíncrona...")
+    AsyncSessionLocal = get_session_factory()
     async with AsyncSessionLocal() as session:
         logger.info("Sesión abierta.")
         yield session
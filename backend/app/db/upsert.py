@@ -0,0 +1,16 @@
+"""Dialect-specific INSERT ... ON CONFLICT DO UPDATE."""
+from typing import Any
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+# insert() with on_conflict_do_update for each supported dialect
+UPSERT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def upsert_for(dialect: str) -> Any:
+    """Return the upsert-capable insert() for `dialect`, or raise ValueError if unsupported."""
+    insert_for = UPSERT.get(dialect)
+    if insert_for is None:
+        supported = ", ".join(UPSERT)
+        raise ValueError(f"No INSERT ... ON CONFLICT support for dialect {dialect!r} (supported: {supported})")
+    return insert_for
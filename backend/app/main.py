@@ -48,9 +48,20 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"⚠️ Error en gamificación: {e}")
 
+    # 3. Estadísticas de pares: carga inicial y recargas en segundo plano
+    from app.services.peer_stats import peer_stats
+    peer_stats.start(get_async_session)
+
     yield 
     
     logger.info("🛑 Apagando aplicación...")
+    await peer_stats.stop()
+    # Insights que se están guardando en segundo plano
+    from app.services.insight_store import insight_store
+    await insight_store.drain()
+    # Escribir el uso del LLM que aún esté en el buffer
+    from app.services.usage_ledger import usage_ledger
+    await usage_ledger.flush()
 
 def create_app() -> FastAPI:
     settings = get_settings()
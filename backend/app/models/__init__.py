@@ -2,8 +2,12 @@ from app.models.user import User
 from app.models.residential import ResidentialProfile, ResidentialAsset, ConsumptionReading
 from app.models.industrial_settings import IndustrialSettings
 from app.models.industrial_asset import IndustrialAsset
+from app.models.plant_summary import PlantSummary
 from app.models.gamification import GamificationProfile, Mission, UserMission
 from app.models.roi_scenario import RoiScenario
+from app.models.ai_insight import AIInsightSnapshot
+from app.models.chat import ChatConversation, ChatMessage
+from app.models.llm_usage import LLMUsageEvent
 
 __all__ = [
     "User",
@@ -12,8 +16,13 @@ __all__ = [
     "ConsumptionReading",
     "IndustrialSettings",
     "IndustrialAsset",
+    "PlantSummary",
     "GamificationProfile",
     "Mission",
     "UserMission",
     "RoiScenario",
+    "AIInsightSnapshot",
+    "ChatConversation",
+    "ChatMessage",
+    "LLMUsageEvent",
 ]
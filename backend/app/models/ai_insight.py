@@ -0,0 +1,26 @@
+from sqlalchemy import JSON, Column, DateTime, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class AIInsightSnapshot(Base):
+    """
+    Último insight de IA calculado por usuario y tipo de perfil.
+    Permite servir el dashboard al instante (stale-while-revalidate) mientras
+    una tarea en segundo plano lo regenera.
+    """
+    __tablename__ = "ai_insight_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    profile_type = Column(String(20), nullable=False)  # industrial, residential
+    payload = Column(JSON, nullable=False)              # Campos IA (ai_interpretation, missions, ...)
+    context_hash = Column(String(64), nullable=False)   # Huella de los datos que generaron el insight
+    source = Column(String(20), default="ai")           # ai, rules
+
+    generated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'profile_type', name='uq_ai_insight_user_profile'),
+    )
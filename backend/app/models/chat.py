@@ -0,0 +1,44 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class ChatConversation(Base):
+    """
+    Conversación persistente del asistente por usuario y tipo de perfil.
+    Los turnos recientes se guardan textuales; los antiguos se comprimen en `summary`.
+    """
+    __tablename__ = "chat_conversations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    profile_type = Column(String(20), nullable=False)  # industrial, residential
+    summary = Column(Text, default="")                  # Resumen rodante de los turnos antiguos
+    summarized_until_id = Column(Integer, default=0)    # Mensajes con id <= este ya están en el resumen
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    messages = relationship("ChatMessage", back_populates="conversation", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'profile_type', name='uq_chat_conversation_user_profile'),
+    )
+
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(Integer, ForeignKey("chat_conversations.id", ondelete="CASCADE"), nullable=False)
+    role = Column(String(20), nullable=False)  # user, assistant
+    content = Column(Text, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    conversation = relationship("ChatConversation", back_populates="messages")
+
+    __table_args__ = (
+        Index('ix_chat_messages_conversation_id_id', 'conversation_id', 'id'),
+    )
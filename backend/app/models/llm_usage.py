@@ -0,0 +1,31 @@
+from sqlalchemy import Column, DateTime, Float, Index, Integer, String
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class LLMUsageEvent(Base):
+    """
+    Ledger append-only del uso del LLM: una fila por llamada, nunca se actualiza.
+    Sin FK a users para que la inserción por lotes sea barata y el histórico sobreviva al usuario.
+    """
+    __tablename__ = "llm_usage_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=True)
+    endpoint = Column(String(40), nullable=False)   # industrial_insights, residential_insights, chat, chat_stream
+    model = Column(String(80), nullable=True)
+    outcome = Column(String(20), nullable=False)    # ok, error, cached, coalesced, quota, circuit_open, queue_timeout
+
+    prompt_chars = Column(Integer, default=0)
+    response_chars = Column(Integer, default=0)
+    prompt_tokens = Column(Integer, default=0)      # Estimados (~4 caracteres por token)
+    response_tokens = Column(Integer, default=0)
+    latency_ms = Column(Float, default=0.0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index('ix_llm_usage_events_user_id_created_at', 'user_id', 'created_at'),
+        Index('ix_llm_usage_events_created_at', 'created_at'),
+    )
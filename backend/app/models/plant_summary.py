@@ -0,0 +1,29 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class PlantSummary(Base):
+    """
+    Proyección de los totales de cada planta: una fila por zona (location) y una fila
+    con zone = "" para la planta completa. La mantiene services/plant_summary por deltas
+    en la misma transacción que inserta, edita o borra activos industriales.
+    """
+    __tablename__ = "plant_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    zone = Column(String(100), nullable=False)       # "" = total de la planta
+
+    asset_count = Column(Integer, nullable=False, default=0)
+    real_kw = Column(Float, nullable=False, default=0.0)
+    monthly_kwh = Column(Float, nullable=False, default=0.0)
+    waste_kwh = Column(Float, nullable=False, default=0.0)
+    weighted_eff_sum = Column(Float, nullable=False, default=0.0)  # Σ eficiencia x kWh
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'zone', name='uq_plant_summaries_user_zone'),
+    )
@@ -0,0 +1,35 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, TypeAdapter
+
+# Esquemas de las respuestas de Gemini. Se declaran al modelo como response_schema
+# y se usan para validar lo que devuelve; sin valores por defecto en los campos
+# obligatorios para que el modelo no los omita.
+
+class PlantInsightsReply(BaseModel):
+    waste_score: int = Field(ge=0, le=100)
+    top_waste_reason: str
+    potential_savings: str          # Símbolo de moneda + monto
+    recommendation_highlight: str
+    ai_interpretation: str
+
+class MissionReply(BaseModel):
+    id: int
+    title: str
+    xp: int
+    icon: str                       # Nombre de ícono Lucide
+
+class HomeInsightsReply(BaseModel):
+    efficiency_score: Optional[int] = Field(default=None, ge=0, le=100)
+    top_waste_reason: str
+    ai_advice: str
+    potential_savings_percent: Optional[int] = Field(default=None, ge=0, le=100)
+    missions: List[MissionReply]
+
+class ChatReply(BaseModel):
+    response: str = Field(min_length=1)
+
+# Validadores precompilados: se construyen una vez al importar, no en cada respuesta
+PLANT_INSIGHTS_ADAPTER = TypeAdapter(PlantInsightsReply)
+HOME_INSIGHTS_ADAPTER = TypeAdapter(HomeInsightsReply)
+CHAT_REPLY_ADAPTER = TypeAdapter(ChatReply)
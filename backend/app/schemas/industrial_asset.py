@@ -1,5 +1,5 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional, List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Any, Optional, List, Dict
 from datetime import datetime
 
 class IndustrialAssetBase(BaseModel):
@@ -15,8 +15,18 @@ class IndustrialAssetBase(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+# Rangos iguales a los CHECK de industrial_assets: una fila inválida se rechaza al validar.
+# Solo en la entrada: IndustrialAssetRead no los exige a filas anteriores a ellos.
 class IndustrialAssetCreate(IndustrialAssetBase):
-    pass
+    name: str = Field(..., min_length=1, max_length=100)
+    asset_type: str = Field(..., min_length=1, max_length=50)
+    nominal_power_kw: float = Field(..., ge=0)
+    efficiency_percentage: Optional[float] = Field(85.0, ge=0, le=100)
+    load_factor: Optional[float] = Field(0.75, ge=0, le=1.5)
+    power_factor: Optional[float] = Field(0.85, ge=0, le=1.0)
+    daily_usage_hours: float = Field(..., ge=0, le=24)
+    op_days_per_month: Optional[int] = Field(22, ge=0, le=31)
+    location: Optional[str] = Field(None, max_length=100)
 
 class IndustrialAssetBatchCreate(BaseModel):
     assets: List[IndustrialAssetCreate]
@@ -33,6 +43,22 @@ class IndustrialAssetRead(IndustrialAssetBase):
     updated_at: Optional[datetime] = None
     user_id: Optional[int] = None
 
+class IndustrialAssetPage(BaseModel):
+    items: List[Dict[str, Any]]  # solo los campos pedidos con fields= (siempre con id)
+    next_cursor: Optional[str] = None  # None en la última página
+    limit: int
+
+class AssetImportRowError(BaseModel):
+    row: int  # línea del archivo (la cabecera es la 1)
+    errors: List[Dict[str, str]]  # [{"field": ..., "message": ...}]
+
+class IndustrialAssetImportReport(BaseModel):
+    rows: int
+    inserted: int
+    rejected: int
+    errors: List[AssetImportRowError]
+    errors_truncated: bool = False  # hay más filas rechazadas que errores listados
+
 class IndustrialDashboardInsights(BaseModel):
     waste_score: int
     top_waste_reason: str
@@ -43,3 +69,9 @@ class IndustrialDashboardInsights(BaseModel):
     recommendation_highlight: str
     ai_interpretation: str
     currency: str
+    # Frescura del insight de IA (stale-while-revalidate)
+    insight_age_seconds: Optional[float] = None
+    insight_stale: bool = False
+    insight_refreshing: bool = False
+    # "ai" o "rules" (fallback sin IA)
+    ai_source: Optional[str] = None
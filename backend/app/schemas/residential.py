@@ -48,6 +48,23 @@ class ResidentialAsset(ResidentialAssetBase):
     class Config:
         from_attributes = True
 
+class StandbyEstimate(BaseModel):
+    standby_kwh_monthly: float
+    standby_cost_monthly: float
+    kwh_price: float
+
+class PeerComparison(BaseModel):
+    scope: str  # stratum_city, stratum o all: grupo de pares usado
+    peers: int
+    kwh_monthly: float
+    percentile_kwh: float
+    percentile_kwh_per_person: float
+    efficiency_percentile: float
+    p25_kwh: float
+    median_kwh: float
+    p75_kwh: float
+    median_kwh_per_person: float
+
 class ConsumptionReadingBase(BaseModel):
     reading_value: float
     reading_type: str = "manual"
@@ -59,6 +76,11 @@ class ConsumptionReading(ConsumptionReadingBase):
     id: int
     user_id: int
     date: datetime
+    # Costo con la tarifa vigente en la fecha de la lectura
+    tariff_kwh: Optional[float] = None
+    cost_cop: Optional[float] = None
+    # Huella con el factor de emisión de la red en la fecha y hora de la lectura
+    co2_kg: Optional[float] = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,23 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class UsageReportRow(BaseModel):
+    user_id: Optional[int] = None
+    endpoint: str
+    calls: int
+    provider_calls: int     # Llamadas reales a Gemini (ok + error)
+    errors: int
+    cached: int
+    coalesced: int          # Esperaron la llamada idéntica de otro: sin costo ni cuota
+    fallbacks: int          # Cuota agotada, circuito abierto o cola llena
+    prompt_tokens: int      # Solo de las llamadas reales (provider_calls)
+    response_tokens: int
+    avg_latency_ms: Optional[float] = None
+    max_latency_ms: Optional[float] = None
+
+class UsageReport(BaseModel):
+    days: int
+    scope: str              # "all" (admins) o "self"
+    rows: List[UsageReportRow]
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import math
+import re
+import unicodedata
+import zlib
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+
+# Palabras vacías frecuentes que no distinguen una pregunta de otra
+STOPWORDS = {
+    "el", "la", "los", "las", "un", "una", "unos", "unas", "de", "del", "al", "en", "y", "o",
+    "a", "que", "mi", "mis", "me", "se", "es", "lo", "por", "para", "con", "como", "cual",
+    "hay", "yo", "tu", "su", "sus", "le", "les", "mas", "muy", "este", "esta", "esto",
+}
+# Marcas de una pregunta que continúa la conversación ("¿y eso cuánto cuesta?"): su
+# respuesta depende de los turnos anteriores y no se puede reutilizar para otra persona
+FOLLOW_UP_OPENERS = {"y", "pero", "entonces", "tambien", "ademas", "osea", "ok", "vale"}
+FOLLOW_UP_WORDS = {
+    "eso", "esa", "ese", "esos", "esas", "esto", "ello", "anterior", "anteriormente", "antes",
+    "dijiste", "mencionaste", "comentaste", "explicaste", "recomendaste", "sugeriste",
+}
+
+
+class _Bucket:
+    """Preguntas de un mismo perfil y contexto aproximado: ids + matriz de vectores TF."""
+
+    def __init__(self, dim: int):
+        self.ids: List[int] = []
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+
+
+class SemanticAnswerCache:
+    """
+    Caché local de respuestas del asistente por similitud de la pregunta.
+
+    Las preguntas se vectorizan con TF-IDF sobre features hasheadas (palabras y trigramas
+    de caracteres, sin vocabulario fijo) y se agrupan por perfil y contexto. El contexto
+    completo que ve el modelo (estrato, vivienda, ciudad, nombres de los equipos; la planta
+    en industria) forma parte de la clave, normalizado en mayúsculas, tildes y orden de
+    las listas: una respuesta personalizada solo se sirve a un contexto equivalente.
+    Si la similitud coseno con una pregunta ya respondida del mismo grupo supera el umbral,
+    se sirve esa respuesta sin llamar a Gemini. Solo participan las preguntas autocontenidas
+    (`is_standalone`). Tamaño acotado con expulsión LRU.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        dim: int = 1024,
+        max_per_bucket: int = 64,
+    ):
+        settings = get_settings()
+        self.threshold = threshold if threshold is not None else settings.chat_cache_similarity_threshold
+        self.max_entries = max_entries or settings.chat_cache_max_entries
+        self.dim = dim
+        self.max_per_bucket = max_per_bucket
+
+        self._buckets: Dict[str, _Bucket] = {}
+        # entry_id -> (bucket, respuesta); el orden es el de uso (LRU)
+        self._entries: "OrderedDict[int, Tuple[str, str]]" = OrderedDict()
+        self._next_id = 0
+        # Frecuencia de documentos para el IDF, aprendida de las preguntas guardadas
+        self._df = np.zeros(dim, dtype=np.float32)
+        self._docs = 0
+
+        self.lookups = 0
+        self.hits = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        text = unicodedata.normalize("NFKD", text.lower())
+        text = "".join(c for c in text if not unicodedata.combining(c))
+        return re.sub(r"[^a-z0-9 ]+", " ", text)
+
+    def _features(self, text: str) -> Counter:
+        words = [w for w in self._normalize(text).split() if len(w) > 1 and w not in STOPWORDS]
+        features: Counter = Counter(words)
+        # Trigramas de caracteres: "consume" y "consumo" comparten la mayoría
+        for w in words:
+            padded = f"<{w}>"
+            features.update(f"#{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def _tf_vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, count in self._features(text).items():
+            h = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if h & 0x80000000 else -1.0  # hashing con signo: las colisiones se cancelan
+            vector[h % self.dim] += sign * (1.0 + math.log(count))
+        return vector
+
+    def _idf(self) -> np.ndarray:
+        return np.log((1.0 + self._docs) / (1.0 + self._df)) + 1.0
+
+    @classmethod
+    def _canonical(cls, value: Any) -> Any:
+        if isinstance(value, dict):
+            return {str(k): cls._canonical(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple, set)):
+            items = [cls._canonical(v) for v in value]
+            return sorted(items, key=lambda v: json.dumps(v, sort_keys=True, default=str))
+        if isinstance(value, str):
+            return " ".join(cls._normalize(value).split())
+        return value
+
+    def bucket_key(self, profile_type: str, context: Dict[str, Any]) -> str:
+        raw = json.dumps(self._canonical(context), sort_keys=True, default=str, separators=(",", ":"))
+        return f"{profile_type}:{hashlib.sha1(raw.encode('utf-8')).hexdigest()}"
+
+    @classmethod
+    def is_standalone(cls, question: str) -> bool:
+        """True si la pregunta se entiende sin los turnos anteriores de la conversación."""
+        words = cls._normalize(question).split()
+        if not words or words[0] in FOLLOW_UP_OPENERS or FOLLOW_UP_WORDS.intersection(words):
+            return False
+        # "¿por qué?", "¿cuánto?": demasiado corta para tener sentido por sí sola
+        return len([w for w in words if len(w) > 1 and w not in STOPWORDS]) >= 2
+
+    def lookup(self, profile_type: str, context: Dict[str, Any], question: str) -> Optional[str]:
+        """Respuesta guardada para una pregunta suficientemente parecida, o None."""
+        self.lookups += 1
+        bucket = self._buckets.get(self.bucket_key(profile_type, context))
+        if bucket is None or not bucket.ids:
+            return None
+
+        idf = self._idf()
+        query = self._tf_vector(question) * idf
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            return None
+        stored = bucket.vectors * idf
+        norms = np.linalg.norm(stored, axis=1) * query_norm
+        similarities = (stored @ query) / np.where(norms == 0, 1.0, norms)
+
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            return None
+        entry_id = bucket.ids[best]
+        self._entries.move_to_end(entry_id)
+        self.hits += 1
+        return self._entries[entry_id][1]
+
+    def store(self, profile_type: str, context: Dict[str, Any], question: str, answer: str) -> None:
+        key = self.bucket_key(profile_type, context)
+        bucket = self._buckets.setdefault(key, _Bucket(self.dim))
+        vector = self._tf_vector(question)
+
+        entry_id = self._next_id
+        self._next_id += 1
+        bucket.ids.append(entry_id)
+        bucket.vectors = np.vstack([bucket.vectors, vector])
+        self._entries[entry_id] = (key, answer)
+        self._df += vector != 0
+        self._docs += 1
+        self.stores += 1
+
+        if len(bucket.ids) > self.max_per_bucket:
+            # Dentro del grupo se expulsa la menos usada recientemente
+            self._evict(next(eid for eid, (k, _) in self._entries.items() if k == key))
+        while len(self._entries) > self.max_entries:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, entry_id: int) -> None:
+        key, _ = self._entries.pop(entry_id)
+        bucket = self._buckets[key]
+        index = bucket.ids.index(entry_id)
+        self._df -= bucket.vectors[index] != 0
+        self._docs -= 1
+        bucket.ids.pop(index)
+        bucket.vectors = np.delete(bucket.vectors, index, axis=0)
+        if not bucket.ids:
+            del self._buckets[key]
+        self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "buckets": len(self._buckets),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+
+answer_cache = SemanticAnswerCache()
@@ -0,0 +1,252 @@
+import asyncio
+import codecs
+import csv
+import io
+import logging
+import os
+import unicodedata
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.models.industrial_asset import IndustrialAsset
+from app.schemas.industrial_asset import IndustrialAssetCreate
+from app.services.plant_summary import plant_summary
+
+logger = logging.getLogger("app")
+
+EXTENSIONS = {".csv": "csv", ".txt": "csv", ".xlsx": "xlsx", ".xlsm": "xlsx"}
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+}
+FIELDS = tuple(IndustrialAssetCreate.model_fields)
+REQUIRED = tuple(name for name, field in IndustrialAssetCreate.model_fields.items() if field.is_required())
+TEXT_FIELDS = ("name", "asset_type", "location")
+NUMERIC_FIELDS = (
+    "nominal_power_kw", "efficiency_percentage", "load_factor", "power_factor",
+    "daily_usage_hours", "op_days_per_month",
+)
+# Encabezados en español aceptados (ya normalizados: minúsculas, sin tildes, "_" por espacios)
+ALIASES = {
+    "nombre": "name",
+    "tipo": "asset_type",
+    "potencia_kw": "nominal_power_kw",
+    "potencia_nominal_kw": "nominal_power_kw",
+    "eficiencia": "efficiency_percentage",
+    "factor_carga": "load_factor",
+    "factor_de_carga": "load_factor",
+    "factor_potencia": "power_factor",
+    "factor_de_potencia": "power_factor",
+    "horas_dia": "daily_usage_hours",
+    "horas_uso_diario": "daily_usage_hours",
+    "dias_mes": "op_days_per_month",
+    "dias_operacion_mes": "op_days_per_month",
+    "ubicacion": "location",
+    "zona": "location",
+}
+SNIFF_BYTES = 64 * 1024
+
+# (línea del archivo, valores de la fila por campo del esquema)
+Row = Tuple[int, Dict[str, Any]]
+
+
+class AssetImportError(ValueError):
+    """El archivo no se puede importar (formato, codificación o columnas)."""
+
+
+def _normalize_header(value: Any) -> str:
+    text = unicodedata.normalize("NFKD", str(value or "")).encode("ascii", "ignore").decode()
+    text = "_".join(text.strip().lower().replace("-", " ").split())
+    return ALIASES.get(text, text)
+
+
+class AssetImporter:
+    """
+    Importación masiva del inventario de activos industriales desde CSV o Excel (.xlsx).
+
+    El archivo se recorre fila a fila (csv.reader sobre el upload, que Starlette ya
+    guarda en disco pasado el primer MB; openpyxl en modo read_only) y se procesa por
+    chunks: cada chunk se lee y se valida contra IndustrialAssetCreate en un hilo (el
+    parseo no bloquea el event loop), y en el loop las filas válidas se insertan con un
+    solo INSERT multi-fila ... RETURNING y sus deltas se aplican a plant_summaries. Las filas inválidas se reportan con su número de línea y no
+    detienen la importación. La memoria depende del chunk, no del tamaño del archivo.
+
+    Todo ocurre en una transacción: un error del archivo a mitad de camino (codificación,
+    Excel corrupto) o de la base de datos deshace la importación completa.
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None, max_errors: Optional[int] = None):
+        settings = get_settings()
+        self.chunk_size = chunk_size or settings.asset_import_chunk_size
+        self.max_errors = max_errors if max_errors is not None else settings.asset_import_max_errors
+
+    @staticmethod
+    def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+        fmt = EXTENSIONS.get(os.path.splitext(filename or "")[1].lower()) or CONTENT_TYPES.get(content_type or "")
+        if fmt is None:
+            raise AssetImportError("Formato no soportado: use un archivo .csv o .xlsx")
+        return fmt
+
+    # --- Lectura del archivo ---
+
+    @staticmethod
+    def _columns(header: Sequence[Any]) -> List[Optional[str]]:
+        """Campo del esquema de cada columna (None para las columnas desconocidas)."""
+        columns = [_normalize_header(value) for value in header]
+        columns = [column if column in FIELDS else None for column in columns]
+        missing = [field for field in REQUIRED if field not in columns]
+        if missing:
+            raise AssetImportError(f"Faltan columnas obligatorias: {', '.join(missing)}")
+        return columns
+
+    @staticmethod
+    def _record(columns: Sequence[Optional[str]], values: Sequence[Any]) -> Dict[str, Any]:
+        record = {}
+        # Las filas del CSV pueden traer menos (o más) celdas que la cabecera
+        for column, value in zip(columns, values, strict=False):
+            if column is None:
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+                if column in NUMERIC_FIELDS and "," in value and "." not in value:
+                    value = value.replace(",", ".")  # decimal con coma (Excel en español)
+            elif value is not None and column in TEXT_FIELDS:
+                # Excel entrega como número los códigos o nombres numéricos
+                value = str(int(value) if isinstance(value, float) and value.is_integer() else value)
+            if value is None or value == "":
+                continue  # celda vacía: se usa el valor por defecto del esquema
+            record[column] = value
+        return record
+
+    def _csv_rows(self, file: BinaryIO) -> Iterator[Row]:
+        sample = file.read(SNIFF_BYTES)
+        file.seek(0)
+        try:
+            # Decodificador incremental: un carácter cortado al final de la muestra no es error
+            text_sample = codecs.getincrementaldecoder("utf-8-sig")().decode(sample, final=False)
+            encoding = "utf-8-sig"
+        except UnicodeDecodeError:
+            text_sample, encoding = sample.decode("cp1252", errors="replace"), "cp1252"  # CSV de Excel en Windows
+        try:
+            dialect = csv.Sniffer().sniff(text_sample[:8192], delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+
+        text = io.TextIOWrapper(file, encoding=encoding, newline="")
+        try:
+            reader = csv.reader(text, dialect)
+            header = next(reader, None)
+            if header is None:
+                raise AssetImportError("El archivo está vacío")
+            columns = self._columns(header)
+            for values in reader:
+                yield reader.line_num, self._record(columns, values)
+        except (UnicodeDecodeError, csv.Error) as e:
+            raise AssetImportError(f"No se pudo leer el CSV: {e}") from e
+        finally:
+            text.detach()  # el archivo lo cierra quien lo abrió
+
+    def _xlsx_rows(self, file: BinaryIO) -> Iterator[Row]:
+        """Primera hoja del libro (openpyxl en modo read_only)."""
+        import openpyxl  # import diferido: solo lo cargan las importaciones de Excel
+        try:
+            workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+        except Exception as e:
+            raise AssetImportError(f"No se pudo leer el archivo Excel: {e}") from e
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                raise AssetImportError("El archivo está vacío")
+            columns = self._columns(header)
+            for number, values in enumerate(rows, start=2):
+                yield number, self._record(columns, values)
+        finally:
+            workbook.close()
+
+    # --- Validación e inserción ---
+
+    @staticmethod
+    def _validate(rows: Sequence[Row]) -> Tuple[List[IndustrialAssetCreate], List[Dict[str, Any]]]:
+        valid, errors = [], []
+        for number, record in rows:
+            try:
+                valid.append(IndustrialAssetCreate.model_validate(record))
+            except ValidationError as e:
+                errors.append({
+                    "row": number,
+                    "errors": [
+                        {"field": ".".join(str(part) for part in error["loc"]) or "row", "message": error["msg"]}
+                        for error in e.errors()
+                    ],
+                })
+        return valid, errors
+
+    def _next_chunk(self, rows: Iterator[Row]) -> Tuple[int, List[IndustrialAssetCreate], List[Dict[str, Any]]]:
+        """Lee y valida el siguiente chunk (se ejecuta en un hilo); (filas leídas, válidas, errores)."""
+        chunk = list(islice(rows, self.chunk_size))
+        valid, errors = self._validate(chunk)
+        return len(chunk), valid, errors
+
+    async def insert_assets(
+        self, db: AsyncSession, user_id: int, assets: Sequence[IndustrialAssetCreate]
+    ) -> List[IndustrialAsset]:
+        """
+        Inserta los activos con un INSERT multi-fila ... RETURNING (ids y timestamps sin un
+        refresh por activo) y aplica sus deltas a plant_summaries; no hace commit.
+        """
+        if not assets:
+            return []
+        result = await db.execute(
+            insert(IndustrialAsset).returning(IndustrialAsset, sort_by_parameter_order=True),
+            [{**asset.model_dump(), "user_id": user_id} for asset in assets],
+        )
+        created = list(result.scalars())
+        # El INSERT masivo no pasa por el flush: el listener de la proyección no lo ve
+        deltas = plant_summary.asset_deltas(created)
+        await db.run_sync(lambda session: plant_summary.apply(session.connection(), deltas))
+        return created
+
+    async def import_rows(self, db: AsyncSession, user_id: int, rows: Iterable[Row]) -> Dict[str, Any]:
+        """Valida e inserta las filas por chunks y hace commit; devuelve el reporte."""
+        report: Dict[str, Any] = {"rows": 0, "inserted": 0, "rejected": 0, "errors": [], "errors_truncated": False}
+        rows = ((number, record) for number, record in rows if record)  # sin filas en blanco
+        try:
+            while True:
+                # Lectura y validación fuera del loop; solo el INSERT corre en él
+                count, valid, errors = await asyncio.to_thread(self._next_chunk, rows)
+                if not count:
+                    break
+                await self.insert_assets(db, user_id, valid)
+                report["rows"] += count
+                report["inserted"] += len(valid)
+                report["rejected"] += len(errors)
+                room = max(self.max_errors - len(report["errors"]), 0)
+                report["errors"].extend(errors[:room])
+                report["errors_truncated"] |= len(errors) > room
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        logger.info(f"Asset import for user {user_id}: {report['inserted']} inserted, {report['rejected']} rejected")
+        return report
+
+    async def import_file(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        file: BinaryIO,
+        filename: Optional[str],
+        content_type: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        fmt = self.detect_format(filename, content_type)
+        rows = self._xlsx_rows(file) if fmt == "xlsx" else self._csv_rows(file)
+        return await self.import_rows(db, user_id, rows)
+
+
+asset_importer = AssetImporter()
@@ -0,0 +1,146 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.industrial_asset import IndustrialAsset
+from app.services.industrial import IndustrialService
+
+# Columnas que se pueden pedir con fields=, más las calculadas con la física de la planta
+COLUMNS = (
+    "id", "name", "asset_type", "nominal_power_kw", "efficiency_percentage", "load_factor",
+    "power_factor", "daily_usage_hours", "op_days_per_month", "location", "created_at", "updated_at",
+)
+COMPUTED = ("real_kw", "monthly_kwh", "waste_kwh")
+FIELDS = COLUMNS + COMPUTED
+# location: (location, id) ascendente, sobre el índice (user_id, location);
+# waste: kWh desperdiciados/mes descendente, id ascendente para desempatar
+SORTS = ("location", "waste")
+
+
+class AssetListingError(ValueError):
+    """Parámetros de la consulta inválidos (campos, orden o cursor)."""
+
+
+class AssetListing:
+    """
+    Listado paginado de los activos de una planta con keyset (seek) pagination.
+
+    Cada página continúa después de la clave de orden de la última fila de la anterior,
+    que viaja en un cursor opaco (JSON en base64); el costo de una página no crece con
+    su posición, a diferencia de OFFSET. Los filtros (tipo, ubicación, rango de
+    eficiencia) y el orden se resuelven en SQL, y solo se seleccionan las columnas
+    pedidas con `fields` (más el id y la clave de orden). Los campos calculados usan las
+    mismas expresiones SQL del dashboard (IndustrialService.consumption_columns).
+    """
+
+    @staticmethod
+    def encode_cursor(sort: str, key: Sequence[Any]) -> str:
+        raw = json.dumps({"sort": sort, "key": list(key)}, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str, sort: str) -> List[Any]:
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            key = data["key"]
+            valid = data["sort"] == sort and isinstance(key, list) and len(key) == 2 and isinstance(key[1], int)
+        except (binascii.Error, ValueError, KeyError, TypeError):
+            valid = False
+        if not valid:
+            raise AssetListingError("Cursor inválido para este orden")
+        return key
+
+    @staticmethod
+    def parse_fields(fields: Optional[str]) -> List[str]:
+        """Campos pedidos ("name,waste_kwh"); sin `fields`, todas las columnas del activo."""
+        if not fields:
+            return list(COLUMNS)
+        names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        unknown = [name for name in names if name not in FIELDS]
+        if unknown:
+            raise AssetListingError(f"Campos desconocidos: {', '.join(unknown)}")
+        return names if "id" in names else ["id", *names]
+
+    @staticmethod
+    def _after(sort: str, key: Sequence[Any], sort_column: Any):
+        """Condición de las filas que van después de la clave `key`."""
+        value, last_id = key
+        if sort == "waste":
+            return or_(sort_column < value, and_(sort_column == value, IndustrialAsset.id > last_id))
+        # ORDER BY location ASC deja los NULL primero (SQLite y el NULLS FIRST explícito)
+        if value is None:
+            return or_(sort_column.is_not(None), and_(sort_column.is_(None), IndustrialAsset.id > last_id))
+        return or_(sort_column > value, and_(sort_column == value, IndustrialAsset.id > last_id))
+
+    def query(
+        self,
+        user_id: int,
+        fields: Sequence[str],
+        sort: str = "location",
+        asset_type: Optional[str] = None,
+        location: Optional[str] = None,
+        min_efficiency: Optional[float] = None,
+        max_efficiency: Optional[float] = None,
+        after: Optional[Sequence[Any]] = None,
+        limit: int = 50,
+    ):
+        if sort not in SORTS:
+            raise AssetListingError(f"Orden no soportado: {sort} (use {' o '.join(SORTS)})")
+        computed = dict(zip(COMPUTED, IndustrialService.consumption_columns(), strict=True))
+        sort_column = computed["waste_kwh"] if sort == "waste" else IndustrialAsset.location
+
+        selected = [
+            computed[name].label(name) if name in computed else getattr(IndustrialAsset, name) for name in fields
+        ]
+        query = select(*selected, sort_column.label("sort_key")).where(IndustrialAsset.user_id == user_id)
+        if asset_type:
+            query = query.where(IndustrialAsset.asset_type == asset_type)
+        if location:
+            query = query.where(IndustrialAsset.location == location)
+        # Eficiencia sin registrar (o en 0) cuenta como el 85 % por defecto, igual que en la física
+        efficiency = IndustrialService.efficiency_column()
+        if min_efficiency is not None:
+            query = query.where(efficiency >= min_efficiency)
+        if max_efficiency is not None:
+            query = query.where(efficiency <= max_efficiency)
+        if after is not None:
+            query = query.where(self._after(sort, after, sort_column))
+
+        if sort == "waste":
+            query = query.order_by(sort_column.desc(), IndustrialAsset.id)
+        else:
+            query = query.order_by(sort_column.asc().nulls_first(), IndustrialAsset.id)
+        # Una fila de más indica si hay página siguiente
+        return query.limit(limit + 1)
+
+    async def page(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        fields: Optional[str] = None,
+        sort: str = "location",
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        **filters: Any,
+    ) -> Dict[str, Any]:
+        """Una página de activos y el cursor de la siguiente (None en la última)."""
+        names = self.parse_fields(fields)
+        after = self.decode_cursor(cursor, sort) if cursor else None
+        rows = (await db.execute(self.query(user_id, names, sort, after=after, limit=limit, **filters))).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_cursor(sort, [rows[-1].sort_key, rows[-1].id])
+        items = [
+            {name: round(row._mapping[name], 2) if name in COMPUTED else row._mapping[name] for name in names}
+            for row in rows
+        ]
+        return {"items": items, "next_cursor": next_cursor, "limit": limit}
+
+
+asset_listing = AssetListing()
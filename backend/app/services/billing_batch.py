@@ -0,0 +1,218 @@
+import csv
+import logging
+import os
+import time
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import and_, func, select
+
+from app.core.config import get_settings
+from app.core.energy_logic import EnergyCalculators
+from app.core.tariffs import get_tariff_engine
+from app.db.session import get_async_session
+from app.models.residential import ConsumptionReading, ResidentialAsset, ResidentialProfile
+from app.services.standby import standby_model
+
+logger = logging.getLogger("app")
+
+OUTPUT_FORMATS = ("csv", "parquet")
+
+COLUMNS = (
+    "user_id", "stratum", "city", "kwh", "kwh_source", "tariff_kwh", "bill_cop",
+    "subsidy_percent", "tariff_type", "identified_kwh", "leak_kwh", "leak_cost_cop",
+    "standby_kwh", "standby_cost_cop",
+    "stratum_avg_kwh", "diff_vs_stratum_percent",
+)
+
+
+class _CsvSink:
+    def __init__(self, path: str):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+
+    def write(self, columns: Dict[str, np.ndarray]) -> None:
+        self._writer.writerows(zip(*(columns[c].tolist() for c in COLUMNS), strict=True))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class _ParquetSink:
+    """Un row group por chunk; requiere pyarrow (dependencia opcional)."""
+
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("La salida Parquet requiere pyarrow: pip install pyarrow") from e
+        self._pa, self._pq = pa, pq
+        self._path = path
+        self._writer = None
+
+    def write(self, columns: Dict[str, np.ndarray]) -> None:
+        table = self._pa.table({c: columns[c] for c in COLUMNS})
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+class PortfolioBillingJob:
+    """
+    Facturación estimada mensual de toda la cartera residencial.
+
+    Una sola consulta recorre los perfiles con un cursor del lado del servidor
+    (yield_per) junto con la última lectura, el consumo identificado por equipos y el
+    standby (vampiro) de cada usuario; cada chunk se valora con operaciones vectorizadas
+    (tarifa vigente en el mes facturado, subsidio, fugas, standby, comparación con el
+    estrato) y se escribe de inmediato al archivo de salida. La memoria no crece con el
+    número de usuarios.
+
+    El consumo del mes sigue el mismo orden que el dashboard: promedio capturado del
+    perfil, última lectura diaria x 30, factura promedio / tarifa. Las fugas son el
+    consumo no explicado por los equipos registrados (0 si no hay equipos).
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None, fmt: str = "csv"):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Formato no soportado: {fmt}")
+        self.chunk_size = chunk_size or get_settings().billing_batch_chunk_size
+        self.fmt = fmt
+
+    @staticmethod
+    def _query():
+        latest = (
+            select(
+                ConsumptionReading.user_id,
+                ConsumptionReading.reading_value,
+                func.row_number().over(
+                    partition_by=ConsumptionReading.user_id,
+                    order_by=(ConsumptionReading.date.desc(), ConsumptionReading.id.desc()),
+                ).label("rn"),
+            )
+            .subquery()
+        )
+        identified = (
+            select(
+                ResidentialAsset.user_id,
+                func.sum(ResidentialAsset.power_watts * ResidentialAsset.daily_hours * 30 / 1000.0).label("kwh"),
+            )
+            .group_by(ResidentialAsset.user_id)
+            .subquery()
+        )
+        standby = standby_model.subquery()
+        return (
+            select(
+                ResidentialProfile.user_id,
+                ResidentialProfile.stratum,
+                ResidentialProfile.city,
+                ResidentialProfile.average_kwh_captured,
+                ResidentialProfile.monthly_bill_avg,
+                latest.c.reading_value,
+                identified.c.kwh.label("identified_kwh"),
+                standby.c.standby_kwh,
+            )
+            .outerjoin(latest, and_(latest.c.user_id == ResidentialProfile.user_id, latest.c.rn == 1))
+            .outerjoin(identified, identified.c.user_id == ResidentialProfile.user_id)
+            .outerjoin(standby, standby.c.user_id == ResidentialProfile.user_id)
+            .order_by(ResidentialProfile.user_id)
+        )
+
+    @staticmethod
+    def _floats(values: Sequence[Optional[float]]) -> np.ndarray:
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+    def bill_chunk(self, rows: List[Any], billing_date: datetime) -> Dict[str, np.ndarray]:
+        """Valora un chunk de filas (perfil + última lectura + kWh identificados) en columnas."""
+        stratum = np.array([r.stratum if r.stratum is not None else 3 for r in rows], dtype=np.int64)
+        profile_kwh = self._floats([r.average_kwh_captured for r in rows])
+        reading = self._floats([r.reading_value for r in rows])
+        bill_avg = self._floats([r.monthly_bill_avg for r in rows])
+        identified = np.nan_to_num(self._floats([r.identified_kwh for r in rows]))
+        standby = np.nan_to_num(self._floats([r.standby_kwh for r in rows]))
+
+        tariffs = get_tariff_engine()
+        price = tariffs.prices(stratum, [billing_date])
+        has_profile = profile_kwh > 0
+        has_reading = ~np.isnan(reading)
+        has_bill = bill_avg > 0
+        kwh = np.select(
+            [has_profile, has_reading, has_bill],
+            [profile_kwh, reading * 30, bill_avg / price],
+            default=0.0,
+        )
+        leak_kwh = np.where(identified > 0, np.maximum(kwh - identified, 0.0), 0.0)
+
+        # Subsidio de la misma versión de tarifa (mes y estrato) con la que se valoró el consumo
+        subsidy = tariffs.subsidies(stratum, [billing_date])
+        comparison = EnergyCalculators.calculate_stratum_comparison_array(kwh, stratum)
+        return {
+            "user_id": np.array([r.user_id for r in rows], dtype=np.int64),
+            "stratum": stratum,
+            "city": np.array([r.city or "" for r in rows], dtype=object),
+            "kwh": np.round(kwh, 1),
+            "kwh_source": np.select(
+                [has_profile, has_reading, has_bill], ["profile", "reading", "bill"], default="none"
+            ).astype(object),
+            "tariff_kwh": price,
+            "bill_cop": np.round(kwh * price).astype(np.int64),
+            "subsidy_percent": subsidy * 100,
+            "tariff_type": np.where(
+                subsidy < 0, "Subsidiada", np.where(subsidy > 0, "Contribución", "Plena")
+            ).astype(object),
+            "identified_kwh": np.round(identified, 1),
+            "leak_kwh": np.round(leak_kwh, 1),
+            "leak_cost_cop": np.round(leak_kwh * price).astype(np.int64),
+            "standby_kwh": np.round(standby, 2),
+            "standby_cost_cop": np.round(standby * price).astype(np.int64),
+            "stratum_avg_kwh": comparison["promedio_estrato_kwh"],
+            "diff_vs_stratum_percent": comparison["diferencia_porcentaje"],
+        }
+
+    async def run(self, output_path: str, billing_month: Optional[date] = None) -> Dict[str, Any]:
+        """Factura toda la cartera y escribe el resultado en `output_path`; devuelve el reporte."""
+        billing_month = billing_month or date.today().replace(day=1)
+        # Tarifa del mes facturado: la vigente el primer día (mediodía UTC, lejos del cambio de fecha local)
+        billing_date = datetime(billing_month.year, billing_month.month, 1, 12, tzinfo=timezone.utc)
+
+        partial_path = f"{output_path}.part"
+        sink = _ParquetSink(partial_path) if self.fmt == "parquet" else _CsvSink(partial_path)
+        stats: Dict[str, Any] = {"rows": 0, "chunks": 0, "total_bill_cop": 0, "total_leak_cost_cop": 0}
+        sources: Counter = Counter()
+        start = time.monotonic()
+
+        try:
+            async for db in get_async_session():
+                result = await db.stream(self._query().execution_options(yield_per=self.chunk_size))
+                async for rows in result.partitions(self.chunk_size):
+                    columns = self.bill_chunk(rows, billing_date)
+                    sink.write(columns)
+                    stats["rows"] += len(rows)
+                    stats["chunks"] += 1
+                    stats["total_bill_cop"] += int(columns["bill_cop"].sum())
+                    stats["total_leak_cost_cop"] += int(columns["leak_cost_cop"].sum())
+                    sources.update(columns["kwh_source"].tolist())
+                    elapsed = time.monotonic() - start
+                    logger.info(f"Billing: {stats['rows']} rows ({stats['rows'] / elapsed:.0f} rows/s)")
+        finally:
+            sink.close()
+        # El archivo final solo aparece completo
+        os.replace(partial_path, output_path)
+
+        elapsed = time.monotonic() - start
+        return {
+            **stats,
+            "billing_month": billing_month.strftime("%Y-%m"),
+            "kwh_sources": dict(sources),
+            "elapsed_seconds": round(elapsed, 2),
+            "rows_per_second": round(stats["rows"] / elapsed) if elapsed > 0 else None,
+            "output": output_path,
+        }
@@ -0,0 +1,136 @@
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.session import get_async_session
+from app.models.chat import ChatConversation, ChatMessage
+from app.services.prompt_builder import estimate_tokens
+
+logger = logging.getLogger("app")
+
+
+class ChatMemory:
+    """
+    Memoria persistente del asistente por usuario y tipo de perfil.
+
+    Los últimos turnos se conservan textuales; los anteriores se comprimen en un resumen
+    rodante (primera oración de cada mensaje, descartando lo más antiguo cuando no cabe).
+    Así el historial que viaja en el prompt nunca supera `token_budget`, sin importar
+    cuánto dure la conversación. La compresión es extractiva: no gasta llamadas al modelo.
+    """
+
+    # Reparto del presupuesto: turnos textuales vs. resumen
+    RECENT_SHARE = 0.6
+    SUMMARY_LINE_CHARS = 200
+
+    def __init__(self, recent_turns: Optional[int] = None, token_budget: Optional[int] = None):
+        settings = get_settings()
+        self.recent_turns = recent_turns or settings.chat_memory_recent_turns
+        self.token_budget = token_budget or settings.chat_memory_token_budget
+        self.recent_budget = int(self.token_budget * self.RECENT_SHARE)
+        self.summary_budget = self.token_budget - self.recent_budget
+
+    async def _conversation(
+        self, db: AsyncSession, user_id: int, profile_type: str
+    ) -> Optional[ChatConversation]:
+        result = await db.execute(
+            select(ChatConversation).where(
+                ChatConversation.user_id == user_id,
+                ChatConversation.profile_type == profile_type,
+            )
+        )
+        return result.scalar_one_or_none()
+
+    async def _recent_messages(self, db: AsyncSession, conversation: ChatConversation) -> List[ChatMessage]:
+        result = await db.execute(
+            select(ChatMessage)
+            .where(
+                ChatMessage.conversation_id == conversation.id,
+                ChatMessage.id > (conversation.summarized_until_id or 0),
+            )
+            .order_by(ChatMessage.id)
+        )
+        return list(result.scalars().all())
+
+    async def load_history(self, db: AsyncSession, user_id: int, profile_type: str) -> Optional[Dict[str, Any]]:
+        """Historial listo para el prompt, o None si es el primer mensaje de la conversación."""
+        conversation = await self._conversation(db, user_id, profile_type)
+        if conversation is None:
+            return None
+        messages = await self._recent_messages(db, conversation)
+        if not messages and not conversation.summary:
+            return None
+        return {
+            "summary": conversation.summary or "",
+            "recent": [[m.role, m.content] for m in messages],
+        }
+
+    async def record_exchange(
+        self, db: AsyncSession, user_id: int, profile_type: str, user_message: str, assistant_message: str
+    ) -> None:
+        """Guarda un turno completo y pliega en el resumen lo que ya no cabe textual."""
+        conversation = await self._conversation(db, user_id, profile_type)
+        if conversation is None:
+            conversation = ChatConversation(user_id=user_id, profile_type=profile_type, summary="", summarized_until_id=0)
+            db.add(conversation)
+            await db.flush()
+
+        db.add_all([
+            ChatMessage(conversation_id=conversation.id, role="user", content=user_message),
+            ChatMessage(conversation_id=conversation.id, role="assistant", content=assistant_message),
+        ])
+        await db.flush()
+
+        messages = await self._recent_messages(db, conversation)
+        folded: List[ChatMessage] = []
+        while messages and (
+            len(messages) > self.recent_turns * 2
+            or estimate_tokens("".join(m.content for m in messages)) > self.recent_budget
+        ):
+            folded.append(messages.pop(0))
+
+        if folded:
+            conversation.summary = self._fold(conversation.summary or "", folded)
+            conversation.summarized_until_id = folded[-1].id
+        await db.commit()
+
+    async def persist_exchange(self, user_id: int, profile_type: str, user_message: str, assistant_message: str) -> None:
+        """Variante con sesión propia para el chat en streaming (la del request ya se cerró)."""
+        try:
+            async for db in get_async_session():
+                await self.record_exchange(db, user_id, profile_type, user_message, assistant_message)
+        except Exception as e:
+            logger.error(f"Error saving {profile_type} chat turn for user {user_id}: {e}")
+
+    async def clear(self, db: AsyncSession, user_id: int, profile_type: str) -> None:
+        conversation = await self._conversation(db, user_id, profile_type)
+        if conversation is None:
+            return
+        # Borrado explícito de mensajes: SQLite no aplica ON DELETE CASCADE sin PRAGMA
+        await db.execute(delete(ChatMessage).where(ChatMessage.conversation_id == conversation.id))
+        await db.execute(delete(ChatConversation).where(ChatConversation.id == conversation.id))
+        await db.commit()
+
+    def _fold(self, summary: str, messages: List[ChatMessage]) -> str:
+        lines = summary.splitlines() if summary else []
+        for m in messages:
+            prefix = "U" if m.role == "user" else "A"
+            lines.append(f"{prefix}: {self._first_sentence(m.content)}")
+        # Resumen rodante: si no cabe, se olvida primero lo más antiguo
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_budget:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def _first_sentence(self, text: str) -> str:
+        text = " ".join(text.split())
+        sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+        if len(sentence) > self.SUMMARY_LINE_CHARS:
+            sentence = sentence[: self.SUMMARY_LINE_CHARS - 1].rstrip() + "…"
+        return sentence
+
+
+chat_memory = ChatMemory()
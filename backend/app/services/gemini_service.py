@@ -1,36 +1,241 @@
 from google import genai
+from google.genai import types
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
 from app.core.config import get_settings
-import json
+from app.core.json_stream import JsonFieldStreamParser
+from app.core.llm_reply import MalformedReplyError, ReplyStats, parse_json_reply
+from app.core.llm_governor import GovernorTimeout, LLMGovernor, Priority, llm_priority
+from app.core.singleflight import SingleFlight
+from app.schemas.ai import (
+    CHAT_REPLY_ADAPTER,
+    HOME_INSIGHTS_ADAPTER,
+    PLANT_INSIGHTS_ADAPTER,
+    ChatReply,
+    HomeInsightsReply,
+    PlantInsightsReply,
+)
+from app.services.answer_cache import answer_cache
+from app.services.insight_rules import rule_based_insights
+from app.services.prompt_builder import compact_json
+from app.services.usage_ledger import usage_ledger
+from pydantic import BaseModel, TypeAdapter
+from typing import AsyncIterator, Dict, Optional, Tuple, Type
+import asyncio
+import hashlib
 import logging
+import time
 
 logger = logging.getLogger("app")
 
 class GeminiService:
+    NOT_CONFIGURED_MESSAGE = "Lo siento, el servicio de IA no está configurado."
+    CHAT_ERROR_MESSAGE = "Tuve un pequeño corto circuito mental. ¿Podrías repetir la pregunta?"
+    CHAT_UNAVAILABLE_MESSAGE = "El asistente está temporalmente saturado. Intenta de nuevo en unos segundos."
+    CHAT_QUOTA_MESSAGE = "Alcanzaste el límite diario de consultas al asistente. Vuelve a intentarlo mañana."
+
     def __init__(self):
         settings = get_settings()
         self.api_key = settings.gemini_api_key
         self.model_name = settings.gemini_model_name
+        self.timeout = settings.gemini_timeout_seconds
+        self.chat_cache_enabled = settings.chat_cache_enabled
+        self.structured_output = settings.gemini_structured_output
+        self.repair_attempts = settings.gemini_reply_repair_attempts
         
         if self.api_key:
             # Nueva librería google-genai usa un cliente centralizado
-            self.client = genai.Client(api_key=self.api_key)
+            http_options = types.HttpOptions(base_url=settings.gemini_base_url) if settings.gemini_base_url else None
+            self.client = genai.Client(api_key=self.api_key, http_options=http_options)
         else:
             self.client = None
             logger.warning("Gemini API Key not found. AI features will be disabled.")
 
-    async def get_dashboard_insights(self, plant_data: dict) -> dict:
+        # Llamadas idénticas concurrentes (varias pestañas, reintentos del frontend)
+        # comparten una única petición en vuelo.
+        self._singleflight = SingleFlight()
+        # Si Gemini está lento o caído, el circuito se abre y los dashboards pasan
+        # directamente al generador por reglas sin esperar el timeout.
+        self._breaker = CircuitBreaker(
+            name="gemini",
+            window_size=settings.gemini_breaker_window,
+            min_calls=settings.gemini_breaker_min_calls,
+            failure_rate_threshold=settings.gemini_breaker_failure_rate,
+            slow_call_seconds=settings.gemini_breaker_slow_call_seconds,
+            open_seconds=settings.gemini_breaker_open_seconds,
+        )
+        # Tope global de llamadas simultáneas y por segundo; el chat pasa antes que los
+        # dashboards y éstos antes que los refrescos en segundo plano.
+        self._governor = LLMGovernor(
+            max_concurrency=settings.llm_max_concurrency,
+            rate_per_second=settings.llm_rate_per_second,
+            burst=settings.llm_rate_burst,
+            max_wait={
+                Priority.INTERACTIVE: settings.llm_max_wait_interactive_seconds,
+                Priority.DASHBOARD: settings.llm_max_wait_dashboard_seconds,
+                Priority.BACKGROUND: settings.llm_max_wait_background_seconds,
+            },
+        )
+        # Tasa de respuestas que no cumplen su esquema (y cuántas se recuperan con la reparación)
+        self._replies = ReplyStats()
+        self._json_configs: Dict[type, types.GenerateContentConfig] = {}
+
+    def _prompt_key(self, prompt: str) -> str:
+        """Hash estable del modelo + prompt usado para coalescer peticiones."""
+        return hashlib.sha256(f"{self.model_name}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    async def _generate(
+        self,
+        prompt: str,
+        priority: Optional[Priority] = None,
+        *,
+        user_id: Optional[int] = None,
+        endpoint: str = "generate",
+        config: Optional[types.GenerateContentConfig] = None,
+    ) -> str:
+        """
+        Ejecuta generate_content y devuelve el texto de la respuesta.
+        Los llamadores concurrentes con el mismo prompt esperan la misma llamada.
+        Lanza CircuitOpenError sin tocar la red si el circuito está abierto y
+        GovernorTimeout si la cola del gobernador supera la espera de su prioridad.
+        Cada llamada queda registrada en el ledger de uso del usuario; quien esperó la
+        llamada de otro queda como "coalesced", sin cobrarle una llamada que no hizo.
+        """
+        priority = llm_priority.get() if priority is None else priority
+        led = False  # solo el líder de single-flight ejecuta su propio `call`
+
+        async def provider_call() -> str:
+            response = await self.client.aio.models.generate_content(
+                model=self.model_name,
+                contents=prompt,
+                config=config,
+            )
+            return response.text
+
+        async def call() -> str:
+            nonlocal led
+            led = True
+            # Con el circuito abierto no tiene sentido hacer cola
+            if self._breaker.state == CircuitBreaker.OPEN:
+                raise CircuitOpenError("gemini circuit is open")
+            async with self._governor.slot(priority):
+                return await self._breaker.call(provider_call, timeout=self.timeout)
+
+        start = time.monotonic()
+        outcome, text = "ok", ""
+        try:
+            text = await self._singleflight.do(self._prompt_key(prompt), call)
+            return text
+        except CircuitOpenError:
+            outcome = "circuit_open"
+            raise
+        except GovernorTimeout:
+            outcome = "queue_timeout"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            if not led and outcome in ("ok", "error"):
+                outcome = "coalesced"
+            self._record_usage(user_id, endpoint, outcome, prompt, text or "", time.monotonic() - start)
+
+    def _json_config(self, schema: Type[BaseModel]) -> Optional[types.GenerateContentConfig]:
+        """Config de salida estructurada: el modelo responde JSON que cumple `schema`."""
+        if not self.structured_output:
+            return None
+        if schema not in self._json_configs:
+            self._json_configs[schema] = types.GenerateContentConfig(
+                response_mime_type="application/json", response_schema=schema
+            )
+        return self._json_configs[schema]
+
+    @staticmethod
+    def _repair_prompt(prompt: str, error: MalformedReplyError) -> str:
+        return f"""{prompt}
+
+        TU RESPUESTA ANTERIOR NO CUMPLIÓ EL ESQUEMA JSON ({error.detail}):
+        {error.text[:1500]}
+
+        Responde de nuevo ÚNICAMENTE con el objeto JSON corregido, sin texto adicional.
+        """
+
+    async def _generate_structured(
+        self,
+        prompt: str,
+        schema: Type[BaseModel],
+        adapter: TypeAdapter,
+        priority: Optional[Priority] = None,
+        *,
+        user_id: Optional[int] = None,
+        endpoint: str = "generate",
+    ) -> BaseModel:
+        """
+        Llama a Gemini declarando el esquema de respuesta y valida el JSON devuelto.
+        Solo si la respuesta no cumple el esquema se pide una reparación (acotada por
+        `repair_attempts`); los errores del proveedor se propagan sin reintentar.
+        Lanza MalformedReplyError si ni la reparación produce un JSON válido.
+        """
+        config = self._json_config(schema)
+        text = await self._generate(prompt, priority, user_id=user_id, endpoint=endpoint, config=config)
+        try:
+            reply = parse_json_reply(text, adapter)
+            self._replies.record(endpoint, "valid")
+            return reply
+        except MalformedReplyError as e:
+            self._replies.record(endpoint, "malformed")
+            logger.warning(f"Malformed Gemini reply for {endpoint}: {e.detail}")
+            error = e
+
+        for _ in range(self.repair_attempts):
+            text = await self._generate(
+                self._repair_prompt(prompt, error), priority, user_id=user_id, endpoint=endpoint, config=config
+            )
+            try:
+                reply = parse_json_reply(text, adapter)
+                self._replies.record(endpoint, "repaired")
+                return reply
+            except MalformedReplyError as e:
+                error = e
+
+        self._replies.record(endpoint, "unrepaired")
+        raise error
+
+    def _record_usage(
+        self, user_id: Optional[int], endpoint: str, outcome: str,
+        prompt: str = "", response: str = "", latency: float = 0.0,
+    ) -> None:
+        usage_ledger.record(
+            user_id=user_id, endpoint=endpoint, model=self.model_name, outcome=outcome,
+            prompt=prompt, response=response, latency_seconds=latency,
+        )
+
+    def get_stats(self) -> dict:
+        """Contadores de coalescencia, estado del circuito y colas del gobernador."""
+        return {
+            **self._singleflight.stats(),
+            "circuit": self._breaker.stats(),
+            "governor": self._governor.stats(),
+            "answer_cache": answer_cache.stats(),
+            "replies": self._replies.stats(),
+        }
+
+    async def get_dashboard_insights(self, plant_data: dict, user_id: Optional[int] = None) -> dict:
         """
         Analiza los datos de la planta y devuelve insights para el dashboard.
         """
         if not self.client:
-            return {"error": "AI service not configured"}
+            return rule_based_insights.industrial(plant_data)
+
+        if await usage_ledger.is_over_quota(user_id):
+            self._record_usage(user_id, "industrial_insights", "quota")
+            return rule_based_insights.industrial(plant_data)
 
         prompt = f"""
         Eres un experto Senior en Eficiencia Energética Industrial (ISO 50001) para la plataforma Ecco-IA.
         Analiza los datos técnicos de la planta y genera un informe de inteligencia en formato JSON.
         
         CONTEXTO TÉCNICO:
-        {json.dumps(plant_data, indent=2)}
+        {compact_json(plant_data)}
         
         REGLAS DE CÁLCULO:
         1. Waste Score: 0 si todo es perfecto (>95% eficiencia), 100 si hay pérdidas críticas. 
@@ -50,39 +255,35 @@ class GeminiService:
         """
         
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
+            reply = await self._generate_structured(
+                prompt, PlantInsightsReply, PLANT_INSIGHTS_ADAPTER, user_id=user_id, endpoint="industrial_insights"
             )
-            text = response.text
-            
-            # Buscamos el primer '{' y el último '}' para extraer el JSON puro
-            import re
-            json_match = re.search(r'\{.*\}', text, re.DOTALL)
-            if json_match:
-                clean_json = json_match.group(0)
-                return json.loads(clean_json)
-            
-            logger.error(f"Fallo al extraer JSON de la respuesta de Gemini: {text}")
-            return {"error": "Invalid AI response format"}
-            
+            return {**reply.model_dump(), "source": "ai"}
+        except MalformedReplyError as e:
+            logger.error(f"Fallo al extraer JSON de la respuesta de Gemini ({e.detail}): {e.text}")
+        except (CircuitOpenError, GovernorTimeout) as e:
+            logger.info(f"Gemini unavailable ({e}), serving rule-based plant insights")
         except Exception as e:
             logger.error(f"Error calling Gemini: {e}")
-            return {"error": str(e)}
+        return rule_based_insights.industrial(plant_data)
 
-    async def get_residential_insights(self, home_context: dict) -> dict:
+    async def get_residential_insights(self, home_context: dict, user_id: Optional[int] = None) -> dict:
         """
         Analiza los datos del hogar y devuelve insights y misiones gamificadas.
         """
         if not self.client:
-            return {}
+            return rule_based_insights.residential(home_context)
+
+        if await usage_ledger.is_over_quota(user_id):
+            self._record_usage(user_id, "residential_insights", "quota")
+            return rule_based_insights.residential(home_context)
 
         prompt = f"""
         Eres un experto en Eficiencia Energética Residencial para la plataforma Ecco-IA.
         Analiza el contexto del hogar y genera un informe de ahorro en formato JSON.
         
         CONTEXTO DEL HOGAR:
-        {json.dumps(home_context, indent=2)}
+        {compact_json(home_context)}
         
         FORMATO DE RESPUESTA (JSON PURO):
         {{
@@ -96,35 +297,42 @@ class GeminiService:
         }}
         """
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
+            reply = await self._generate_structured(
+                prompt, HomeInsightsReply, HOME_INSIGHTS_ADAPTER, user_id=user_id, endpoint="residential_insights"
             )
-            import re
-            json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group(0))
-            return {}
+            return {**reply.model_dump(exclude_none=True), "source": "ai"}
+        except MalformedReplyError as e:
+            logger.error(f"Invalid Gemini Residential reply ({e.detail}): {e.text}")
+        except (CircuitOpenError, GovernorTimeout) as e:
+            logger.info(f"Gemini unavailable ({e}), serving rule-based home insights")
         except Exception as e:
             logger.error(f"Error calling Gemini Residential: {e}")
-            return {}
+        return rule_based_insights.residential(home_context)
 
-    async def get_chat_response(self, message: str, context: dict, profile_type: str = "residential") -> dict:
-        """
-        Maneja una conversación fluida con el usuario inyectando contexto técnico.
-        """
-        if not self.client:
-            return {"response": "Lo siento, el servicio de IA no está configurado."}
+    @classmethod
+    def is_fallback_reply(cls, text: str) -> bool:
+        """True si la respuesta es un mensaje de servicio y no una respuesta real del modelo."""
+        return text in (
+            cls.NOT_CONFIGURED_MESSAGE, cls.CHAT_ERROR_MESSAGE, cls.CHAT_UNAVAILABLE_MESSAGE, cls.CHAT_QUOTA_MESSAGE
+        )
 
+    @staticmethod
+    def _chat_prompt(message: str, context: dict, profile_type: str, history: Optional[dict] = None) -> str:
         role_desc = "Residencial" if profile_type == "residential" else "Industrial"
-        
-        prompt = f"""
+        history_block = ""
+        if history:
+            history_block = f"""
+        HISTORIAL DE LA CONVERSACIÓN (summary: resumen de turnos anteriores; recent: [rol, mensaje]):
+        {compact_json(history)}
+        """
+
+        return f"""
         Eres el asistente inteligente de Ecco-IA para el sector {role_desc}.
         Tu objetivo es ayudar al usuario a entender sus datos de energía y proponer ahorros.
         
         CONTEXTO ACTUAL DEL USUARIO:
-        {json.dumps(context, indent=2)}
-        
+        {compact_json(context)}
+        {history_block}
         MENSAJE DEL USUARIO:
         {message}
         
@@ -138,19 +346,154 @@ class GeminiService:
         RESPUESTA (JSON):
         {{ "response": "tu respuesta aquí" }}
         """
+
+    async def get_chat_response(
+        self,
+        message: str,
+        context: dict,
+        profile_type: str = "residential",
+        history: Optional[dict] = None,
+        user_id: Optional[int] = None,
+    ) -> dict:
+        """
+        Maneja una conversación fluida con el usuario inyectando contexto técnico.
+        """
+        if not self.client:
+            return {"response": self.NOT_CONFIGURED_MESSAGE}
+
+        # Solo preguntas autocontenidas: un seguimiento ("¿y eso?") depende del historial
+        use_cache = self.chat_cache_enabled and answer_cache.is_standalone(message)
+        if use_cache:
+            cached = answer_cache.lookup(profile_type, context, message)
+            if cached is not None:
+                self._record_usage(user_id, "chat", "cached", response=cached)
+                return {"response": cached}
+
+        if await usage_ledger.is_over_quota(user_id):
+            self._record_usage(user_id, "chat", "quota")
+            return {"response": self.CHAT_QUOTA_MESSAGE}
+
+        prompt = self._chat_prompt(message, context, profile_type, history)
         
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
+            reply = await self._generate_structured(
+                prompt, ChatReply, CHAT_REPLY_ADAPTER, Priority.INTERACTIVE, user_id=user_id, endpoint="chat"
             )
-            import re
-            json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group(0))
-            return {"response": response.text}
+            if use_cache:
+                answer_cache.store(profile_type, context, message, reply.response)
+            return reply.model_dump()
+        except MalformedReplyError as e:
+            # Un texto libre sigue siendo una respuesta útil para el usuario
+            if e.text and e.text.strip():
+                return {"response": e.text.strip()}
+            return {"response": self.CHAT_ERROR_MESSAGE}
+        except (CircuitOpenError, GovernorTimeout):
+            return {"response": self.CHAT_UNAVAILABLE_MESSAGE}
         except Exception as e:
             logger.error(f"Error in Gemini Chat: {e}")
-            return {"response": "Tuve un pequeño corto circuito mental. ¿Podrías repetir la pregunta?"}
+            return {"response": self.CHAT_ERROR_MESSAGE}
+
+    async def stream_chat_response(
+        self,
+        message: str,
+        context: dict,
+        profile_type: str = "residential",
+        history: Optional[dict] = None,
+        user_id: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[str, str]]:
+        """
+        Variante en streaming del chat: produce eventos ("token", delta) a medida que
+        el modelo genera y un evento final ("done", respuesta completa).
+        El JSON de la respuesta se decodifica de forma incremental, sin esperar al cierre.
+        """
+        if not self.client:
+            yield "done", self.NOT_CONFIGURED_MESSAGE
+            return
+
+        use_cache = self.chat_cache_enabled and answer_cache.is_standalone(message)
+        if use_cache:
+            cached = answer_cache.lookup(profile_type, context, message)
+            if cached is not None:
+                self._record_usage(user_id, "chat_stream", "cached", response=cached)
+                yield "token", cached
+                yield "done", cached
+                return
+
+        if await usage_ledger.is_over_quota(user_id):
+            self._record_usage(user_id, "chat_stream", "quota")
+            yield "done", self.CHAT_QUOTA_MESSAGE
+            return
+
+        if self._breaker.state == CircuitBreaker.OPEN:
+            self._record_usage(user_id, "chat_stream", "circuit_open")
+            yield "done", self.CHAT_UNAVAILABLE_MESSAGE
+            return
+
+        try:
+            await self._governor.acquire(Priority.INTERACTIVE)
+        except GovernorTimeout:
+            self._record_usage(user_id, "chat_stream", "queue_timeout")
+            yield "done", self.CHAT_UNAVAILABLE_MESSAGE
+            return
+
+        try:
+            async for event in self._stream_chat(message, context, profile_type, history, use_cache, user_id):
+                yield event
+        finally:
+            # El cupo se mantiene mientras dure el stream: es una llamada en vuelo
+            self._governor.release()
+
+    async def _stream_chat(
+        self,
+        message: str,
+        context: dict,
+        profile_type: str,
+        history: Optional[dict],
+        use_cache: bool,
+        user_id: Optional[int],
+    ) -> AsyncIterator[Tuple[str, str]]:
+        if not self._breaker.allow_request():
+            self._record_usage(user_id, "chat_stream", "circuit_open")
+            yield "done", self.CHAT_UNAVAILABLE_MESSAGE
+            return
+
+        prompt = self._chat_prompt(message, context, profile_type, history)
+        parser = JsonFieldStreamParser("response")
+        start = time.monotonic()
+        recorded = False
+
+        try:
+            stream = await asyncio.wait_for(
+                self.client.aio.models.generate_content_stream(
+                    model=self.model_name, contents=prompt, config=self._json_config(ChatReply)
+                ),
+                timeout=self.timeout,
+            )
+            async for chunk in stream:
+                if not recorded:
+                    # La salud del proveedor se mide por el tiempo al primer token
+                    self._breaker.record_success(time.monotonic() - start)
+                    recorded = True
+                delta = parser.feed(chunk.text or "")
+                if delta:
+                    yield "token", delta
+        except Exception as e:
+            logger.error(f"Error in Gemini Chat stream: {e}")
+            if not recorded:
+                self._breaker.record_failure(time.monotonic() - start)
+            self._record_usage(user_id, "chat_stream", "error", prompt, latency=time.monotonic() - start)
+            yield "error", self.CHAT_ERROR_MESSAGE
+            return
+        finally:
+            if not recorded:
+                self._breaker.release()
+
+        answer = parser.result().get("response", "")
+        # Los tokens ya se enviaron: aquí no hay reparación posible, solo se mide
+        self._replies.record("chat_stream", "valid" if parser.matched and answer else "malformed")
+        self._record_usage(user_id, "chat_stream", "ok", prompt, answer, time.monotonic() - start)
+        if use_cache and answer:
+            answer_cache.store(profile_type, context, message, answer)
+        yield "done", answer
 
 gemini_service = GeminiService()
@@ -1,9 +1,15 @@
-from typing import List, Dict, Any, Optional
-from sqlalchemy import select
+import logging
+from functools import partial
+from typing import AsyncIterator, Iterable, List, Dict, Any, Optional, Tuple
+from sqlalchemy import case, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.industrial_asset import IndustrialAsset
 from app.models.industrial_settings import IndustrialSettings
 from app.services.gemini_service import gemini_service
+from app.services.insight_store import insight_store
+from app.services.plant_summary import PLANT_TOTAL, plant_summary
+
+logger = logging.getLogger("app")
 
 class IndustrialService:
     """
@@ -12,11 +18,8 @@ class IndustrialService:
     """
 
     @staticmethod
-    def calculate_asset_consumption(asset: IndustrialAsset) -> Dict[str, float]:
-        """
-        Realiza cálculos de ingeniería para un activo individual.
-        Single source of truth para la física del equipo.
-        """
+    def _asset_physics(asset: IndustrialAsset) -> Tuple[float, float, float]:
+        """(kW reales, kWh/mes, kWh desperdiciados/mes) sin redondear."""
         power = asset.nominal_power_kw or 0.0
         load_f = asset.load_factor or 0.75
         hours = asset.daily_usage_hours or 0.0
@@ -35,93 +38,256 @@ class IndustrialService:
         pf = asset.power_factor or 0.85
         if pf < 0.90:
             waste_kwh += monthly_kwh * (0.90 - pf) * 0.1
-            
+        return real_kw, monthly_kwh, waste_kwh
+
+    @staticmethod
+    def calculate_asset_consumption(asset: IndustrialAsset) -> Dict[str, float]:
+        """
+        Realiza cálculos de ingeniería para un activo individual.
+        Single source of truth para la física del equipo.
+        """
+        real_kw, monthly_kwh, waste_kwh = IndustrialService._asset_physics(asset)
         return {
             "real_kw": round(real_kw, 2),
             "monthly_kwh": round(monthly_kwh, 2),
             "waste_kwh": round(waste_kwh, 2)
         }
 
-    async def get_dashboard_insights(self, db: AsyncSession, user_id: int) -> Dict[str, Any]:
+    @staticmethod
+    def param_column(column, default):
+        """Parámetro de la física en SQL: como en Python, un 0 o NULL toma el valor por defecto."""
+        return func.coalesce(func.nullif(column, 0), default)
+
+    @staticmethod
+    def efficiency_column():
+        """Eficiencia (%) con la que la física calcula el desperdicio de cada activo."""
+        return IndustrialService.param_column(IndustrialAsset.efficiency_percentage, 85.0)
+
+    @staticmethod
+    def consumption_columns():
         """
-        Calcula las métricas globales de la planta y solicita una auditoría a la IA.
+        La misma física de `_asset_physics` como expresiones SQL por fila de industrial_assets
+        (kW reales, kWh/mes, kWh desperdiciados/mes). Como en Python, un 0 o NULL en factor
+        de carga, días, eficiencia o factor de potencia toma el valor por defecto.
         """
-        from app.models.user import User
-        from sqlalchemy.orm import selectinload
-        
-        # 1. Carga optimizada (Service Pattern + Performance)
-        query = (
-            select(User)
-            .where(User.id == user_id)
-            .options(
-                selectinload(User.industrial_settings),
-                selectinload(User.industrial_assets)
+        param = IndustrialService.param_column
+
+        real_kw = func.coalesce(IndustrialAsset.nominal_power_kw, 0.0) * param(IndustrialAsset.load_factor, 0.75)
+        monthly_kwh = (
+            real_kw * func.coalesce(IndustrialAsset.daily_usage_hours, 0.0) * param(IndustrialAsset.op_days_per_month, 22)
+        )
+        pf = param(IndustrialAsset.power_factor, 0.85)
+        waste_kwh = (
+            monthly_kwh * (1.0 - IndustrialService.efficiency_column() / 100.0)
+            + case((pf < 0.90, monthly_kwh * (0.90 - pf) * 0.1), else_=0.0)
+        )
+        return real_kw, monthly_kwh, waste_kwh
+
+    async def aggregate_plants(
+        self, db: AsyncSession, user_ids: Iterable[int], top_n: int = 5
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Totales de cada planta leídos de la proyección plant_summaries (una fila por
+        planta, mantenida por deltas) y solo los `top_n` activos con más desperdicio por
+        planta (ROW_NUMBER), como filas proyectadas sin hidratar objetos ORM.
+        Una planta con activos pero sin fila en la proyección (escrita sin pasar por la
+        sesión de la app) se calcula con el GROUP BY sobre industrial_assets.
+        Las plantas sin activos no aparecen en el resultado.
+        """
+        user_ids = list(user_ids)
+        _, _, waste_kwh = self.consumption_columns()
+        totals = await plant_summary.plant_totals(db, user_ids)
+        plants = {
+            user_id: {
+                "assets": row.asset_count,
+                "real_kw": row.real_kw,
+                "monthly_kwh": row.monthly_kwh,
+                "waste_kwh": row.waste_kwh,
+                "top": [],
+            }
+            for user_id, row in totals.items()
+        }
+
+        ranked = (
+            select(
+                IndustrialAsset.user_id,
+                IndustrialAsset.name,
+                IndustrialAsset.asset_type,
+                IndustrialAsset.efficiency_percentage,
+                waste_kwh.label("waste_kwh"),
+                func.row_number().over(
+                    partition_by=IndustrialAsset.user_id, order_by=(waste_kwh.desc(), IndustrialAsset.id)
+                ).label("rank"),
             )
+            .where(IndustrialAsset.user_id.in_(user_ids))
+            .subquery()
         )
-        result = await db.execute(query)
-        user = result.scalar_one_or_none()
-        
-        if not user:
-            return self._empty_dashboard_state("USD")
+        top = await db.execute(
+            select(ranked).where(ranked.c.rank <= top_n).order_by(ranked.c.user_id, ranked.c.rank)
+        )
+        top = top.all()
+        missing = {row.user_id for row in top} - set(plants)
+        if missing:
+            # Activos escritos sin pasar por la sesión ni por rebuild: se recalculan aquí
+            logger.warning(
+                f"Plants {sorted(missing)} have assets but no plant_summaries row: "
+                "computed from industrial_assets; run scripts/rebuild_plant_summaries.py"
+            )
+            computed = await plant_summary.compute(db, missing)
+            for user_id in missing:
+                count, real_kw, monthly_kwh, waste, _ = computed[(user_id, PLANT_TOTAL)]
+                plants[user_id] = {
+                    "assets": count, "real_kw": real_kw, "monthly_kwh": monthly_kwh, "waste_kwh": waste, "top": [],
+                }
+        for row in top:
+            plants[row.user_id]["top"].append({
+                "name": row.name,
+                "type": row.asset_type,
+                "waste_kwh": round(row.waste_kwh, 2),
+                "efficiency": row.efficiency_percentage
+            })
+        return plants
 
-        assets = user.industrial_assets
-        settings = user.industrial_settings
-        
-        currency = settings.currency_code if settings else "USD"
-        cost_per_kwh = settings.energy_cost_per_kwh if settings else 0.15
+    async def compute_dashboard_metrics(
+        self, db: AsyncSession, user_id: int
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Fase determinista del dashboard (solo base de datos + física).
+        Devuelve (métricas, contexto para la IA); el contexto es None si no hay activos.
+        """
+        # 1. Totales de la proyección y top de desperdicio en SQL (sin cargar cada activo)
+        settings = await db.scalar(select(IndustrialSettings).where(IndustrialSettings.user_id == user_id))
+        plants = await self.aggregate_plants(db, [user_id])
+        return self.plant_metrics(plants.get(user_id), settings)
 
+    def build_dashboard_metrics(
+        self, assets: List[IndustrialAsset], settings: Optional[IndustrialSettings]
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Métricas y contexto IA a partir de activos ya cargados (sin tocar la base de datos).
+        Mismo resultado que `aggregate_plants` + `plant_metrics`, calculado en Python.
+        """
         if not assets:
-            return self._empty_dashboard_state(currency)
+            return self.plant_metrics(None, settings)
 
-        # 2. Aggregated Calculations
-        total_kwh = 0.0
-        total_waste_kwh = 0.0
-        total_kw = 0.0
+        plant = {"assets": len(assets), "real_kw": 0.0, "monthly_kwh": 0.0, "waste_kwh": 0.0}
         asset_details = []
-
         for a in assets:
-            stats = self.calculate_asset_consumption(a)
-            total_kwh += stats["monthly_kwh"]
-            total_waste_kwh += stats["waste_kwh"]
-            total_kw += stats["real_kw"]
-            
-            asset_details.append({
+            real_kw, monthly_kwh, waste_kwh = self._asset_physics(a)
+            plant["real_kw"] += real_kw
+            plant["monthly_kwh"] += monthly_kwh
+            plant["waste_kwh"] += waste_kwh
+            asset_details.append((waste_kwh, {
                 "name": a.name,
                 "type": a.asset_type,
-                "waste_kwh": stats["waste_kwh"],
+                "waste_kwh": round(waste_kwh, 2),
                 "efficiency": a.efficiency_percentage
-            })
+            }))
+
+        asset_details.sort(key=lambda d: d[0], reverse=True)
+        plant["top"] = [detail for _, detail in asset_details[:5]]
+        return self.plant_metrics(plant, settings)
+
+    def plant_metrics(
+        self, plant: Optional[Dict[str, Any]], settings: Optional[IndustrialSettings]
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Métricas del dashboard y contexto IA a partir de los totales de la planta.
+        Compartido con el job nocturno para que el contexto (y su hash) sea idéntico.
+        """
+        currency = settings.currency_code if settings else "USD"
+        cost_per_kwh = settings.energy_cost_per_kwh if settings else 0.15
+
+        if not plant:
+            return self._empty_dashboard_state(currency), None
+
+        # 2. Aggregated Calculations
+        total_kwh = plant["monthly_kwh"]
+        total_waste_kwh = plant["waste_kwh"]
+        total_kw = plant["real_kw"]
 
         # 3. AI Audit context
         plant_data = {
             "company": settings.company_name if settings else "Planta",
-            "total_assets": len(assets),
+            "total_assets": plant["assets"],
             "total_real_demand_kw": round(total_kw, 2),
             "total_consumption_monthly_kwh": round(total_kwh, 2),
             "total_waste_monthly_kwh": round(total_waste_kwh, 2),
             "energy_cost_per_kwh": cost_per_kwh,
             "currency": currency,
-            "assets_top": asset_details[:5]
+            "assets_top": plant["top"]
         }
 
-        ai_insights = await gemini_service.get_dashboard_insights(plant_data)
-        
-        # 4. Final synthesis
-        waste_score = ai_insights.get("waste_score", round((total_waste_kwh / total_kwh * 100) if total_kwh > 0 else 0))
         potential_savings_val = total_waste_kwh * cost_per_kwh
-
-        return {
-            "waste_score": waste_score,
-            "top_waste_reason": ai_insights.get("top_waste_reason", "Ineficiencia General"),
-            "potential_savings": ai_insights.get("potential_savings", f"{currency} {round(potential_savings_val)}"),
+        metrics = {
+            "waste_score": round((total_waste_kwh / total_kwh * 100) if total_kwh > 0 else 0),
+            "potential_savings": f"{currency} {round(potential_savings_val)}",
             "potential_savings_monthly": float(potential_savings_val * 0.25), 
             "total_consumption_monthly_kwh": round(total_kwh),
             "total_real_demand_kw": round(total_kw, 1),
+            "currency": currency
+        }
+        return metrics, plant_data
+
+    def apply_ai_insights(
+        self, metrics: Dict[str, Any], ai_insights: Dict[str, Any], freshness: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Síntesis final: métricas locales + campos interpretativos de la IA."""
+        return {
+            **metrics,
+            "waste_score": ai_insights.get("waste_score", metrics["waste_score"]),
+            "top_waste_reason": ai_insights.get("top_waste_reason", "Ineficiencia General"),
+            "potential_savings": ai_insights.get("potential_savings", metrics["potential_savings"]),
             "recommendation_highlight": ai_insights.get("recommendation_highlight", "Optimizar procesos"),
             "ai_interpretation": ai_insights.get("ai_interpretation", "Análisis pendiente."),
-            "currency": currency
+            "ai_source": ai_insights.get("source"),
+            **freshness
         }
 
+    @staticmethod
+    def _insight_generator(user_id: int):
+        """Generador de insights de IA ligado al usuario (para su medición de uso y cuota)."""
+        return partial(gemini_service.get_dashboard_insights, user_id=user_id)
+
+    async def get_dashboard_insights(self, db: AsyncSession, user_id: int) -> Dict[str, Any]:
+        """
+        Calcula las métricas globales de la planta y solicita una auditoría a la IA.
+        """
+        metrics, plant_data = await self.compute_dashboard_metrics(db, user_id)
+        if plant_data is None:
+            return metrics
+
+        # Último insight guardado al instante; se regenera en segundo plano si venció
+        ai_insights, freshness = await insight_store.get_or_generate(
+            db, user_id, "industrial", plant_data, self._insight_generator(user_id)
+        )
+        return self.apply_ai_insights(metrics, ai_insights, freshness)
+
+    async def open_dashboard_stream(self, db: AsyncSession, user_id: int) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Modo progresivo: resuelve ahora todo lo que requiere base de datos y devuelve un
+        iterador que emite ("metrics", ...) de inmediato y ("insights", ...) cuando la IA responde.
+        La sesión no se usa dentro del iterador, así puede cerrarse antes del streaming.
+        """
+        metrics, plant_data = await self.compute_dashboard_metrics(db, user_id)
+        cached = None
+        if plant_data is not None:
+            cached = await insight_store.lookup(
+                db, user_id, "industrial", plant_data, self._insight_generator(user_id)
+            )
+
+        async def events():
+            yield "metrics", metrics
+            if plant_data is None:
+                yield "insights", metrics
+                return
+            ai_insights, freshness = cached or await insight_store.generate_and_store(
+                user_id, "industrial", plant_data, self._insight_generator(user_id)
+            )
+            yield "insights", self.apply_ai_insights(metrics, ai_insights, freshness)
+
+        return events()
+
     def _empty_dashboard_state(self, currency: str) -> Dict[str, Any]:
         return {
             "waste_score": 0,
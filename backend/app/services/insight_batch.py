@@ -0,0 +1,230 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import exists, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.llm_governor import Priority, llm_priority
+from app.db.session import get_async_session
+from app.models.ai_insight import AIInsightSnapshot
+from app.models.industrial_asset import IndustrialAsset
+from app.models.industrial_settings import IndustrialSettings
+from app.models.residential import ConsumptionReading, ResidentialAsset, ResidentialProfile
+from app.models.user import User
+from app.services.gemini_service import gemini_service
+from app.services.industrial import industrial_service
+from app.services.insight_store import insight_store
+from app.services.residential import residential_service
+
+logger = logging.getLogger("app")
+
+PROFILE_TYPES = ("industrial", "residential")
+
+
+class InsightBatchJob:
+    """
+    Generación nocturna de insights para todas las plantas y hogares.
+
+    Recorre los usuarios por páginas (keyset sobre user_id), carga los datos de cada
+    página con una consulta por tabla, arma el mismo contexto que el dashboard (mismo
+    hash, para que el insight se sirva como fresco) y llama a Gemini con concurrencia
+    acotada y prioridad de fondo. Tras cada página guarda un checkpoint en disco:
+    si el proceso muere, la siguiente ejecución continúa desde el último usuario completado.
+    """
+
+    def __init__(
+        self,
+        chunk_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        checkpoint_path: Optional[str] = None,
+        force: bool = False,
+    ):
+        settings = get_settings()
+        self.chunk_size = chunk_size or settings.insight_batch_chunk_size
+        self.concurrency = concurrency or settings.insight_batch_concurrency
+        self.checkpoint_path = checkpoint_path or settings.insight_batch_checkpoint_path
+        # Sin force se omiten los usuarios cuyo insight guardado sigue fresco
+        self.force = force
+        self.stats: Dict[str, int] = defaultdict(int)
+
+    async def run(self, profile_types: Sequence[str] = PROFILE_TYPES, resume: bool = True) -> Dict[str, Any]:
+        """Procesa todos los usuarios de los perfiles indicados y devuelve contadores del lote."""
+        llm_priority.set(Priority.BACKGROUND)
+        checkpoint = self._load_checkpoint() if resume else {}
+        start = time.monotonic()
+
+        async for db in get_async_session():
+            for profile_type in profile_types:
+                if profile_type in checkpoint.get("completed", []):
+                    continue
+                after_id = checkpoint.get("last_user_id", {}).get(profile_type, 0)
+                while True:
+                    user_ids = await self._next_user_ids(db, profile_type, after_id)
+                    if not user_ids:
+                        break
+                    await self._process_chunk(db, profile_type, user_ids)
+                    after_id = user_ids[-1]
+                    checkpoint.setdefault("last_user_id", {})[profile_type] = after_id
+                    self._write_checkpoint(checkpoint)
+                checkpoint.setdefault("completed", []).append(profile_type)
+                self._write_checkpoint(checkpoint)
+
+        # Lote completo: la próxima ejecución empieza desde cero
+        self._clear_checkpoint()
+        return {**self.stats, "elapsed_seconds": round(time.monotonic() - start, 1)}
+
+    async def _next_user_ids(self, db: AsyncSession, profile_type: str, after_id: int) -> List[int]:
+        """Siguiente página de usuarios con datos del perfil (keyset, sin OFFSET)."""
+        if profile_type == "industrial":
+            query = (
+                select(IndustrialAsset.user_id)
+                .where(IndustrialAsset.user_id > after_id)
+                .group_by(IndustrialAsset.user_id)
+                .order_by(IndustrialAsset.user_id)
+            )
+        else:
+            has_profile = exists().where(ResidentialProfile.user_id == User.id)
+            has_assets = exists().where(ResidentialAsset.user_id == User.id)
+            query = (
+                select(User.id)
+                .where(User.id > after_id, or_(has_profile, has_assets))
+                .order_by(User.id)
+            )
+        result = await db.execute(query.limit(self.chunk_size))
+        return list(result.scalars().all())
+
+    async def _process_chunk(self, db: AsyncSession, profile_type: str, user_ids: List[int]) -> None:
+        if profile_type == "industrial":
+            contexts = await self._industrial_contexts(db, user_ids)
+            generate = gemini_service.get_dashboard_insights
+        else:
+            contexts = await self._residential_contexts(db, user_ids)
+            generate = gemini_service.get_residential_insights
+        # El cálculo puede completar valores por defecto en los objetos cargados;
+        # se desvinculan para que el commit de los insights no los persista.
+        db.expunge_all()
+
+        if not self.force:
+            contexts = await self._drop_fresh(db, profile_type, contexts)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def generate_one(user_id: int, context: Dict[str, Any]):
+            async with semaphore:
+                try:
+                    return user_id, await generate(context, user_id=user_id)
+                except Exception as e:
+                    logger.error(f"Batch {profile_type} insight failed for user {user_id}: {e}")
+                    return user_id, None
+
+        results = await asyncio.gather(*(generate_one(uid, ctx) for uid, ctx in contexts.items()))
+        for user_id, payload in results:
+            if payload is None:
+                self.stats["errors"] += 1
+                continue
+            await insight_store.save(
+                db, user_id, profile_type, payload, insight_store.context_hash(contexts[user_id])
+            )
+            self.stats[f"{profile_type}_{payload.get('source', 'ai')}"] += 1
+        db.expunge_all()
+        self.stats[f"{profile_type}_users"] += len(user_ids)
+
+    async def _drop_fresh(
+        self, db: AsyncSession, profile_type: str, contexts: Dict[int, Dict[str, Any]]
+    ) -> Dict[int, Dict[str, Any]]:
+        result = await db.execute(
+            select(AIInsightSnapshot).where(
+                AIInsightSnapshot.profile_type == profile_type,
+                AIInsightSnapshot.user_id.in_(list(contexts)),
+            )
+        )
+        fresh = {
+            s.user_id
+            for s in result.scalars().all()
+            if not insight_store.is_stale(s, insight_store.context_hash(contexts[s.user_id]))
+        }
+        self.stats[f"{profile_type}_skipped_fresh"] += len(fresh)
+        return {uid: ctx for uid, ctx in contexts.items() if uid not in fresh}
+
+    async def _industrial_contexts(self, db: AsyncSession, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        # Mismos agregados SQL que el dashboard, para todo el chunk a la vez
+        plants = await industrial_service.aggregate_plants(db, user_ids)
+        settings = await db.execute(select(IndustrialSettings).where(IndustrialSettings.user_id.in_(user_ids)))
+        settings_by_user = {s.user_id: s for s in settings.scalars().all()}
+
+        contexts = {}
+        for user_id in user_ids:
+            _, plant_data = industrial_service.plant_metrics(plants.get(user_id), settings_by_user.get(user_id))
+            if plant_data is not None:
+                contexts[user_id] = plant_data
+        return contexts
+
+    async def _residential_contexts(self, db: AsyncSession, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        profiles = await db.execute(select(ResidentialProfile).where(ResidentialProfile.user_id.in_(user_ids)))
+        assets = await db.execute(
+            select(ResidentialAsset)
+            .where(ResidentialAsset.user_id.in_(user_ids))
+            .order_by(ResidentialAsset.user_id, ResidentialAsset.id)
+        )
+        # Solo las 10 lecturas más recientes por usuario, resuelto en SQL con una ventana
+        rank = func.row_number().over(
+            partition_by=ConsumptionReading.user_id,
+            order_by=(ConsumptionReading.date.desc(), ConsumptionReading.id),
+        ).label("rank")
+        recent = (
+            select(ConsumptionReading.id, rank)
+            .where(ConsumptionReading.user_id.in_(user_ids))
+            .subquery()
+        )
+        readings = await db.execute(
+            select(ConsumptionReading)
+            .join(recent, recent.c.id == ConsumptionReading.id)
+            .where(recent.c.rank <= 10)
+            .order_by(ConsumptionReading.user_id, recent.c.rank)
+        )
+
+        profiles_by_user = {p.user_id: p for p in profiles.scalars().all()}
+        assets_by_user = self._group_by_user(assets.scalars().all())
+        readings_by_user = self._group_by_user(readings.scalars().all())
+
+        return {
+            user_id: residential_service.build_dashboard_metrics(
+                profiles_by_user.get(user_id), assets_by_user.get(user_id, []), readings_by_user.get(user_id, [])
+            )[1]
+            for user_id in user_ids
+        }
+
+    @staticmethod
+    def _group_by_user(rows: Iterable[Any]) -> Dict[int, List[Any]]:
+        grouped: Dict[int, List[Any]] = defaultdict(list)
+        for row in rows:
+            grouped[row.user_id].append(row)
+        return grouped
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        logger.info(f"Resuming insight batch from checkpoint {checkpoint}")
+        return checkpoint
+
+    def _write_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        # Escritura atómica: un corte a mitad no deja un checkpoint corrupto
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _clear_checkpoint(self) -> None:
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
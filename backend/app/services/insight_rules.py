@@ -0,0 +1,102 @@
+from typing import Any, Dict, List
+
+
+class RuleBasedInsights:
+    """
+    Generador determinista de insights a partir de las métricas ya calculadas.
+    Se usa cuando Gemini no está disponible (circuito abierto, error o sin API key),
+    así el dashboard responde en milisegundos con el mismo contrato que la IA.
+    """
+
+    # Recomendación técnica según el tipo de activo que más desperdicia
+    INDUSTRIAL_RECOMMENDATIONS = {
+        "motor": "Reemplazar motores de baja eficiencia por IE3/IE4 con variador de frecuencia",
+        "compresor": "Corregir fugas de aire comprimido y reducir la presión de trabajo",
+        "caldera": "Ajustar la combustión y aislar las líneas de vapor",
+        "bomba": "Instalar variadores de velocidad y revisar el punto de operación de las bombas",
+        "chiller": "Optimizar el setpoint del chiller y limpiar los intercambiadores",
+        "iluminacion": "Migrar la iluminación a LED con sensores de ocupación",
+        "iluminación": "Migrar la iluminación a LED con sensores de ocupación",
+    }
+
+    @staticmethod
+    def _waste_ratio(waste_kwh: float, total_kwh: float) -> float:
+        return waste_kwh / total_kwh if total_kwh > 0 else 0.0
+
+    def industrial(self, plant_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Auditoría determinista de la planta con la misma estructura que la respuesta de la IA."""
+        total_kwh = plant_data.get("total_consumption_monthly_kwh", 0.0)
+        waste_kwh = plant_data.get("total_waste_monthly_kwh", 0.0)
+        cost = plant_data.get("energy_cost_per_kwh", 0.0)
+        currency = plant_data.get("currency", "USD")
+        ratio = self._waste_ratio(waste_kwh, total_kwh)
+
+        top_assets: List[Dict[str, Any]] = sorted(
+            plant_data.get("assets_top", []), key=lambda a: a.get("waste_kwh", 0.0), reverse=True
+        )
+        if top_assets:
+            worst = top_assets[0]
+            top_reason = f"{worst.get('type', 'Activo')} '{worst.get('name', '')}' con eficiencia de {worst.get('efficiency') or 0:.0f}%"
+            recommendation = self.INDUSTRIAL_RECOMMENDATIONS.get(
+                str(worst.get("type", "")).strip().lower(),
+                f"Auditar y mejorar la eficiencia de {worst.get('name', 'los equipos críticos')}",
+            )
+        else:
+            top_reason = "Ineficiencia General"
+            recommendation = "Optimizar procesos"
+
+        # Mínimo recuperable: 20% del desperdicio actual
+        savings = waste_kwh * cost * 0.2
+        share = (top_assets[0].get("waste_kwh", 0.0) / waste_kwh * 100) if top_assets and waste_kwh > 0 else 0
+
+        return {
+            "waste_score": int(max(0, min(100, round(ratio * 100)))),
+            "top_waste_reason": top_reason,
+            "potential_savings": f"{currency} {round(savings)}",
+            "recommendation_highlight": recommendation,
+            "ai_interpretation": (
+                f"El {ratio * 100:.1f}% de la energía mensual ({round(waste_kwh)} kWh) se pierde por ineficiencia. "
+                + (f"El principal foco concentra el {share:.0f}% del desperdicio. " if share else "")
+                + f"Recuperar al menos el 20% representa {currency} {round(savings)} al mes."
+            ),
+            "source": "rules",
+        }
+
+    def residential(self, home_context: Dict[str, Any]) -> Dict[str, Any]:
+        """Consejo determinista del hogar y misiones básicas a partir del contexto calculado."""
+        estimated_cost = home_context.get("estimated_monthly_cost", 0.0) or 0.0
+        vampire_cost = home_context.get("vampire_cost_monthly", 0.0) or 0.0
+        high_impact = sorted(
+            home_context.get("high_impact_assets", []), key=lambda a: a.get("cost", 0.0), reverse=True
+        )
+
+        missions = []
+        if vampire_cost > 0:
+            missions.append({"id": 1, "title": "Desconecta los vampiros", "xp": 100, "icon": "Plug"})
+        if high_impact:
+            top = high_impact[0]
+            top_reason = f"{top.get('name', 'Equipo')} de alto consumo"
+            missions.append({"id": 2, "title": f"Reduce el uso de {top.get('name', 'tu equipo')}", "xp": 150, "icon": "Zap"})
+            advice = (
+                f"{top.get('name', 'Tu equipo principal')} cuesta cerca de $ {round(top.get('cost', 0.0))} al mes. "
+                "Ajustar sus horas de uso es la forma más rápida de bajar la factura."
+            )
+        elif vampire_cost > 0:
+            top_reason = "Consumo en standby"
+            advice = f"Los equipos en standby te cuestan $ {round(vampire_cost)} al mes. Desconéctalos cuando no los uses."
+        else:
+            top_reason = "Consumo Base Elevado"
+            advice = "Excelente gestión."
+
+        savings_percent = round(vampire_cost * 0.8 / estimated_cost * 100) if estimated_cost > 0 else 0
+
+        return {
+            "top_waste_reason": top_reason,
+            "ai_advice": advice,
+            "potential_savings_percent": int(min(100, savings_percent)),
+            "missions": missions,
+            "source": "rules",
+        }
+
+
+rule_based_insights = RuleBasedInsights()
@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.llm_governor import Priority, llm_priority
+from app.db.session import get_async_session
+from app.db.upsert import upsert_for
+from app.models.ai_insight import AIInsightSnapshot
+
+logger = logging.getLogger("app")
+
+InsightGenerator = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class InsightStore:
+    """
+    Caché persistente de insights de IA por usuario (stale-while-revalidate).
+
+    El dashboard devuelve de inmediato el último insight guardado junto con su edad.
+    Si está vencido o los datos de la planta/hogar cambiaron, una tarea en segundo
+    plano lo regenera. Solo la primera visita de un usuario espera a Gemini.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.freshness_seconds = settings.insight_freshness_seconds
+        self.fallback_retry_seconds = settings.insight_fallback_retry_seconds
+        self._refreshing: Set[Tuple[int, str]] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def context_hash(context: Dict[str, Any]) -> str:
+        """Huella estable del contexto enviado a la IA; cambia cuando cambian los datos."""
+        raw = json.dumps(context, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, db: AsyncSession, user_id: int, profile_type: str) -> Optional[AIInsightSnapshot]:
+        result = await db.execute(
+            select(AIInsightSnapshot)
+            .where(
+                AIInsightSnapshot.user_id == user_id,
+                AIInsightSnapshot.profile_type == profile_type,
+            )
+            .execution_options(populate_existing=True)  # save escribe con SQL directo
+        )
+        return result.scalar_one_or_none()
+
+    async def save(
+        self, db: AsyncSession, user_id: int, profile_type: str, payload: Dict[str, Any], context_hash: str
+    ) -> None:
+        """
+        Guarda el insight con un upsert (INSERT ... ON CONFLICT DO UPDATE): dos primeras
+        visitas concurrentes no chocan con la restricción única, gana la última.
+        """
+        values = {
+            "payload": payload,
+            "context_hash": context_hash,
+            "source": payload.get("source", "ai"),
+            "generated_at": datetime.now(timezone.utc),
+        }
+        stmt = upsert_for(db.get_bind().dialect.name)(AIInsightSnapshot).values(
+            user_id=user_id, profile_type=profile_type, **values
+        )
+        stmt = stmt.on_conflict_do_update(index_elements=["user_id", "profile_type"], set_=values)
+        await db.execute(stmt)
+        await db.commit()
+
+    def _age_seconds(self, snapshot: AIInsightSnapshot) -> float:
+        generated_at = snapshot.generated_at or datetime.now(timezone.utc)
+        if generated_at.tzinfo is None:
+            # SQLite devuelve datetimes sin zona; se guardan en UTC
+            generated_at = generated_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (datetime.now(timezone.utc) - generated_at).total_seconds())
+
+    def is_stale(self, snapshot: AIInsightSnapshot, context_hash: str) -> bool:
+        age = self._age_seconds(snapshot)
+        if snapshot.context_hash != context_hash:
+            return True
+        if snapshot.source == "rules":
+            return age > self.fallback_retry_seconds
+        return age > self.freshness_seconds
+
+    async def get_or_generate(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        profile_type: str,
+        context: Dict[str, Any],
+        generate: InsightGenerator,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Devuelve (payload IA, metadatos de frescura). Si hay un insight guardado se
+        sirve tal cual y, si está vencido, se agenda su regeneración en segundo plano.
+        """
+        cached = await self.lookup(db, user_id, profile_type, context, generate)
+        if cached is not None:
+            return cached
+        return await self.generate_and_store(user_id, profile_type, context, generate)
+
+    async def lookup(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        profile_type: str,
+        context: Dict[str, Any],
+        generate: InsightGenerator,
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Insight guardado (agendando su regeneración si venció) o None si el usuario aún no tiene."""
+        snapshot = await self.get(db, user_id, profile_type)
+        if snapshot is None:
+            return None
+
+        stale = self.is_stale(snapshot, self.context_hash(context))
+        refreshing = stale and self.schedule_refresh(user_id, profile_type, context, generate)
+        meta = {
+            "insight_age_seconds": round(self._age_seconds(snapshot), 1),
+            "insight_stale": stale,
+            "insight_refreshing": refreshing or (user_id, profile_type) in self._refreshing,
+        }
+        return snapshot.payload, meta
+
+    async def generate_and_store(
+        self, user_id: int, profile_type: str, context: Dict[str, Any], generate: InsightGenerator
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Genera el insight ahora (primera visita) y lo guarda sin bloquear la respuesta."""
+        payload = await generate(context)
+        self._spawn(self._persist(user_id, profile_type, payload, self.context_hash(context)))
+        return payload, {"insight_age_seconds": 0.0, "insight_stale": False, "insight_refreshing": False}
+
+    def schedule_refresh(
+        self, user_id: int, profile_type: str, context: Dict[str, Any], generate: InsightGenerator
+    ) -> bool:
+        """Agenda una regeneración en segundo plano (una sola a la vez por usuario y perfil)."""
+        key = (user_id, profile_type)
+        if key in self._refreshing:
+            return False
+        self._refreshing.add(key)
+        self._spawn(self._refresh(key, context, generate))
+        return True
+
+    async def _refresh(self, key: Tuple[int, str], context: Dict[str, Any], generate: InsightGenerator) -> None:
+        user_id, profile_type = key
+        # Nadie espera este refresco: cede el paso al chat y a los dashboards en vivo
+        llm_priority.set(Priority.BACKGROUND)
+        try:
+            payload = await generate(context)
+            await self._persist(user_id, profile_type, payload, self.context_hash(context))
+        except Exception as e:
+            logger.error(f"Error refreshing {profile_type} insight for user {user_id}: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    async def _persist(self, user_id: int, profile_type: str, payload: Dict[str, Any], digest: str) -> None:
+        # Sesión propia: la del request puede tener cambios en memoria que no deben guardarse
+        try:
+            async for db in get_async_session():
+                await self.save(db, user_id, profile_type, payload, digest)
+        except Exception as e:
+            logger.error(f"Error saving {profile_type} insight for user {user_id}: {e}")
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        # Se guarda la referencia para que la tarea no sea recolectada antes de terminar
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self) -> None:
+        """Espera las regeneraciones y escrituras en segundo plano (apagado de la app)."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+insight_store = InsightStore()
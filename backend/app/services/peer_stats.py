@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.energy_logic import EnergyCalculators
+from app.core.quantile_sketch import LogHistogram
+from app.models.residential import ConsumptionReading, ResidentialProfile
+
+logger = logging.getLogger("app")
+
+# Del grupo más específico al más general; se usa el primero con suficientes pares
+SCOPES = ("stratum_city", "stratum", "all")
+
+Key = Tuple[Any, ...]
+
+
+class PeerStatistics:
+    """
+    Distribución real del consumo mensual de los hogares, por estrato y ciudad.
+
+    Cada hogar aporta un valor de kWh/mes (mismo orden que el dashboard: promedio
+    capturado del perfil, última lectura x 30, factura promedio / tarifa) y de
+    kWh/persona a sketches de cuantiles mergeables (LogHistogram) por grupo: todo el
+    país, estrato, ciudad y estrato + ciudad. La carga inicial recorre los perfiles una
+    vez, en segundo plano desde el arranque de la app; después cada lectura o cambio de
+    perfil reemplaza solo el aporte de ese hogar. Los percentiles se consultan en memoria
+    sin tocar consumption_readings; hasta que termina la carga inicial no hay pares.
+
+    Cada proceso mantiene sus sketches; la recarga periódica (también en segundo plano)
+    incorpora los cambios hechos por otros procesos.
+    """
+
+    def __init__(
+        self,
+        relative_accuracy: Optional[float] = None,
+        min_peers: Optional[int] = None,
+        refresh_seconds: Optional[float] = None,
+    ):
+        settings = get_settings()
+        self.relative_accuracy = relative_accuracy or settings.peer_stats_relative_accuracy
+        self.min_peers = min_peers if min_peers is not None else settings.peer_stats_min_peers
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else settings.peer_stats_refresh_seconds
+        self._sketches: Dict[Tuple[str, Key], LogHistogram] = {}
+        # user_id -> (grupos, kWh/mes, kWh/persona) con que contribuye hoy
+        self._members: Dict[int, Tuple[Tuple[Key, ...], float, float]] = {}
+        self._loaded_at: Optional[float] = None
+        # Hogares actualizados mientras corre una carga (None fuera de ella)
+        self._dirty: Optional[Set[int]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def group_keys(stratum: Optional[int], city: Optional[str]) -> Tuple[Key, ...]:
+        stratum = stratum if stratum is not None else 3
+        keys: Tuple[Key, ...] = (("all",), ("stratum", stratum))
+        city = (city or "").strip().lower()
+        if city:
+            keys += (("city", city), ("stratum_city", stratum, city))
+        return keys
+
+    @staticmethod
+    def monthly_kwh(
+        average_kwh_captured: Optional[float],
+        latest_reading: Optional[float],
+        monthly_bill_avg: Optional[float],
+        stratum: Optional[int],
+    ) -> Optional[float]:
+        """kWh/mes del hogar con la misma prioridad de fuentes que el dashboard."""
+        if average_kwh_captured and average_kwh_captured > 0:
+            return average_kwh_captured
+        if latest_reading is not None:
+            return latest_reading * 30
+        if monthly_bill_avg and monthly_bill_avg > 0:
+            return monthly_bill_avg / EnergyCalculators.get_kwh_price(stratum if stratum is not None else 3)
+        return None
+
+    def _sketch(self, metric: str, key: Key) -> LogHistogram:
+        sketch = self._sketches.get((metric, key))
+        if sketch is None:
+            sketch = self._sketches[(metric, key)] = LogHistogram(self.relative_accuracy)
+        return sketch
+
+    def observe(
+        self, user_id: int, stratum: Optional[int], city: Optional[str], occupants: Optional[int], kwh: Optional[float]
+    ) -> None:
+        """Reemplaza el aporte del hogar por su consumo actual (None lo retira)."""
+        self.forget(user_id)
+        if kwh is None or kwh < 0:
+            return
+        keys = self.group_keys(stratum, city)
+        per_person = kwh / max(occupants or 1, 1)
+        for key in keys:
+            self._sketch("kwh", key).add(kwh)
+            self._sketch("kwh_per_person", key).add(per_person)
+        self._members[user_id] = (keys, kwh, per_person)
+
+    def forget(self, user_id: int) -> None:
+        previous = self._members.pop(user_id, None)
+        if previous is None:
+            return
+        keys, kwh, per_person = previous
+        for key in keys:
+            self._sketch("kwh", key).remove(kwh)
+            self._sketch("kwh_per_person", key).remove(per_person)
+
+    @staticmethod
+    def _query(user_ids: Optional[Iterable[int]] = None):
+        # Última lectura por hogar vía el índice (user_id, date): una búsqueda por perfil
+        latest = (
+            select(ConsumptionReading.reading_value)
+            .where(ConsumptionReading.user_id == ResidentialProfile.user_id)
+            .order_by(ConsumptionReading.date.desc(), ConsumptionReading.id.desc())
+            .limit(1)
+            .correlate(ResidentialProfile)
+            .scalar_subquery()
+        )
+        query = select(
+            ResidentialProfile.user_id,
+            ResidentialProfile.stratum,
+            ResidentialProfile.city,
+            ResidentialProfile.occupants,
+            ResidentialProfile.average_kwh_captured,
+            ResidentialProfile.monthly_bill_avg,
+            latest.label("latest_reading"),
+        )
+        if user_ids is not None:
+            query = query.where(ResidentialProfile.user_id.in_(list(user_ids)))
+        return query
+
+    def _observe_row(self, row: Any) -> None:
+        kwh = self.monthly_kwh(row.average_kwh_captured, row.latest_reading, row.monthly_bill_avg, row.stratum)
+        self.observe(row.user_id, row.stratum, row.city, row.occupants, kwh)
+
+    async def load(self, db: AsyncSession) -> int:
+        """Reconstruye todos los sketches desde la base de datos; devuelve los hogares cargados."""
+        fresh = PeerStatistics(self.relative_accuracy, self.min_peers, self.refresh_seconds)
+        self._dirty = set()
+        try:
+            result = await db.stream(self._query().execution_options(yield_per=5000))
+            async for row in result:
+                fresh._observe_row(row)
+        finally:
+            dirty, self._dirty = self._dirty, None
+        # Las consultas en curso ven los sketches anteriores hasta que termina la carga
+        self._sketches, self._members = fresh._sketches, fresh._members
+        self._loaded_at = time.monotonic()
+        # Los hogares actualizados durante la carga pudieron leerse antes del cambio
+        for user_id in dirty:
+            await self.refresh_user(db, user_id)
+        return len(self._members)
+
+    async def run(self, session_factory: Callable[[], AsyncIterator[AsyncSession]]) -> None:
+        """Carga inicial y recargas periódicas, fuera del camino de las peticiones."""
+        while True:
+            try:
+                async for db in session_factory():
+                    households = await self.load(db)
+                    logger.info(f"Peer stats loaded: {households} households")
+            except Exception as e:
+                logger.error(f"Peer stats load failed: {e}")
+            if not self.refresh_seconds:
+                return
+            await asyncio.sleep(self.refresh_seconds)
+
+    def start(self, session_factory: Callable[[], AsyncIterator[AsyncSession]]) -> asyncio.Task:
+        """Lanza `run` en segundo plano (lifespan de la app)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run(session_factory))
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def refresh_user(self, db: AsyncSession, user_id: int) -> None:
+        """Actualiza el aporte de un hogar tras una nueva lectura o un cambio de perfil."""
+        if self._dirty is not None:
+            self._dirty.add(user_id)  # la carga en curso lo vuelve a leer al terminar
+        if self._loaded_at is None:
+            return  # la carga inicial lo incluirá
+        row = (await db.execute(self._query([user_id]))).one_or_none()
+        if row is None:
+            self.forget(user_id)
+        else:
+            self._observe_row(row)
+
+    def merged(self, metric: str, keys: Iterable[Key]) -> LogHistogram:
+        """Sketch combinado de varios grupos (p. ej. varias ciudades)."""
+        total = LogHistogram(self.relative_accuracy)
+        for key in keys:
+            sketch = self._sketches.get((metric, key))
+            if sketch is not None:
+                total.merge(sketch)
+        return total
+
+    def _scope(self, stratum: Optional[int], city: Optional[str]) -> Optional[Tuple[str, Key]]:
+        keys = {key[0]: key for key in self.group_keys(stratum, city)}
+        for scope in SCOPES:
+            key = keys.get(scope)
+            sketch = self._sketches.get(("kwh", key)) if key else None
+            if sketch is not None and sketch.count >= self.min_peers:
+                return scope, key
+        return None
+
+    def compare(
+        self, stratum: Optional[int], city: Optional[str], kwh: float, occupants: Optional[int]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Percentiles del hogar frente a sus pares: el grupo más específico (estrato + ciudad,
+        estrato, país) con al menos `min_peers` hogares. None si no hay pares suficientes.
+        """
+        scope = self._scope(stratum, city)
+        if scope is None:
+            return None
+        name, key = scope
+        by_kwh = self._sketches[("kwh", key)]
+        by_person = self._sketches[("kwh_per_person", key)]
+        per_person = kwh / max(occupants or 1, 1)
+        percentile_person = round(100 * by_person.rank(per_person), 1)
+        return {
+            "scope": name,
+            "peers": by_kwh.count,
+            "percentile_kwh": round(100 * by_kwh.rank(kwh), 1),
+            "percentile_kwh_per_person": percentile_person,
+            # Porcentaje de pares que consumen más por persona (100 = el más eficiente)
+            "efficiency_percentile": round(100 - percentile_person, 1),
+            "p25_kwh": round(by_kwh.quantile(0.25), 1),
+            "median_kwh": round(by_kwh.quantile(0.5), 1),
+            "p75_kwh": round(by_kwh.quantile(0.75), 1),
+            "median_kwh_per_person": round(by_person.quantile(0.5), 1),
+        }
+
+    def member(self, user_id: int) -> Optional[Tuple[float, float]]:
+        """(kWh/mes, kWh/persona) con que el hogar participa en las estadísticas."""
+        entry = self._members.get(user_id)
+        return (entry[1], entry[2]) if entry else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "households": len(self._members),
+            "sketches": len(self._sketches),
+            "age_seconds": round(time.monotonic() - self._loaded_at) if self._loaded_at is not None else None,
+        }
+
+
+peer_stats = PeerStatistics()
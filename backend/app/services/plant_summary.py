@@ -0,0 +1,242 @@
+import logging
+import math
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, insert, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import NO_VALUE
+
+from app.db.upsert import upsert_for
+from app.models.industrial_asset import IndustrialAsset
+from app.models.plant_summary import PlantSummary
+
+logger = logging.getLogger("app")
+
+PLANT_TOTAL = ""          # zona de la fila con el total de la planta
+DEFAULT_ZONE = "General"  # zona de los activos sin ubicación
+MEASURES = ("asset_count", "real_kw", "monthly_kwh", "waste_kwh", "weighted_eff_sum")
+# Columnas de industrial_assets que cambian el aporte de un activo a la proyección
+TRACKED = (
+    "user_id", "location", "nominal_power_kw", "load_factor", "daily_usage_hours",
+    "op_days_per_month", "efficiency_percentage", "power_factor",
+)
+
+Key = Tuple[int, str]
+
+
+def zone_name(location: Optional[str]) -> str:
+    return location or DEFAULT_ZONE
+
+
+class PlantSummaryProjection:
+    """
+    Mantiene plant_summaries: totales por planta y por zona (kW reales, kWh/mes, kWh
+    desperdiciados, Σ eficiencia x kWh y número de activos).
+
+    Un listener after_flush de las sesiones de la app (`register`, desde app.db.session)
+    calcula el delta de cada activo insertado, editado o borrado con la misma física de
+    IndustrialService, los acumula por (usuario, zona) y los aplica con un upsert
+    (INSERT ... ON CONFLICT DO UPDATE SET x = x + delta) en la misma transacción del
+    cambio. Las filas que quedan sin activos se borran. Así la lectura de los totales de
+    una planta es una sola fila.
+
+    Las escrituras masivas que no pasan por la sesión (insert()/delete() sobre la tabla)
+    no disparan el listener: quien las use aplica sus deltas (`asset_deltas` + `apply`,
+    como la importación masiva de activos) o llama después a `rebuild`. `check` verifica
+    la proyección contra un recálculo.
+    """
+
+    @staticmethod
+    def contribution(values: Any) -> Tuple[float, ...]:
+        """Aporte de un activo a cada medida, en el orden de MEASURES."""
+        from app.services.industrial import IndustrialService
+
+        real_kw, monthly_kwh, waste_kwh = IndustrialService._asset_physics(values)
+        efficiency = values.efficiency_percentage if values.efficiency_percentage is not None else 85.0
+        return (1, real_kw, monthly_kwh, waste_kwh, efficiency * monthly_kwh)
+
+    @staticmethod
+    def _values(asset: IndustrialAsset, committed: bool) -> SimpleNamespace:
+        # committed=True: valores antes de este flush (estado previo a la edición o al borrado)
+        state = inspect(asset)
+        values = {}
+        for name in TRACKED:
+            previous = state.committed_state.get(name, NO_VALUE) if committed else NO_VALUE
+            values[name] = getattr(asset, name) if previous is NO_VALUE else previous
+        return SimpleNamespace(**values)
+
+    def _accumulate(self, deltas: Dict[Key, List[float]], values: SimpleNamespace, sign: int) -> None:
+        contribution = self.contribution(values)
+        for key in ((values.user_id, PLANT_TOTAL), (values.user_id, zone_name(values.location))):
+            delta = deltas[key]
+            for i, value in enumerate(contribution):
+                delta[i] += sign * value
+
+    def session_deltas(self, session: Session) -> Dict[Key, List[float]]:
+        """Deltas por (usuario, zona) de los activos pendientes en la sesión."""
+        deltas: Dict[Key, List[float]] = defaultdict(lambda: [0] * len(MEASURES))
+        for obj in session.new:
+            if isinstance(obj, IndustrialAsset):
+                self._accumulate(deltas, self._values(obj, committed=False), 1)
+        for obj in session.deleted:
+            if isinstance(obj, IndustrialAsset):
+                self._accumulate(deltas, self._values(obj, committed=True), -1)
+        for obj in session.dirty:
+            if isinstance(obj, IndustrialAsset) and obj not in session.deleted:
+                before, after = self._values(obj, committed=True), self._values(obj, committed=False)
+                if vars(before) != vars(after):
+                    self._accumulate(deltas, before, -1)
+                    self._accumulate(deltas, after, 1)
+        return deltas
+
+    def asset_deltas(self, assets: Iterable[Any]) -> Dict[Key, List[float]]:
+        """Deltas de activos insertados sin pasar por el flush (insert() masivo con RETURNING)."""
+        deltas: Dict[Key, List[float]] = defaultdict(lambda: [0] * len(MEASURES))
+        for asset in assets:
+            self._accumulate(deltas, asset, 1)
+        return deltas
+
+    @staticmethod
+    def apply(connection: Any, deltas: Dict[Key, List[float]]) -> None:
+        """
+        Aplica los deltas con un solo upsert atómico, filas en orden fijo para no generar
+        deadlocks. Dos transacciones que crean a la vez la primera fila de una zona no
+        chocan con la restricción única: la segunda suma sobre la fila de la primera.
+        """
+        if not deltas:
+            return
+        table = PlantSummary.__table__
+        stmt = upsert_for(connection.dialect.name)(table).values([
+            {"user_id": user_id, "zone": zone, **dict(zip(MEASURES, delta, strict=True))}
+            for (user_id, zone), delta in sorted(deltas.items())
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.zone],
+            set_={**{name: table.c[name] + stmt.excluded[name] for name in MEASURES}, "updated_at": func.now()},
+        )
+        connection.execute(stmt)
+        touched = {user_id for user_id, _ in deltas}
+        connection.execute(delete(table).where(table.c.user_id.in_(touched), table.c.asset_count <= 0))
+
+    # --- Lecturas ---
+    # Los deltas se aplican con SQL directo: populate_existing refresca las filas que la
+    # sesión ya tuviera cargadas.
+
+    async def plant_totals(self, db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, PlantSummary]:
+        """Fila de totales de cada planta (las plantas sin activos no aparecen)."""
+        result = await db.execute(
+            select(PlantSummary)
+            .where(PlantSummary.user_id.in_(list(user_ids)), PlantSummary.zone == PLANT_TOTAL)
+            .execution_options(populate_existing=True)
+        )
+        return {row.user_id: row for row in result.scalars()}
+
+    async def zones(self, db: AsyncSession, user_id: int) -> List[PlantSummary]:
+        result = await db.execute(
+            select(PlantSummary)
+            .where(PlantSummary.user_id == user_id, PlantSummary.zone != PLANT_TOTAL)
+            .order_by(PlantSummary.zone)
+            .execution_options(populate_existing=True)
+        )
+        return list(result.scalars())
+
+    # --- Reconstrucción y verificación ---
+
+    @staticmethod
+    def aggregate_query(user_ids: Optional[Iterable[int]] = None):
+        """Las mismas medidas calculadas desde industrial_assets con GROUP BY (user_id, location)."""
+        from app.services.industrial import IndustrialService
+
+        real_kw, monthly_kwh, waste_kwh = IndustrialService.consumption_columns()
+        efficiency = func.coalesce(IndustrialAsset.efficiency_percentage, 85.0)
+        query = (
+            select(
+                IndustrialAsset.user_id,
+                IndustrialAsset.location,
+                func.count().label("asset_count"),
+                func.sum(real_kw).label("real_kw"),
+                func.sum(monthly_kwh).label("monthly_kwh"),
+                func.sum(waste_kwh).label("waste_kwh"),
+                func.sum(efficiency * monthly_kwh).label("weighted_eff_sum"),
+            )
+            .group_by(IndustrialAsset.user_id, IndustrialAsset.location)
+            .order_by(IndustrialAsset.user_id, IndustrialAsset.location)
+        )
+        if user_ids is not None:
+            query = query.where(IndustrialAsset.user_id.in_(list(user_ids)))
+        return query
+
+    async def compute(self, db: AsyncSession, user_ids: Optional[Iterable[int]] = None) -> Dict[Key, List[float]]:
+        """Valores esperados de la proyección, recalculados desde cero."""
+        expected: Dict[Key, List[float]] = defaultdict(lambda: [0] * len(MEASURES))
+        result = await db.execute(self.aggregate_query(user_ids))
+        for row in result:
+            for key in ((row.user_id, PLANT_TOTAL), (row.user_id, zone_name(row.location))):
+                totals = expected[key]
+                for i, name in enumerate(MEASURES):
+                    totals[i] += getattr(row, name) or 0
+        return dict(expected)
+
+    async def rebuild(self, db: AsyncSession, user_ids: Optional[Iterable[int]] = None) -> int:
+        """Reemplaza la proyección (toda o la de `user_ids`) por los valores recalculados; hace commit."""
+        user_ids = list(user_ids) if user_ids is not None else None
+        expected = await self.compute(db, user_ids)
+        stmt = delete(PlantSummary)
+        if user_ids is not None:
+            stmt = stmt.where(PlantSummary.user_id.in_(user_ids))
+        await db.execute(stmt)
+        if expected:
+            await db.execute(insert(PlantSummary), [
+                {"user_id": user_id, "zone": zone, **dict(zip(MEASURES, totals, strict=True))}
+                for (user_id, zone), totals in expected.items()
+            ])
+        await db.commit()
+        logger.info(f"Plant summaries rebuilt: {len(expected)} rows")
+        return len(expected)
+
+    async def check(
+        self, db: AsyncSession, user_ids: Optional[Iterable[int]] = None, rel_tol: float = 1e-6
+    ) -> List[Dict[str, Any]]:
+        """Diferencias entre la proyección y el recálculo; lista vacía si es consistente."""
+        user_ids = list(user_ids) if user_ids is not None else None
+        expected = await self.compute(db, user_ids)
+        query = select(PlantSummary).execution_options(populate_existing=True)
+        if user_ids is not None:
+            query = query.where(PlantSummary.user_id.in_(user_ids))
+        actual = {(row.user_id, row.zone): row for row in (await db.execute(query)).scalars()}
+
+        mismatches = []
+        for key in sorted(set(expected) | set(actual)):
+            row = actual.get(key)
+            values = expected.get(key, [0] * len(MEASURES))
+            for name, value in zip(MEASURES, values, strict=True):
+                stored = getattr(row, name) if row is not None else 0
+                if not math.isclose(stored, value, rel_tol=rel_tol, abs_tol=1e-6):
+                    mismatches.append({
+                        "user_id": key[0], "zone": key[1], "field": name, "expected": value, "actual": stored,
+                    })
+        return mismatches
+
+
+    @staticmethod
+    def register(session_class: type, dialect: str) -> None:
+        """
+        Conecta el listener after_flush a `session_class` (la sync_session_class del
+        sessionmaker de la app). Un motor sin upsert soportado falla aquí, al arrancar,
+        y no en cada escritura de activos.
+        """
+        upsert_for(dialect)
+        if not event.contains(session_class, "after_flush", _maintain_plant_summaries):
+            event.listen(session_class, "after_flush", _maintain_plant_summaries)
+
+
+plant_summary = PlantSummaryProjection()
+
+
+def _maintain_plant_summaries(session: Session, flush_context: Any) -> None:
+    deltas = plant_summary.session_deltas(session)
+    if deltas:
+        plant_summary.apply(session.connection(), deltas)
@@ -0,0 +1,126 @@
+import json
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.models.industrial_asset import IndustrialAsset
+
+# Aproximación estándar para español/JSON: ~4 caracteres por token
+CHARS_PER_TOKEN = 4
+
+
+def compact_json(data: Any) -> str:
+    """Serialización compacta para prompts: sin indentación ni espacios, acentos sin escapar."""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación barata de tokens sin tokenizador del proveedor."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class PlantPromptBuilder:
+    """
+    Construye el contexto de planta que se envía al LLM con un presupuesto de tokens fijo.
+
+    En lugar de listar cada activo, pre-agrega por (tipo, ubicación) y conserva solo los
+    N activos que más desperdician. Si aun así se excede el presupuesto, recorta primero
+    la lista de activos y luego agrupa las categorías menores en "Otros".
+    Así el tamaño del prompt (y la latencia/costo) no crece con el inventario.
+    """
+
+    TOP_COLUMNS = ["name", "type", "location", "kw", "eff", "waste_kwh"]
+    GROUP_COLUMNS = ["type", "location", "count", "kw", "kwh", "waste_kwh", "eff"]
+
+    def __init__(self, token_budget: Optional[int] = None, top_n: Optional[int] = None):
+        settings = get_settings()
+        self.token_budget = token_budget or settings.llm_prompt_token_budget
+        self.top_n = top_n if top_n is not None else settings.llm_prompt_top_assets
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        return estimate_tokens(text)
+
+    def build_plant_context(self, assets: Iterable[IndustrialAsset]) -> Dict[str, Any]:
+        """Contexto agregado de la planta, ya recortado al presupuesto de tokens."""
+        from app.services.industrial import IndustrialService
+
+        totals = {"assets": 0, "kw": 0.0, "kwh": 0.0, "waste_kwh": 0.0}
+        groups: Dict[Tuple[str, str], Dict[str, float]] = {}
+        rows: List[list] = []
+
+        for a in assets:
+            stats = IndustrialService.calculate_asset_consumption(a)
+            eff = a.efficiency_percentage if a.efficiency_percentage is not None else 85.0
+            key = (a.asset_type or "Otro", a.location or "General")
+
+            g = groups.setdefault(key, {"count": 0, "kw": 0.0, "kwh": 0.0, "waste_kwh": 0.0, "eff_kwh": 0.0})
+            g["count"] += 1
+            g["kw"] += stats["real_kw"]
+            g["kwh"] += stats["monthly_kwh"]
+            g["waste_kwh"] += stats["waste_kwh"]
+            g["eff_kwh"] += eff * stats["monthly_kwh"]
+
+            totals["assets"] += 1
+            totals["kw"] += stats["real_kw"]
+            totals["kwh"] += stats["monthly_kwh"]
+            totals["waste_kwh"] += stats["waste_kwh"]
+            rows.append([a.name, key[0], key[1], round(stats["real_kw"], 1), round(eff, 1), round(stats["waste_kwh"], 1)])
+
+        return self.fit(totals, groups, rows)
+
+    def fit(
+        self,
+        totals: Dict[str, float],
+        groups: Dict[Tuple[str, str], Dict[str, float]],
+        rows: List[list],
+    ) -> Dict[str, Any]:
+        """Arma el contexto y lo reduce hasta que su serialización compacta quepa en el presupuesto."""
+        group_rows = sorted(
+            (
+                [t, loc, int(g["count"]), round(g["kw"], 1), round(g["kwh"]), round(g["waste_kwh"]),
+                 round(g["eff_kwh"] / g["kwh"], 1) if g["kwh"] > 0 else None]
+                for (t, loc), g in groups.items()
+            ),
+            key=lambda r: r[5],
+            reverse=True,
+        )
+        top_rows = sorted(rows, key=lambda r: r[5], reverse=True)[: self.top_n]
+
+        context = self._context(totals, group_rows, top_rows)
+        while self.estimate_tokens(compact_json(context)) > self.token_budget:
+            if top_rows:
+                top_rows = top_rows[: len(top_rows) // 2]
+            elif len(group_rows) > 1:
+                keep = max(1, len(group_rows) // 2)
+                group_rows = group_rows[:keep - 1] + [self._merge_groups(group_rows[keep - 1:])]
+            else:
+                break
+            context = self._context(totals, group_rows, top_rows)
+        return context
+
+    def _context(self, totals: Dict[str, float], group_rows: List[list], top_rows: List[list]) -> Dict[str, Any]:
+        return {
+            "total_assets": int(totals["assets"]),
+            "total_real_kw": round(totals["kw"], 1),
+            "total_monthly_kwh": round(totals["kwh"]),
+            "total_waste_kwh": round(totals["waste_kwh"]),
+            "by_type_location": {"cols": self.GROUP_COLUMNS, "rows": group_rows},
+            "top_waste_assets": {"cols": self.TOP_COLUMNS, "rows": top_rows},
+        }
+
+    @staticmethod
+    def _merge_groups(group_rows: List[list]) -> list:
+        kwh = sum(r[4] for r in group_rows)
+        eff_kwh = sum((r[6] or 0) * r[4] for r in group_rows)
+        return [
+            "Otros", "Varias",
+            sum(r[2] for r in group_rows),
+            round(sum(r[3] for r in group_rows), 1),
+            round(kwh),
+            round(sum(r[5] for r in group_rows)),
+            round(eff_kwh / kwh, 1) if kwh > 0 else None,
+        ]
+
+
+plant_prompt_builder = PlantPromptBuilder()
@@ -1,9 +1,16 @@
-from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone
+from functools import partial
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.residential import ResidentialProfile, ResidentialAsset, ConsumptionReading
+from app.schemas import residential as schemas
 from app.services.gemini_service import gemini_service
+from app.services.insight_store import insight_store
+from app.services.peer_stats import peer_stats
 from app.core.energy_logic import energy_calculators
+from app.core.tariffs import get_tariff_engine
+from app.core.emissions import get_emission_factors
 
 
 class ResidentialService:
@@ -16,14 +23,38 @@ class ResidentialService:
         """Wrapper para obtener el precio del kWh desde el calculador central."""
         return energy_calculators.get_kwh_price(stratum)
 
+    def bill_readings(
+        self, readings: List[ConsumptionReading], stratum: Optional[int]
+    ) -> List[schemas.ConsumptionReading]:
+        """
+        Valora cada lectura con la tarifa vigente en su fecha (y franja horaria) y calcula
+        su huella con el factor de emisión de la red en ese momento, en una sola pasada
+        vectorizada sobre todo el historial. Devuelve esquemas; las filas ORM no se tocan.
+        """
+        if not readings:
+            return []
+        now = datetime.now(timezone.utc)
+        timestamps = [r.date or now for r in readings]
+        prices = get_tariff_engine().prices(stratum or 3, timestamps)
+        co2 = get_emission_factors().impact([r.reading_value for r in readings], timestamps)["co2_kg"]
+        return [
+            schemas.ConsumptionReading.model_validate(r).model_copy(
+                update={"tariff_kwh": price, "cost_cop": round(r.reading_value * price), "co2_kg": co2_kg}
+            )
+            for r, price, co2_kg in zip(readings, prices.tolist(), co2.tolist(), strict=True)
+        ]
+
     def calculate_appliance_cost(self, watts: float, hours: float, kwh_price: float) -> float:
         """Wrapper para calcular costo mensual."""
         monthly_kwh = energy_calculators.calculate_monthly_kwh(watts, hours)
         return monthly_kwh * kwh_price
 
-    async def get_dashboard_insights(self, db: AsyncSession, user_id: int) -> Dict[str, Any]:
+    async def compute_dashboard_metrics(
+        self, db: AsyncSession, user_id: int
+    ) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
         """
-        Genera una visión 360 del hogar: Financiero + Técnico + IA.
+        Fase determinista del dashboard del hogar (Financiero + Técnico).
+        Devuelve (métricas y análisis, contexto para la IA); el contexto es None si no hay usuario.
         """
         from app.models.user import User
         from sqlalchemy.orm import selectinload
@@ -42,11 +73,33 @@ class ResidentialService:
         user = result.scalar_one_or_none()
         
         if not user:
-            return {}
+            return {}, None
 
+        dashboard, home_context = self.build_dashboard_metrics(
+            user.residential_profile, user.residential_assets, user.consumption_readings
+        )
+        # Percentiles reales frente a hogares del mismo estrato y ciudad (None sin pares suficientes)
         profile = user.residential_profile
-        assets = user.residential_assets
-        readings = sorted(user.consumption_readings, key=lambda x: x.date, reverse=True)[:10]
+        dashboard["metrics"]["peer_comparison"] = peer_stats.compare(
+            profile.stratum if profile else 3,
+            profile.city if profile else None,
+            home_context["projected_kwh_month"],
+            profile.occupants if profile else 1,
+        )
+        return dashboard, home_context
+
+    def build_dashboard_metrics(
+        self,
+        profile: Optional[ResidentialProfile],
+        assets: List[ResidentialAsset],
+        readings: List[ConsumptionReading],
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Métricas y contexto IA a partir de datos ya cargados (sin tocar la base de datos).
+        Compartido con el job nocturno para que el contexto (y su hash) sea idéntico.
+        Solo se usan las 10 lecturas más recientes.
+        """
+        readings = sorted(readings, key=lambda x: x.date, reverse=True)[:10]
 
         # 2. Análisis Técnico vía Core
         stratum = profile.stratum if profile else 3
@@ -83,7 +136,10 @@ class ResidentialService:
             projected_kwh = total_estimated_monthly_cost / kwh_price if kwh_price > 0 else 0
 
         # 4. Métricas de Impacto
-        impact = energy_calculators.calculate_environmental_impact(projected_kwh)
+        # Factor medio de la red en el mes en curso (la proyección es mensual, sin perfil horario)
+        impact = energy_calculators.calculate_environmental_impact(
+            projected_kwh, get_emission_factors().mean_factor(datetime.now(timezone.utc))
+        )
         tech_efficiency_score = energy_calculators.calculate_efficiency_score(
             projected_kwh, 
             profile.occupants if profile else 1
@@ -99,11 +155,11 @@ class ResidentialService:
             "recent_history_kwh": [r.reading_value for r in readings] or (profile.history_kwh if profile else []),
             "monthly_budget": profile.target_monthly_bill if profile else 0,
             "estimated_monthly_cost": total_estimated_monthly_cost,
+            "vampire_cost_monthly": round(vampire_kwh_monthly * kwh_price),
             "projected_kwh_month": projected_kwh
         }
-        ai_output = await gemini_service.get_residential_insights(home_context)
 
-        return {
+        dashboard = {
             "metrics": {
                 "kwh_price": kwh_price,
                 "efficiency_score": tech_efficiency_score,
@@ -117,11 +173,68 @@ class ResidentialService:
             },
             "analysis": {
                 "total_assets": len(assets),
-                "high_impact_assets": high_impact_assets[:5],
+                "high_impact_assets": high_impact_assets[:5]
+            }
+        }
+        return dashboard, home_context
+
+    def apply_ai_insights(
+        self, dashboard: Dict[str, Any], ai_output: Dict[str, Any], freshness: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Síntesis final: métricas locales + consejo y misiones de la IA."""
+        return {
+            **dashboard,
+            "analysis": {
+                **dashboard["analysis"],
                 "top_waste_reason": ai_output.get("top_waste_reason", "Consumo Base Elevado")
             },
             "ai_advice": ai_output.get("ai_advice", "Excelente gestión."),
-            "missions": ai_output.get("missions", [])
+            "missions": ai_output.get("missions", []),
+            "ai_source": ai_output.get("source"),
+            **freshness
         }
 
+    @staticmethod
+    def _insight_generator(user_id: int):
+        """Generador de insights de IA ligado al usuario (para su medición de uso y cuota)."""
+        return partial(gemini_service.get_residential_insights, user_id=user_id)
+
+    async def get_dashboard_insights(self, db: AsyncSession, user_id: int) -> Dict[str, Any]:
+        """
+        Genera una visión 360 del hogar: Financiero + Técnico + IA.
+        """
+        dashboard, home_context = await self.compute_dashboard_metrics(db, user_id)
+        if home_context is None:
+            return dashboard
+
+        # Último insight guardado al instante; se regenera en segundo plano si venció
+        ai_output, freshness = await insight_store.get_or_generate(
+            db, user_id, "residential", home_context, self._insight_generator(user_id)
+        )
+        return self.apply_ai_insights(dashboard, ai_output, freshness)
+
+    async def open_dashboard_stream(self, db: AsyncSession, user_id: int) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Modo progresivo: resuelve ahora todo lo que requiere base de datos y devuelve un
+        iterador que emite ("metrics", ...) de inmediato y ("insights", ...) cuando la IA responde.
+        """
+        dashboard, home_context = await self.compute_dashboard_metrics(db, user_id)
+        cached = None
+        if home_context is not None:
+            cached = await insight_store.lookup(
+                db, user_id, "residential", home_context, self._insight_generator(user_id)
+            )
+
+        async def events():
+            yield "metrics", dashboard
+            if home_context is None:
+                yield "insights", dashboard
+                return
+            ai_output, freshness = cached or await insight_store.generate_and_store(
+                user_id, "residential", home_context, self._insight_generator(user_id)
+            )
+            yield "insights", self.apply_ai_insights(dashboard, ai_output, freshness)
+
+        return events()
+
 residential_service = ResidentialService()
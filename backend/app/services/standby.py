@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import and_, case, false, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.energy_logic import EnergyCalculators
+from app.models.residential import ResidentialAsset
+
+
+class StandbyModel:
+    """
+    Consumo standby (vampiro) por hogar a partir de EnergyCalculators.STANDBY_KWH_TABLE.
+
+    La misma tabla se evalúa en memoria (get_vampire_estimate sobre activos cargados) o
+    como un CASE en SQL agregado con GROUP BY user_id, así el consumo vampiro de toda la
+    cartera sale de una sola consulta. Los resultados por usuario se guardan en una caché
+    LRU que los endpoints de activos invalidan al crear, editar o borrar equipos; el TTL
+    cubre los cambios hechos por otros procesos.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        settings = get_settings()
+        self.max_entries = max_entries or settings.standby_cache_max_entries
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.standby_cache_ttl_seconds
+        # user_id -> (kWh standby, instante del cálculo); el orden es el de uso (LRU)
+        self._cache: "OrderedDict[int, Tuple[float, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def kwh_expression():
+        """CASE SQL equivalente a la tabla: kWh standby de cada fila de residential_assets."""
+        high_impact = func.coalesce(ResidentialAsset.is_high_impact, false())
+        return case(
+            *[
+                (and_(ResidentialAsset.icon == icon, high_impact == is_high), kwh)
+                for (icon, is_high), kwh in EnergyCalculators.STANDBY_KWH_TABLE.items()
+            ],
+            else_=0.0,
+        )
+
+    def subquery(self):
+        """(user_id, standby_kwh) de todos los hogares con equipos, para unir con otras consultas."""
+        return (
+            select(ResidentialAsset.user_id, func.sum(self.kwh_expression()).label("standby_kwh"))
+            .group_by(ResidentialAsset.user_id)
+            .subquery()
+        )
+
+    async def kwh_by_user(self, db: AsyncSession, user_ids: Optional[Iterable[int]] = None) -> Dict[int, float]:
+        """
+        kWh standby mensuales por usuario en una sola consulta agregada.
+        Con `user_ids` se devuelven todos (0 si no tienen equipos) y se guardan en la caché.
+        """
+        query = select(ResidentialAsset.user_id, func.sum(self.kwh_expression())).group_by(ResidentialAsset.user_id)
+        if user_ids is not None:
+            user_ids = list(user_ids)
+            query = query.where(ResidentialAsset.user_id.in_(user_ids))
+        result = await db.execute(query)
+        totals = {user_id: float(kwh or 0.0) for user_id, kwh in result.all()}
+        if user_ids is not None:
+            totals = {user_id: totals.get(user_id, 0.0) for user_id in user_ids}
+            for user_id, kwh in totals.items():
+                self._store(user_id, kwh)
+        return totals
+
+    async def get_user_kwh(self, db: AsyncSession, user_id: int) -> float:
+        """kWh standby de un hogar, servido desde la caché mientras sus equipos no cambien."""
+        cached = self._cache.get(user_id)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl_seconds:
+            self._cache.move_to_end(user_id)
+            self.hits += 1
+            return cached[0]
+        self.misses += 1
+        return (await self.kwh_by_user(db, [user_id]))[user_id]
+
+    def _store(self, user_id: int, kwh: float) -> None:
+        self._cache[user_id] = (kwh, time.monotonic())
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """Descarta el valor de un hogar: llamar tras crear, editar o borrar sus equipos."""
+        self._cache.pop(user_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+standby_model = StandbyModel()
@@ -0,0 +1,235 @@
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.session import get_async_session
+from app.models.llm_usage import LLMUsageEvent
+from app.services.prompt_builder import estimate_tokens
+
+logger = logging.getLogger("app")
+
+# Resultados que implican una llamada real al proveedor (cuentan para la cuota y los tokens).
+# "coalesced" (esperó la llamada idéntica de otro) y "cached" no llegan al proveedor
+BILLABLE_OUTCOMES = ("ok", "error")
+
+
+class UsageLedger:
+    """
+    Medición de uso del LLM por usuario y endpoint.
+
+    `record` solo agrega la fila a un buffer en memoria; una tarea de fondo la inserta
+    por lotes (cada `flush_seconds` o al llenarse `batch_size`), así el request nunca
+    espera a la base de datos. Los contadores diarios para las cuotas se siembran desde
+    el ledger la primera vez que se consulta un usuario en el día y luego se llevan en memoria.
+    """
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_seconds: Optional[float] = None,
+        daily_request_quota: Optional[int] = None,
+        daily_token_quota: Optional[int] = None,
+    ):
+        settings = get_settings()
+        self.batch_size = batch_size or settings.llm_usage_batch_size
+        self.flush_seconds = flush_seconds if flush_seconds is not None else settings.llm_usage_flush_seconds
+        self.daily_request_quota = (
+            daily_request_quota if daily_request_quota is not None else settings.llm_daily_request_quota
+        )
+        self.daily_token_quota = daily_token_quota if daily_token_quota is not None else settings.llm_daily_token_quota
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_sleeping = False  # el flush diferido aún espera y no tomó filas del buffer
+        self._writes: Set[asyncio.Task] = set()  # lotes sacados del buffer en escritura
+        self._day: Optional[date] = None
+        self._requests: Dict[int, int] = {}
+        self._tokens: Dict[int, int] = {}
+        self._seeded: Set[int] = set()
+        self.dropped = 0
+
+    def record(
+        self,
+        *,
+        user_id: Optional[int],
+        endpoint: str,
+        model: Optional[str],
+        outcome: str,
+        prompt: str = "",
+        response: str = "",
+        latency_seconds: float = 0.0,
+    ) -> None:
+        """Agrega una llamada al ledger (sin I/O); la escritura ocurre en segundo plano."""
+        prompt_tokens = estimate_tokens(prompt)
+        response_tokens = estimate_tokens(response)
+        self._buffer.append({
+            "user_id": user_id,
+            "endpoint": endpoint,
+            "model": model,
+            "outcome": outcome,
+            "prompt_chars": len(prompt),
+            "response_chars": len(response),
+            "prompt_tokens": prompt_tokens,
+            "response_tokens": response_tokens,
+            "latency_ms": round(latency_seconds * 1000, 1),
+            "created_at": datetime.now(timezone.utc),
+        })
+
+        self._roll_day()
+        if user_id in self._seeded and outcome in BILLABLE_OUTCOMES:
+            self._requests[user_id] = self._requests.get(user_id, 0) + 1
+            self._tokens[user_id] = self._tokens.get(user_id, 0) + prompt_tokens + response_tokens
+
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Sin loop (scripts síncronos): se escribe en el próximo flush explícito
+        if self._flush_task is not None and not self._flush_task.done() and self._flush_task.get_loop() is loop:
+            return
+        delay = 0.0 if len(self._buffer) >= self.batch_size else self.flush_seconds
+        # En espera desde que se programa: la tarea puede no haber arrancado aún
+        self._flush_sleeping = bool(delay)
+        self._flush_task = loop.create_task(self._flush_later(delay))
+
+    async def _flush_later(self, delay: float) -> None:
+        if delay:
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self._flush_sleeping = False
+        await self.flush()
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> None:
+        try:
+            async for db in get_async_session():
+                await db.execute(insert(LLMUsageEvent), rows)
+                await db.commit()
+        except Exception as e:
+            # El ledger no debe tumbar el chat: se descarta el lote y se registra cuánto se perdió
+            self.dropped += len(rows)
+            logger.error(f"Error writing {len(rows)} LLM usage events: {e}")
+
+    async def flush(self) -> None:
+        """
+        Inserta el buffer pendiente en lotes de `batch_size` con una sola sentencia cada uno
+        y espera también los lotes que otro flush (el diferido) tenga en escritura. Al
+        volver no queda ninguna tarea del ledger pendiente (se puede cerrar el loop).
+        """
+        pending = self._flush_task
+        if pending is not None and (
+            pending is asyncio.current_task() or pending.done() or pending.get_loop() is not asyncio.get_running_loop()
+        ):
+            pending = None
+        if pending is not None and self._flush_sleeping:
+            pending.cancel()  # Flush explícito (apagado, reporte): el diferido en espera sobra
+            self._flush_sleeping = False
+        while self._buffer:
+            rows, self._buffer = self._buffer[: self.batch_size], self._buffer[self.batch_size:]
+            write = asyncio.ensure_future(self._write(rows))
+            self._writes.add(write)
+            write.add_done_callback(self._writes.discard)
+            # shield: cancelar a quien hace flush no pierde un lote ya sacado del buffer
+            await asyncio.shield(write)
+        if self._writes:
+            await asyncio.shield(asyncio.gather(*self._writes))
+        if pending is not None:
+            # Cancelado o escribiendo sus lotes: termina antes de que flush devuelva
+            await asyncio.shield(asyncio.gather(pending, return_exceptions=True))
+
+    def _roll_day(self) -> None:
+        today = datetime.now(timezone.utc).date()
+        if self._day != today:
+            self._day = today
+            self._requests.clear()
+            self._tokens.clear()
+            self._seeded.clear()
+
+    async def _seed(self, user_id: int) -> None:
+        start_of_day = datetime.combine(self._day, time.min, tzinfo=timezone.utc)
+        async for db in get_async_session():
+            result = await db.execute(
+                select(
+                    func.count(LLMUsageEvent.id),
+                    func.coalesce(func.sum(LLMUsageEvent.prompt_tokens + LLMUsageEvent.response_tokens), 0),
+                ).where(
+                    LLMUsageEvent.user_id == user_id,
+                    LLMUsageEvent.created_at >= start_of_day,
+                    LLMUsageEvent.outcome.in_(BILLABLE_OUTCOMES),
+                )
+            )
+            requests, tokens = result.one()
+        # Incluye lo que aún está en el buffer de este proceso
+        pending = [r for r in self._buffer if r["user_id"] == user_id and r["outcome"] in BILLABLE_OUTCOMES]
+        self._requests[user_id] = requests + len(pending)
+        self._tokens[user_id] = tokens + sum(r["prompt_tokens"] + r["response_tokens"] for r in pending)
+        self._seeded.add(user_id)
+
+    async def is_over_quota(self, user_id: Optional[int]) -> bool:
+        """True si el usuario agotó su cuota diaria de llamadas o de tokens."""
+        if user_id is None or (not self.daily_request_quota and not self.daily_token_quota):
+            return False
+        self._roll_day()
+        if user_id not in self._seeded:
+            try:
+                await self._seed(user_id)
+            except Exception as e:
+                logger.error(f"Error reading LLM usage for user {user_id}: {e}")
+                return False
+        if self.daily_request_quota and self._requests.get(user_id, 0) >= self.daily_request_quota:
+            return True
+        return bool(self.daily_token_quota and self._tokens.get(user_id, 0) >= self.daily_token_quota)
+
+    async def report(
+        self, db: AsyncSession, days: int = 1, user_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Uso agregado por usuario y endpoint en los últimos `days` días. Los tokens y la
+        latencia son solo de las llamadas reales al proveedor.
+        """
+        await self.flush()
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        billable = LLMUsageEvent.outcome.in_(BILLABLE_OUTCOMES)
+        query = (
+            select(
+                LLMUsageEvent.user_id,
+                LLMUsageEvent.endpoint,
+                func.count(LLMUsageEvent.id).label("calls"),
+                func.sum(case((billable, 1), else_=0)).label("provider_calls"),
+                func.sum(case((LLMUsageEvent.outcome == "error", 1), else_=0)).label("errors"),
+                func.sum(case((LLMUsageEvent.outcome == "cached", 1), else_=0)).label("cached"),
+                func.sum(case((LLMUsageEvent.outcome == "coalesced", 1), else_=0)).label("coalesced"),
+                func.sum(
+                    case((LLMUsageEvent.outcome.in_(("quota", "circuit_open", "queue_timeout")), 1), else_=0)
+                ).label("fallbacks"),
+                func.coalesce(func.sum(case((billable, LLMUsageEvent.prompt_tokens))), 0).label("prompt_tokens"),
+                func.coalesce(func.sum(case((billable, LLMUsageEvent.response_tokens))), 0).label("response_tokens"),
+                func.avg(case((billable, LLMUsageEvent.latency_ms))).label("avg_latency_ms"),
+                func.max(case((billable, LLMUsageEvent.latency_ms))).label("max_latency_ms"),
+            )
+            .where(LLMUsageEvent.created_at >= since)
+            .group_by(LLMUsageEvent.user_id, LLMUsageEvent.endpoint)
+            .order_by(
+                func.sum(case((billable, LLMUsageEvent.prompt_tokens + LLMUsageEvent.response_tokens))).desc()
+            )
+        )
+        if user_id is not None:
+            query = query.where(LLMUsageEvent.user_id == user_id)
+        result = await db.execute(query)
+        return [
+            {
+                **row._asdict(),
+                "avg_latency_ms": round(row.avg_latency_ms, 1) if row.avg_latency_ms is not None else None,
+            }
+            for row in result.all()
+        ]
+
+
+usage_ledger = UsageLedger()
@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.services.plant_summary import plant_summary
+
+
+class ZoneAnalysis:
+    """
+    Consumo de la planta por zona (location): kWh/mes, número de máquinas y eficiencia
+    ponderada por consumo, leídos de la proyección plant_summaries (una fila por zona,
+    mantenida por deltas al cambiar los activos). El resultado por usuario se guarda en
+    una caché LRU que los endpoints de activos invalidan al crear o borrar equipos; el
+    TTL cubre los cambios hechos por otros procesos.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        settings = get_settings()
+        self.max_entries = max_entries or settings.zone_cache_max_entries
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.zone_cache_ttl_seconds
+        # user_id -> (zonas, instante del cálculo); el orden es el de uso (LRU)
+        self._cache: "OrderedDict[int, Tuple[List[Dict[str, Any]], float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _zone(name: str, consumption: float, machines: int, weighted_eff_sum: float) -> Dict[str, Any]:
+        avg_eff = weighted_eff_sum / consumption if consumption > 0 else 85
+        return {
+            "name": name,
+            "consumption": round(consumption),
+            "machines": machines,
+            "status": "optimal" if avg_eff > 85 else "warning" if avg_eff > 75 else "critical",
+            "efficiency": round(avg_eff, 1),
+            "change": round((100 - avg_eff) / 2, 1)
+        }
+
+    async def compute(self, db: AsyncSession, user_id: int) -> List[Dict[str, Any]]:
+        """Zonas de la planta desde la proyección (sin caché)."""
+        return [
+            self._zone(row.zone, row.monthly_kwh, row.asset_count, row.weighted_eff_sum)
+            for row in await plant_summary.zones(db, user_id)
+        ]
+
+    async def get_user_zones(self, db: AsyncSession, user_id: int) -> List[Dict[str, Any]]:
+        """Zonas de la planta, servidas desde la caché mientras sus activos no cambien."""
+        cached = self._cache.get(user_id)
+        if cached is not None and time.monotonic() - cached[1] < self.ttl_seconds:
+            self._cache.move_to_end(user_id)
+            self.hits += 1
+            return cached[0]
+        self.misses += 1
+        zones = await self.compute(db, user_id)
+        self._cache[user_id] = (zones, time.monotonic())
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return zones
+
+    def invalidate(self, user_id: int) -> None:
+        """Descarta las zonas de una planta: llamar tras crear o borrar sus activos."""
+        self._cache.pop(user_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+zone_analysis = ZoneAnalysis()
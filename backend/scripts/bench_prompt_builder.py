@@ -0,0 +1,87 @@
+"""
+Benchmark del contexto de chat industrial: tamaño del prompt y latencia de construcción
+vs tamaño del inventario, comparando la serialización anterior (todos los activos,
+indent=2) con PlantPromptBuilder (agregado + top-N + presupuesto de tokens).
+
+Uso:
+    python scripts/bench_prompt_builder.py --sizes 10 100 1000 10000 50000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.prompt_builder import PlantPromptBuilder, compact_json
+
+ASSET_TYPES = ["Motor", "Compresor", "Caldera", "Bomba", "Chiller", "Iluminación"]
+LOCATIONS = ["Planta 1", "Planta 2", "Bodega", "Envasado", "Calderas", "Oficinas", "Taller"]
+
+
+def synthetic_assets(n: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [
+        SimpleNamespace(
+            name=f"Equipo-{i}",
+            asset_type=rng.choice(ASSET_TYPES),
+            location=rng.choice(LOCATIONS),
+            nominal_power_kw=rng.uniform(0.5, 250.0),
+            efficiency_percentage=rng.uniform(55.0, 97.0),
+            load_factor=rng.uniform(0.4, 1.0),
+            power_factor=rng.uniform(0.7, 0.99),
+            daily_usage_hours=rng.uniform(1.0, 24.0),
+            op_days_per_month=rng.choice([22, 26, 30]),
+        )
+        for i in range(n)
+    ]
+
+
+def legacy_context(assets) -> str:
+    """Lo que enviaba el endpoint de chat antes: cada activo con indent=2."""
+    return json.dumps({
+        "assets": [
+            {"name": a.name, "type": a.asset_type, "power_kw": a.nominal_power_kw, "efficiency": a.efficiency_percentage}
+            for a in assets
+        ]
+    }, indent=2)
+
+
+def timed(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return out, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000, 50000])
+    parser.add_argument("--budget", type=int, default=None, help="Presupuesto de tokens (default: settings)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    builder = PlantPromptBuilder(token_budget=args.budget)
+    print(f"Presupuesto: {builder.token_budget} tokens, top-N: {builder.top_n}\n")
+    print(f"{'activos':>8} | {'legacy tokens':>13} {'legacy ms':>9} | {'builder tokens':>14} {'builder ms':>10} | {'reducción':>9}")
+    print("-" * 80)
+
+    for n in args.sizes:
+        assets = synthetic_assets(n)
+        legacy, legacy_ms = timed(lambda assets=assets: legacy_context(assets), args.repeat)
+        compact, builder_ms = timed(lambda assets=assets: compact_json(builder.build_plant_context(assets)), args.repeat)
+        legacy_tokens = PlantPromptBuilder.estimate_tokens(legacy)
+        builder_tokens = PlantPromptBuilder.estimate_tokens(compact)
+        print(
+            f"{n:>8} | {legacy_tokens:>13,} {legacy_ms:>9.1f} | {builder_tokens:>14,} {builder_ms:>10.1f} |"
+            f" {legacy_tokens / max(builder_tokens, 1):>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Facturación estimada del mes para toda la cartera residencial.
+
+Recorre los perfiles con un cursor del servidor, valora cada chunk de forma vectorizada
+(tarifa vigente en el mes, subsidio, fugas, comparación con el estrato) y escribe el
+resultado en streaming a CSV o Parquet (requiere pyarrow). Al final imprime el reporte
+con filas por segundo.
+
+Uso:
+    python scripts/bill_portfolio.py --output logs/facturacion.csv
+    python scripts/bill_portfolio.py --month 2025-06 --format parquet --output logs/facturacion.parquet
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.billing_batch import OUTPUT_FORMATS, PortfolioBillingJob
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Facturación masiva de la cartera residencial")
+    parser.add_argument("--output", required=True, help="Archivo de salida")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="Formato (por defecto según la extensión)")
+    parser.add_argument("--month", help="Mes facturado AAAA-MM (por defecto el actual)")
+    parser.add_argument("--chunk-size", type=int, help="Filas por chunk del cursor")
+    args = parser.parse_args()
+
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+    month = datetime.strptime(args.month, "%Y-%m").date() if args.month else None
+
+    job = PortfolioBillingJob(chunk_size=args.chunk_size, fmt=fmt)
+    stats = asyncio.run(job.run(args.output, month))
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Servidor local que imita la API REST de Gemini (generateContent y streamGenerateContent)
+para pruebas de carga sin gastar cuota ni depender de la red.
+
+Devuelve JSON enlatado o con plantilla según el tipo de prompt (insights industriales,
+residenciales o chat), con latencia y tasa de errores configurables.
+
+Uso:
+    python scripts/fake_gemini_server.py --port 8089 --latency lognormal --latency-ms 800 --error-rate 0.05
+
+y en el backend (.env):
+    GEMINI_API_KEY=fake
+    GEMINI_BASE_URL=http://127.0.0.1:8089
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+from typing import Any, Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Plantillas por tipo de prompt. Los strings se formatean con {n} (número de petición)
+# y {model}; se pueden reemplazar con --responses archivo.json (mismas claves).
+DEFAULT_RESPONSES: Dict[str, Any] = {
+    "industrial": {
+        "waste_score": 42,
+        "top_waste_reason": "Motores sobredimensionados operando a baja carga",
+        "potential_savings": "$ 1.250.000",
+        "recommendation_highlight": "Instalar variadores de frecuencia en las bombas principales",
+        "ai_interpretation": "Respuesta simulada #{n} de {model}: el desperdicio se concentra en equipos antiguos.",
+    },
+    "residential": {
+        "efficiency_score": 68,
+        "top_waste_reason": "Consumo vampiro de equipos en standby",
+        "ai_advice": "Respuesta simulada #{n}: desconecta el TV y el decodificador en la noche.",
+        "potential_savings_percent": 12,
+        "missions": [
+            {"id": 1, "title": "Cazador de vampiros", "xp": 50, "icon": "zap"},
+            {"id": 2, "title": "Ducha corta", "xp": 30, "icon": "droplet"},
+        ],
+    },
+    "chat": {
+        "response": "Respuesta simulada #{n}: revisa primero los equipos de mayor consumo y su horario de uso."
+    },
+}
+
+
+class FakeGemini:
+    def __init__(
+        self,
+        responses: Dict[str, Any],
+        latency: str = "fixed",
+        latency_ms: float = 300.0,
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        stream_chunk_chars: int = 24,
+        stream_chunk_delay_ms: float = 20.0,
+        seed: Optional[int] = None,
+    ):
+        self.responses = responses
+        self.latency = latency
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stream_chunk_chars = stream_chunk_chars
+        self.stream_chunk_delay_ms = stream_chunk_delay_ms
+        self.rng = random.Random(seed)
+        self.counter = itertools.count(1)
+
+    def delay_seconds(self) -> float:
+        """Latencia simulada según la distribución elegida."""
+        if self.latency == "uniform":
+            ms = self.rng.uniform(0, 2 * self.latency_ms)
+        elif self.latency == "lognormal":
+            # Media = latency_ms; cola larga controlada por sigma
+            mu = math.log(self.latency_ms) - self.latency_sigma ** 2 / 2
+            ms = self.rng.lognormvariate(mu, self.latency_sigma)
+        else:
+            ms = self.latency_ms
+        return ms / 1000.0
+
+    def should_fail(self) -> bool:
+        return self.rng.random() < self.error_rate
+
+    @staticmethod
+    def classify(prompt: str) -> str:
+        if "waste_score" in prompt:
+            return "industrial"
+        if "missions" in prompt:
+            return "residential"
+        return "chat"
+
+    def render(self, prompt: str, model: str) -> str:
+        template = self.responses.get(self.classify(prompt), DEFAULT_RESPONSES["chat"])
+        values = {"n": next(self.counter), "model": model}
+
+        def fill(value):
+            if isinstance(value, str):
+                return value.format(**values)
+            if isinstance(value, dict):
+                return {k: fill(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [fill(v) for v in value]
+            return value
+
+        return json.dumps(fill(template), ensure_ascii=False)
+
+    @staticmethod
+    def envelope(text: str, finish: Optional[str] = "STOP") -> Dict[str, Any]:
+        candidate: Dict[str, Any] = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+        if finish:
+            candidate["finishReason"] = finish
+        tokens = max(1, len(text) // 4)
+        return {
+            "candidates": [candidate],
+            "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": tokens, "totalTokenCount": tokens},
+        }
+
+    def error(self) -> JSONResponse:
+        return JSONResponse(
+            status_code=self.error_status,
+            content={"error": {"code": self.error_status, "message": "Simulated failure", "status": "UNAVAILABLE"}},
+        )
+
+
+def extract_prompt(body: Dict[str, Any]) -> str:
+    parts = [p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", [])]
+    return "\n".join(parts)
+
+
+def create_app(fake: FakeGemini) -> FastAPI:
+    app = FastAPI(title="Fake Gemini")
+
+    @app.post("/{api_version}/models/{model_action}")
+    async def models_action(api_version: str, model_action: str, request: Request):
+        model, _, action = model_action.partition(":")
+        prompt = extract_prompt(await request.json())
+
+        await asyncio.sleep(fake.delay_seconds())
+        if fake.should_fail():
+            return fake.error()
+
+        text = fake.render(prompt, model)
+        if action == "generateContent":
+            return fake.envelope(text)
+
+        async def chunks():
+            size = fake.stream_chunk_chars
+            pieces = [text[i:i + size] for i in range(0, len(text), size)]
+            for i, piece in enumerate(pieces):
+                last = i == len(pieces) - 1
+                yield f"data: {json.dumps(fake.envelope(piece, 'STOP' if last else None))}\r\n\r\n"
+                if not last:
+                    await asyncio.sleep(fake.stream_chunk_delay_ms / 1000.0)
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Gemini simulado para pruebas de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Latencia (media) por respuesta")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Dispersión de la lognormal")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de peticiones que fallan")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--chunk-chars", type=int, default=24, help="Tamaño de cada chunk en streaming")
+    parser.add_argument("--chunk-delay-ms", type=float, default=20.0)
+    parser.add_argument("--responses", help="JSON con plantillas por tipo: industrial, residential, chat")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    responses = dict(DEFAULT_RESPONSES)
+    if args.responses:
+        with open(args.responses, encoding="utf-8") as f:
+            responses.update(json.load(f))
+
+    fake = FakeGemini(
+        responses,
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        stream_chunk_chars=args.chunk_chars,
+        stream_chunk_delay_ms=args.chunk_delay_ms,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(fake), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
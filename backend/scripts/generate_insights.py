@@ -0,0 +1,44 @@
+"""
+Job nocturno: genera y guarda los insights de IA de todas las plantas y hogares para que
+el tráfico de la mañana se sirva desde insights precalculados.
+
+Es reanudable: si el proceso se interrumpe, volver a ejecutarlo continúa desde el último
+usuario completado (ver INSIGHT_BATCH_CHECKPOINT_PATH). Usa --restart para empezar de cero.
+
+Uso:
+    python scripts/generate_insights.py
+    python scripts/generate_insights.py --profile industrial --chunk-size 500 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.insight_batch import PROFILE_TYPES, InsightBatchJob
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generación masiva de insights de IA")
+    parser.add_argument("--profile", choices=PROFILE_TYPES, action="append", help="Perfil(es) a procesar (por defecto todos)")
+    parser.add_argument("--chunk-size", type=int, help="Usuarios por página")
+    parser.add_argument("--concurrency", type=int, help="Llamadas simultáneas a Gemini")
+    parser.add_argument("--checkpoint", help="Ruta del archivo de checkpoint")
+    parser.add_argument("--restart", action="store_true", help="Ignora el checkpoint y empieza desde el primer usuario")
+    parser.add_argument("--force", action="store_true", help="Regenera también los insights que siguen frescos")
+    args = parser.parse_args()
+
+    job = InsightBatchJob(
+        chunk_size=args.chunk_size,
+        concurrency=args.concurrency,
+        checkpoint_path=args.checkpoint,
+        force=args.force,
+    )
+    stats = asyncio.run(job.run(args.profile or PROFILE_TYPES, resume=not args.restart))
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
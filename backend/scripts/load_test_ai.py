@@ -0,0 +1,150 @@
+"""
+Prueba de carga de los endpoints de IA (dashboard-insights y assistant/chat).
+
+Lanza peticiones con concurrencia fija contra un backend en marcha y reporta throughput,
+latencias de cola (p50/p90/p95/p99/max), errores y respuestas de fallback por endpoint.
+Pensado para usarse con scripts/fake_gemini_server.py (GEMINI_BASE_URL) y así no gastar cuota.
+
+Uso:
+    python scripts/fake_gemini_server.py --latency lognormal --latency-ms 800 &
+    GEMINI_API_KEY=fake GEMINI_BASE_URL=http://127.0.0.1:8089 uvicorn app.main:app --port 8000 &
+    python scripts/load_test_ai.py --profile industrial --concurrency 50 --requests 1000 --chat-ratio 0.3
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.gemini_service import GeminiService
+
+QUESTIONS = [
+    "¿Qué equipo consume más?",
+    "¿Cómo bajo la factura este mes?",
+    "¿Vale la pena cambiar los motores?",
+    "¿Qué es el consumo vampiro?",
+    "¿Cuál es mi mayor desperdicio?",
+]
+
+
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.fallbacks: Dict[str, int] = defaultdict(int)
+
+    def record(self, name: str, latency: float, ok: bool, fallback: bool) -> None:
+        self.latencies[name].append(latency)
+        if not ok:
+            self.errors[name] += 1
+        elif fallback:
+            self.fallbacks[name] += 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def is_fallback(name: str, body: dict) -> bool:
+    if name == "chat":
+        # Mensajes de servicio (sin configurar, error, saturado, cuota diaria agotada)
+        return GeminiService.is_fallback_reply(body.get("response", ""))
+    # Insights servidos por el generador de reglas (circuito abierto, cola llena, error)
+    return body.get("ai_source") == "rules"
+
+
+async def one_request(
+    client: httpx.AsyncClient, prefix: str, name: str, unique: bool, seq: int, results: Results
+) -> None:
+    if name == "chat":
+        message = random.choice(QUESTIONS)
+        if unique:
+            # Evita que el single-flight del backend agrupe preguntas idénticas
+            message = f"{message} (#{seq})"
+        request = client.build_request("POST", f"{prefix}/assistant/chat", params={"message": message})
+    else:
+        request = client.build_request("GET", f"{prefix}/dashboard-insights")
+
+    start = time.perf_counter()
+    try:
+        response = await client.send(request)
+        ok = response.status_code < 400
+        body = response.json() if ok else {}
+    except httpx.HTTPError:
+        ok, body = False, {}
+    results.record(name, time.perf_counter() - start, ok, ok and is_fallback(name, body))
+
+
+async def run(args) -> None:
+    prefix = f"{args.api_prefix}/{args.profile}"
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    results = Results()
+    queue: asyncio.Queue = asyncio.Queue()
+    for seq in range(args.requests):
+        queue.put_nowait((seq, "chat" if random.random() < args.chat_ratio else "insights"))
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, headers=headers, timeout=args.timeout, limits=limits) as client:
+        async def worker():
+            while True:
+                try:
+                    seq, name = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await one_request(client, prefix, name, args.unique_messages, seq, results)
+
+        # Calentamiento fuera de la medición: crea el usuario de dev_mode y el primer insight
+        await one_request(client, prefix, "insights", False, -1, Results())
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    report(results, elapsed, args)
+
+
+def report(results: Results, elapsed: float, args) -> None:
+    total = sum(len(v) for v in results.latencies.values())
+    print(f"\n{args.profile} | concurrencia {args.concurrency} | {total} peticiones en {elapsed:.2f}s "
+          f"| {total / elapsed:.1f} req/s\n")
+    header = f"{'endpoint':<10}{'n':>7}{'req/s':>9}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}{'errors':>8}{'fallback':>10}"
+    print(header)
+    print("-" * len(header))
+    for name in sorted(results.latencies):
+        values = sorted(results.latencies[name])
+        ms = [percentile(values, p) * 1000 for p in (50, 90, 95, 99)] + [values[-1] * 1000]
+        print(
+            f"{name:<10}{len(values):>7}{len(values) / elapsed:>9.1f}"
+            + "".join(f"{v:>9.0f}" for v in ms)
+            + f"{results.errors[name]:>8}{results.fallbacks[name]:>10}"
+        )
+    print("\n(latencias en ms)")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Prueba de carga de los endpoints de IA")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--api-prefix", default="/api/v1")
+    parser.add_argument("--profile", choices=["industrial", "residential"], default="industrial")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--chat-ratio", type=float, default=0.3, help="Fracción de peticiones de chat")
+    parser.add_argument("--unique-messages", action="store_true", help="Mensajes distintos por petición")
+    parser.add_argument("--token", help="JWT del usuario (sin token se usa el usuario de dev_mode)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    random.seed(args.seed)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Reconstruye o verifica la proyección plant_summaries (totales por planta y por zona).
+
+La migración que crea la tabla ya la carga; hace falta después de cargas masivas que
+escriben en industrial_assets sin pasar por la sesión ORM. Con --check solo compara la
+proyección con el recálculo desde industrial_assets e imprime las diferencias (código de
+salida 1 si hay).
+
+Uso:
+    python scripts/rebuild_plant_summaries.py
+    python scripts/rebuild_plant_summaries.py --user 12 --user 15
+    python scripts/rebuild_plant_summaries.py --check
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db.session import get_async_session
+from app.services.plant_summary import plant_summary
+
+
+async def run(user_ids, check_only: bool) -> int:
+    async for db in get_async_session():
+        if check_only:
+            mismatches = await plant_summary.check(db, user_ids)
+            print(json.dumps({"mismatches": len(mismatches), "details": mismatches[:50]}, indent=2, ensure_ascii=False))
+            return 1 if mismatches else 0
+        rows = await plant_summary.rebuild(db, user_ids)
+        print(json.dumps({"rows": rows}, indent=2))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Proyección de totales de planta (plant_summaries)")
+    parser.add_argument("--user", type=int, action="append", help="Solo estas plantas (repetible)")
+    parser.add_argument("--check", action="store_true", help="Verificar sin modificar")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.user, args.check)))
+
+
+if __name__ == "__main__":
+    main()
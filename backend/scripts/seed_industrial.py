@@ -5,23 +5,18 @@ import os
 # Añadimos el directorio raíz al path para poder importar la app
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import get_async_session, get_async_engine
+from app.db.session import get_async_session, get_session_factory
 from sqlalchemy.future import select
 from app.models.industrial_settings import IndustrialSettings
 from app.models.industrial_asset import IndustrialAsset
 from app.models.user import User
+from app.services.plant_summary import plant_summary
 
 async def seed_data():
     print("🚀 Limpiando y cargando datos reales de 'Postobon Industrial'...")
     
-    from sqlalchemy.orm import sessionmaker
-    engine = get_async_engine()
-    AsyncSessionLocal = sessionmaker(
-        bind=engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
-    )
+    # Sesiones de la app: mantienen plant_summaries al insertar activos
+    AsyncSessionLocal = get_session_factory()
     
     async with AsyncSessionLocal() as db:
         # 1. Asegurar usuario Developer
@@ -124,6 +119,8 @@ async def seed_data():
         try:
             db.add_all(test_assets)
             await db.commit()
+            # El delete() masivo no pasa por la sesión: recalcular la proyección de la planta
+            await plant_summary.rebuild(db, [user.id])
             print(f"✅ 'Postobon Planta Central' configurada con {len(test_assets)} activos de alta precisión.")
         except Exception as e:
             await db.rollback()
@@ -0,0 +1,116 @@
+"""
+Micro-benchmarks del core energético con líneas base guardadas y umbral de regresión.
+
+Se omiten por defecto (el tiempo de CPU en CI es ruidoso):
+    RUN_BENCHMARKS=1 pytest tests/benchmarks            # compara contra baseline.json
+    UPDATE_BENCHMARK_BASELINE=1 pytest tests/benchmarks  # vuelve a medir y guarda la línea base
+
+Cada caso se mide como el mínimo de varias repeticiones y se normaliza por un bucle de
+calibración en Python puro medido intercalado con el caso, así la línea base no depende de
+la velocidad de la máquina. Falla si un caso supera su línea base por más de
+BENCHMARK_MAX_REGRESSION (1.5 = 50% más lento).
+"""
+import json
+import os
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.core.energy_logic import EnergyCalculators
+from app.core.tariffs import get_tariff_engine
+from app.services.industrial import IndustrialService
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+UPDATE = os.getenv("UPDATE_BENCHMARK_BASELINE") == "1"
+MAX_REGRESSION = float(os.getenv("BENCHMARK_MAX_REGRESSION", "1.5"))
+
+pytestmark = pytest.mark.skipif(
+    not (UPDATE or os.getenv("RUN_BENCHMARKS") == "1"),
+    reason="benchmarks desactivados (RUN_BENCHMARKS=1 para ejecutarlos)",
+)
+
+N = 10_000
+rng = np.random.default_rng(0)
+KWH = rng.gamma(2.0, 90.0, N)
+STRATA = rng.integers(1, 7, N)
+OCCUPANTS = rng.integers(1, 6, N)
+TIMESTAMPS = np.datetime64("2024-01-01") + rng.integers(0, 365 * 86400, N).astype("timedelta64[s]")
+HOME_ASSETS = [
+    SimpleNamespace(icon=icon, is_high_impact=high)
+    for icon, high in [("tv", True), ("fridge", True), ("ac", False), ("monitor", False), ("washer", True)] * 2
+]
+MOTOR = SimpleNamespace(
+    nominal_power_kw=45.0, load_factor=0.8, daily_usage_hours=16, op_days_per_month=26,
+    efficiency_percentage=88.0, power_factor=0.82,
+)
+
+
+def _calibration():
+    total = 0
+    for i in range(1000):
+        total += i * i % 7
+    return total
+
+
+# nombre -> (función, operaciones por llamada)
+CASES = {
+    "scalar.get_kwh_price": (lambda: EnergyCalculators.get_kwh_price(4), 1),
+    "scalar.calculate_bill_from_kwh": (lambda: EnergyCalculators.calculate_bill_from_kwh(187.3, 4), 1),
+    "scalar.calculate_efficiency_score": (lambda: EnergyCalculators.calculate_efficiency_score(187.3, 3), 1),
+    "scalar.calculate_environmental_impact": (lambda: EnergyCalculators.calculate_environmental_impact(187.3), 1),
+    "scalar.get_vampire_estimate_10_assets": (lambda: EnergyCalculators.get_vampire_estimate(HOME_ASSETS), 1),
+    "scalar.calculate_asset_consumption": (lambda: IndustrialService.calculate_asset_consumption(MOTOR), 1),
+    "vector.calculate_bill_from_kwh_array": (lambda: EnergyCalculators.calculate_bill_from_kwh_array(KWH, STRATA), N),
+    "vector.calculate_efficiency_score_array": (
+        lambda: EnergyCalculators.calculate_efficiency_score_array(KWH, OCCUPANTS), N
+    ),
+    "vector.calculate_environmental_impact_array": (
+        lambda: EnergyCalculators.calculate_environmental_impact_array(KWH), N
+    ),
+    "vector.tariff_engine_bill": (lambda: get_tariff_engine().bill(KWH, STRATA, TIMESTAMPS), N),
+}
+
+
+def _loops(timer: timeit.Timer, min_time: float = 0.02) -> int:
+    number, elapsed = timer.autorange()
+    return max(1, int(number * min_time / elapsed))
+
+
+def _relative_cost(fn, ops: int, rounds: int = 9) -> float:
+    """
+    Costo por operación en unidades del bucle de calibración. Caso y calibración se
+    miden intercalados (comparten el ruido de la máquina) y se toma el mínimo de cada uno.
+    """
+    case, calibration = timeit.Timer(fn), timeit.Timer(_calibration)
+    case_loops, calibration_loops = _loops(case), _loops(calibration)
+    case_best = calibration_best = float("inf")
+    for _ in range(rounds):
+        calibration_best = min(calibration_best, calibration.timeit(calibration_loops) / calibration_loops)
+        case_best = min(case_best, case.timeit(case_loops) / case_loops)
+    return case_best / ops / calibration_best
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    data = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    yield data
+    if UPDATE:
+        BASELINE_PATH.write_text(json.dumps(dict(sorted(data.items())), indent=2) + "\n")
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_benchmark(name, baseline):
+    fn, ops = CASES[name]
+    relative = _relative_cost(fn, ops)
+
+    if UPDATE:
+        baseline[name] = round(relative, 6)
+        return
+    if name not in baseline:
+        pytest.fail(f"{name}: sin línea base (UPDATE_BENCHMARK_BASELINE=1 para crearla)")
+    assert relative <= baseline[name] * MAX_REGRESSION, (
+        f"{name}: {relative:.6f} vs línea base {baseline[name]:.6f} (umbral x{MAX_REGRESSION})"
+    )
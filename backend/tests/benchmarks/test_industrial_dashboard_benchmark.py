@@ -0,0 +1,93 @@
+"""
+Benchmark del dashboard industrial: agregados en SQL frente a la ruta anterior (cargar el
+usuario con selectinload de todos sus activos y sumar en Python).
+
+Se ejecuta con RUN_BENCHMARKS=1. Las dos rutas se miden en la misma máquina y base de datos,
+así que se compara su cociente: falla si la ruta SQL no es al menos
+BENCHMARK_MIN_SPEEDUP veces más rápida (2 por defecto) con ASSETS activos en la planta.
+"""
+import os
+import random
+import time
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import selectinload
+
+import app.models  # noqa: F401 - registra todas las tablas en el metadata
+from app.db.base import Base
+from app.db.session import make_session_factory
+from app.models.industrial_asset import IndustrialAsset
+from app.models.user import User
+from app.services.industrial import industrial_service
+from app.services.plant_summary import plant_summary
+
+pytestmark = pytest.mark.skipif(
+    os.getenv("RUN_BENCHMARKS") != "1", reason="benchmarks desactivados (RUN_BENCHMARKS=1 para ejecutarlos)"
+)
+
+ASSETS = int(os.getenv("BENCHMARK_PLANT_ASSETS", "20000"))
+MIN_SPEEDUP = float(os.getenv("BENCHMARK_MIN_SPEEDUP", "2.0"))
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = make_session_factory(engine)  # con el listener de plant_summaries
+    rng = random.Random(0)
+    async with factory() as session:
+        session.add(User(id=1, username="planta", email="p@x.co", hashed_password="x"))
+        await session.flush()
+        await session.execute(insert(IndustrialAsset), [
+            {
+                "user_id": 1, "name": f"Equipo {i}", "asset_type": "Motor",
+                "nominal_power_kw": rng.uniform(1, 200), "load_factor": rng.uniform(0.3, 1.0),
+                "power_factor": rng.uniform(0.7, 1.0), "efficiency_percentage": rng.uniform(70, 97),
+                "daily_usage_hours": rng.uniform(1, 24), "op_days_per_month": rng.randint(15, 30),
+            }
+            for i in range(ASSETS)
+        ])
+        await session.commit()
+        await plant_summary.rebuild(session, [1])  # insert() masivo: fuera del listener
+        yield session
+    await engine.dispose()
+
+
+async def _orm_path(db: AsyncSession):
+    query = select(User).where(User.id == 1).options(
+        selectinload(User.industrial_settings), selectinload(User.industrial_assets)
+    )
+    user = (await db.execute(query)).scalar_one()
+    result = industrial_service.build_dashboard_metrics(user.industrial_assets, user.industrial_settings)
+    db.expunge_all()  # como en un request nuevo: sin identity map
+    return result
+
+
+async def _sql_path(db: AsyncSession):
+    return await industrial_service.compute_dashboard_metrics(db, 1)
+
+
+async def _best_of(fn, db, rounds: int = 5) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await fn(db)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.mark.asyncio
+async def test_sql_aggregation_beats_orm_hydration(db):
+    orm_metrics, _ = await _orm_path(db)
+    sql_metrics, _ = await _sql_path(db)
+    assert sql_metrics["total_consumption_monthly_kwh"] == orm_metrics["total_consumption_monthly_kwh"]
+
+    orm_seconds = await _best_of(_orm_path, db)
+    sql_seconds = await _best_of(_sql_path, db)
+    speedup = orm_seconds / sql_seconds
+    print(f"\n{ASSETS} activos: ORM {orm_seconds * 1000:.1f} ms, SQL {sql_seconds * 1000:.1f} ms (x{speedup:.1f})")
+    assert speedup >= MIN_SPEEDUP, f"SQL x{speedup:.2f} < x{MIN_SPEEDUP}"
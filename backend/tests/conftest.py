@@ -12,6 +12,7 @@ except Exception:  # pragma: no cover - compatibility for different httpx versio
     ASGITransport = None
 
 from app.main import app
+from app.services.insight_store import insight_store
 
 
 @pytest_asyncio.fixture
@@ -25,3 +26,10 @@ async def async_client() -> AsyncGenerator[AsyncClient, None]:
     else:
         async with AsyncClient(app=app, base_url="http://testserver") as client:
             yield client
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def drain_background_insights() -> AsyncGenerator[None, None]:
+    """Finish insight writes spawned by a test before its event loop closes."""
+    yield
+    await insight_store.drain()
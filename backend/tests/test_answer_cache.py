@@ -0,0 +1,103 @@
+"""
+Tests de la caché semántica de respuestas del asistente.
+"""
+from app.core.config import get_settings
+from app.services.answer_cache import SemanticAnswerCache
+
+HOME = {"stratum": 3, "housing": "apartamento", "appliances": ["Nevera (fridge)", "TV sala (tv)"], "city": "Bogotá"}
+
+
+def make_cache(**kwargs):
+    # Sin threshold: se prueba el umbral configurado por defecto
+    params = {"max_entries": 100}
+    params.update(kwargs)
+    return SemanticAnswerCache(**params)
+
+
+def seed(cache):
+    cache.store("residential", HOME, "¿Qué consume más en mi casa?", "La nevera.")
+    cache.store("residential", HOME, "¿Cómo bajo la factura de luz?", "Apaga los equipos en standby.")
+    cache.store("residential", HOME, "¿Cuánto CO2 emite mi hogar?", "Unos 20 kg al mes.")
+
+
+def test_near_identical_question_hits():
+    cache = make_cache()
+    seed(cache)
+    assert cache.lookup("residential", HOME, "que consume mas en mi casa") == "La nevera."
+    assert cache.lookup("residential", HOME, "¿Cómo puedo bajar la factura de la luz?") == "Apaga los equipos en standby."
+
+
+def test_unrelated_question_misses():
+    cache = make_cache()
+    seed(cache)
+    assert cache.lookup("residential", HOME, "¿Me conviene instalar paneles solares?") is None
+
+
+PARAPHRASES = {
+    "¿Qué consume más en mi casa?": [
+        "que consume mas en mi casa", "¿Qué es lo que más consume en mi casa?",
+        "¿Qué consume más energía en mi casa?", "¿Qué aparato consume más en mi casa?",
+    ],
+    "¿Cómo bajo la factura de luz?": [
+        "¿Cómo bajo la factura?", "¿Cómo puedo bajar la factura de la luz?", "¿Cómo reduzco la factura de luz?",
+    ],
+    "¿Cuánto CO2 emite mi hogar?": ["¿Cuánto CO2 emite mi casa?", "cuanto co2 emite mi hogar"],
+    "¿Cuánto gasta la nevera?": ["¿Cuánto consume la nevera?", "¿Cuánta energía gasta la nevera?"],
+    "¿Qué son los vampiros energéticos?": ["¿Qué es un vampiro energético?"],
+    "¿Me conviene cambiar a bombillos LED?": ["¿Me sirve cambiar los bombillos por LED?"],
+}
+# Comparten palabras con las preguntas guardadas pero piden otra cosa
+DIFFERENT = [
+    "¿Cuánto consume la lavadora?", "¿Cuánto consume el televisor?", "¿Cómo bajo el consumo de la nevera?",
+    "¿Qué consume más la nevera o el televisor?", "¿Me conviene instalar paneles solares?",
+    "¿Cuánto cuesta un aire acondicionado?", "¿Qué hago si se va la luz?",
+]
+
+
+def test_default_threshold_is_calibrated_on_paraphrases():
+    cache = make_cache()
+    assert cache.threshold == get_settings().chat_cache_similarity_threshold
+    for question in PARAPHRASES:
+        cache.store("residential", HOME, question, question)
+
+    for question, paraphrases in PARAPHRASES.items():
+        for paraphrase in paraphrases:
+            assert cache.lookup("residential", HOME, paraphrase) == question, paraphrase
+    for question in DIFFERENT:
+        assert cache.lookup("residential", HOME, question) is None, question
+
+
+def test_bucket_is_the_normalized_personal_context():
+    cache = make_cache()
+    seed(cache)
+    # Mismo hogar escrito distinto (orden, mayúsculas, tildes): misma respuesta
+    same = {**HOME, "appliances": ["tv sala (tv)", "NEVERA (fridge)"], "city": "Bogota"}
+    assert cache.lookup("residential", same, "¿Qué consume más en mi casa?") == "La nevera."
+    # La respuesta puede nombrar los equipos o la ciudad del usuario: otro hogar no la recibe
+    renamed = {**HOME, "appliances": ["TV (tv)", "Nevera cocina (fridge)"]}
+    assert cache.lookup("residential", renamed, "¿Qué consume más en mi casa?") is None
+    assert cache.lookup("residential", {**HOME, "city": "Cali"}, "¿Qué consume más en mi casa?") is None
+    assert cache.lookup("residential", {**HOME, "stratum": 5}, "¿Qué consume más en mi casa?") is None
+    assert cache.lookup("industrial", HOME, "¿Qué consume más en mi casa?") is None
+
+
+def test_follow_up_questions_are_not_standalone():
+    assert SemanticAnswerCache.is_standalone("¿Qué consume más en mi casa?")
+    assert SemanticAnswerCache.is_standalone("¿Cómo bajo la factura de luz?")
+    for question in ("¿Y la nevera?", "¿Cuánto cuesta eso?", "¿Por qué?", "Explícame lo que dijiste", "pero ¿cuánto ahorro?"):
+        assert not SemanticAnswerCache.is_standalone(question), question
+
+
+def test_lru_eviction_keeps_recently_used_answers():
+    cache = make_cache(max_entries=2)
+    cache.store("residential", HOME, "¿Qué consume más en mi casa?", "La nevera.")
+    cache.store("residential", HOME, "¿Cómo bajo la factura de luz?", "Apaga los equipos en standby.")
+    assert cache.lookup("residential", HOME, "¿Qué consume más en mi casa?") == "La nevera."
+
+    cache.store("residential", HOME, "¿Cuánto CO2 emite mi hogar?", "Unos 20 kg al mes.")
+
+    assert cache.lookup("residential", HOME, "¿Cómo bajo la factura de luz?") is None
+    assert cache.lookup("residential", HOME, "¿Qué consume más en mi casa?") == "La nevera."
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["hit_rate"] == round(2 / 3, 3)
@@ -0,0 +1,141 @@
+"""
+Tests de la importación masiva de activos industriales (CSV/XLSX por chunks, errores por fila).
+"""
+import io
+import threading
+from datetime import datetime, timezone
+
+import openpyxl
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registra todas las tablas en el metadata
+from app.db.base import Base
+from app.models.industrial_asset import IndustrialAsset
+from app.models.user import User
+from app.schemas.industrial_asset import IndustrialAssetCreate, IndustrialAssetRead
+from app.services.asset_import import AssetImporter, AssetImportError
+from app.services.plant_summary import plant_summary
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add(User(id=1, username="planta", email="p@x.co", hashed_password="x"))
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+async def _count(db):
+    return (await db.execute(select(func.count()).select_from(IndustrialAsset))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_csv_import_inserts_valid_rows_and_reports_invalid_ones(db):
+    # Encabezados en español, separador ";" y decimales con coma (CSV de Excel en español)
+    content = "\n".join([
+        "Nombre;Tipo;Potencia kW;Horas día;Eficiencia;Ubicación;Columna extra",
+        "Motor 1;Motor;15,5;8;90;Molinos;x",
+        "Motor 2;Motor;-3;8;;Molinos;x",        # potencia negativa
+        ";;;;;;",                                 # fila en blanco: se ignora
+        "Caldera;Caldera;40;30;80;;x",            # más de 24 horas
+        "Compresor;Compresor;22;10;;Calderas;x",
+        "Bomba;Bomba;5;6;85;Molinos;x",
+    ]).encode("utf-8")
+
+    importer = AssetImporter(chunk_size=2, max_errors=1)
+    report = await importer.import_file(db, 1, io.BytesIO(content), "inventario.csv")
+
+    assert report["rows"] == 5 and report["inserted"] == 3 and report["rejected"] == 2
+    assert report["errors"] == [
+        {"row": 3, "errors": [{"field": "nominal_power_kw", "message": "Input should be greater than or equal to 0"}]}
+    ]
+    assert report["errors_truncated"] is True
+
+    assets = (await db.execute(select(IndustrialAsset).order_by(IndustrialAsset.id))).scalars().all()
+    assert [a.name for a in assets] == ["Motor 1", "Compresor", "Bomba"]
+    assert assets[0].nominal_power_kw == 15.5 and assets[0].location == "Molinos"
+    assert assets[1].efficiency_percentage == 85.0  # celda vacía: valor por defecto
+    # El INSERT multi-fila aplica sus deltas a la proyección en la misma transacción
+    assert await plant_summary.check(db) == []
+
+
+@pytest.mark.asyncio
+async def test_insert_assets_returns_rows_without_refresh(db):
+    importer = AssetImporter()
+    assets = [
+        IndustrialAssetCreate(name=f"M{i}", asset_type="Motor", nominal_power_kw=10, daily_usage_hours=8)
+        for i in range(3)
+    ]
+    created = await importer.insert_assets(db, 1, assets)
+    await db.commit()
+
+    assert [a.name for a in created] == ["M0", "M1", "M2"]
+    assert all(a.id is not None and a.created_at is not None and a.user_id == 1 for a in created)
+    assert await plant_summary.check(db) == []
+
+
+@pytest.mark.asyncio
+async def test_file_errors_reject_the_whole_import(db):
+    importer = AssetImporter(chunk_size=1000)
+    with pytest.raises(AssetImportError, match="daily_usage_hours"):
+        await importer.import_file(db, 1, io.BytesIO(b"name,asset_type,nominal_power_kw\nA,Motor,5\n"), "a.csv")
+    with pytest.raises(AssetImportError, match="Formato no soportado"):
+        importer.detect_format("inventario.pdf", "application/pdf")
+
+    # Un byte inválido después de la muestra inicial deshace también los chunks ya insertados
+    content = "name,asset_type,nominal_power_kw,daily_usage_hours\n".encode() + b"A,Motor,5,8\n" * 6000 + b"B\xff,Motor,5,8\n"
+    with pytest.raises(AssetImportError):
+        await importer.import_file(db, 1, io.BytesIO(content), "a.csv")
+    assert await _count(db) == 0
+
+
+@pytest.mark.asyncio
+async def test_xlsx_import(db):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["name", "asset_type", "nominal_power_kw", "daily_usage_hours", "location"])
+    sheet.append([101, "Motor", 7.5, 12, "Línea 1"])
+    sheet.append(["Sin horas", "Motor", 7.5, None, None])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+
+    report = await AssetImporter().import_file(db, 1, buffer, "inventario.xlsx")
+    assert report["inserted"] == 1 and report["errors"][0]["row"] == 3
+    asset = (await db.execute(select(IndustrialAsset))).scalar_one()
+    assert asset.name == "101" and asset.location == "Línea 1"
+
+
+def test_bounds_apply_to_input_only():
+    legacy = {"name": "Viejo", "asset_type": "Motor", "nominal_power_kw": 5, "daily_usage_hours": 30}
+    with pytest.raises(ValueError):
+        IndustrialAssetCreate.model_validate(legacy)
+    # Una fila anterior a los CHECK se sigue pudiendo leer (sin 500 en los listados)
+    asset = IndustrialAsset(id=1, user_id=1, created_at=datetime.now(timezone.utc), **legacy)
+    assert IndustrialAssetRead.model_validate(asset).daily_usage_hours == 30
+
+
+@pytest.mark.asyncio
+async def test_parsing_runs_off_the_event_loop(db, monkeypatch):
+    threads = set()
+    record = AssetImporter._record
+
+    def tracking_record(columns, values):
+        threads.add(threading.get_ident())
+        return record(columns, values)
+
+    monkeypatch.setattr(AssetImporter, "_record", staticmethod(tracking_record))
+    content = b"name,asset_type,nominal_power_kw,daily_usage_hours\n" + b"A,Motor,5,8\n" * 10
+    report = await AssetImporter(chunk_size=3).import_file(db, 1, io.BytesIO(content), "a.csv")
+
+    assert report["inserted"] == 10
+    assert threads and threading.get_ident() not in threads
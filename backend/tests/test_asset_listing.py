@@ -0,0 +1,109 @@
+"""
+Tests del listado paginado de activos industriales (keyset, filtros, orden por desperdicio y proyección).
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registra todas las tablas en el metadata
+from app.db.base import Base
+from app.models.industrial_asset import IndustrialAsset
+from app.models.user import User
+from app.services.asset_listing import AssetListing, AssetListingError
+from app.services.industrial import IndustrialService
+
+LOCATIONS = ["Molinos", None, "Calderas", "Molinos", None, "Empaque"]
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        session.add_all([
+            User(id=1, username="planta", email="p@x.co", hashed_password="x"),
+            User(id=2, username="otra", email="o@x.co", hashed_password="x"),
+        ])
+        session.add_all([
+            IndustrialAsset(
+                user_id=1, name=f"A{i}", asset_type="Motor" if i % 3 else "Compresor",
+                nominal_power_kw=5 + i % 7, daily_usage_hours=8, efficiency_percentage=70 + i % 25,
+                power_factor=0.8 + (i % 3) * 0.05, location=LOCATIONS[i % len(LOCATIONS)],
+            )
+            for i in range(40)
+        ])
+        session.add(IndustrialAsset(user_id=2, name="Ajeno", asset_type="Motor", nominal_power_kw=1, daily_usage_hours=1))
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+async def _all_pages(db, listing, limit, **params):
+    items, cursor, pages = [], None, 0
+    while True:
+        page = await listing.page(db, 1, cursor=cursor, limit=limit, **params)
+        items.extend(page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_the_plant_in_order(db):
+    listing = AssetListing()
+    assets = [a for a in (await db.execute(IndustrialAsset.__table__.select())).all() if a.user_id == 1]
+
+    items, pages = await _all_pages(db, listing, 7, fields="name,location")
+    assert pages == 6 and set(items[0]) == {"id", "name", "location"}
+    expected = sorted(assets, key=lambda a: (a.location is not None, a.location or "", a.id))
+    assert [i["id"] for i in items] == [a.id for a in expected]
+
+    items, _ = await _all_pages(db, listing, 6, fields="waste_kwh", sort="waste")
+    waste = {a.id: IndustrialService._asset_physics(a)[2] for a in assets}
+    assert [i["id"] for i in items] == sorted(waste, key=lambda i: (-waste[i], i))
+    assert items[0]["waste_kwh"] == round(max(waste.values()), 2)
+
+
+@pytest.mark.asyncio
+async def test_filters_and_projection(db):
+    listing = AssetListing()
+    page = await listing.page(
+        db, 1, fields="name,efficiency_percentage", asset_type="Compresor", location="Molinos",
+        min_efficiency=75, max_efficiency=90, limit=100,
+    )
+    assert page["next_cursor"] is None and page["items"]
+    for item in page["items"]:
+        assert 75 <= item["efficiency_percentage"] <= 90
+
+    # Solo se seleccionan las columnas pedidas (más el id y la clave de orden)
+    sql = str(listing.query(1, listing.parse_fields("name"), "location"))
+    assert "nominal_power_kw" not in sql and "created_at" not in sql
+
+
+@pytest.mark.asyncio
+async def test_zero_efficiency_filters_like_the_default(db):
+    # Como en la física, una eficiencia en 0 cuenta como el 85 % por defecto
+    db.add_all([
+        IndustrialAsset(user_id=1, name="Cero", asset_type="Bomba", nominal_power_kw=3, daily_usage_hours=4,
+                        efficiency_percentage=0),
+        IndustrialAsset(user_id=1, name="Nula", asset_type="Bomba", nominal_power_kw=3, daily_usage_hours=4),
+    ])
+    await db.commit()
+    page = await AssetListing().page(db, 1, fields="name", asset_type="Bomba", min_efficiency=80, max_efficiency=90)
+    assert sorted(i["name"] for i in page["items"]) == ["Cero", "Nula"]
+
+
+@pytest.mark.asyncio
+async def test_invalid_parameters(db):
+    listing = AssetListing()
+    with pytest.raises(AssetListingError, match="hashed_password"):
+        listing.parse_fields("name,hashed_password")
+    cursor = listing.encode_cursor("location", ["Molinos", 3])
+    with pytest.raises(AssetListingError):
+        await listing.page(db, 1, sort="waste", cursor=cursor)
+    with pytest.raises(AssetListingError):
+        await listing.page(db, 1, cursor="no-es-un-cursor")
@@ -0,0 +1,112 @@
+"""
+Tests de la facturación masiva: cursor por chunks, origen del consumo y salida CSV.
+"""
+import csv
+from datetime import date, datetime, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registra todas las tablas en el metadata
+from app.core.energy_logic import EnergyCalculators
+from app.core.tariffs import TariffEngine
+from app.db.base import Base
+from app.models.residential import ConsumptionReading, ResidentialAsset, ResidentialProfile
+from app.models.user import User
+from app.services import billing_batch
+from app.services.billing_batch import PortfolioBillingJob
+
+
+@pytest_asyncio.fixture
+async def session_factory(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with factory() as db:
+        for user_id in range(1, 6):
+            db.add(User(id=user_id, username=f"hogar{user_id}", email=f"h{user_id}@x.co", hashed_password="x"))
+        db.add_all([
+            # 1: promedio capturado en el perfil + equipos registrados
+            ResidentialProfile(user_id=1, stratum=2, city="Cali", average_kwh_captured=200.0),
+            ResidentialAsset(user_id=1, name="Nevera", icon="fridge", power_watts=250, daily_hours=8),
+            ResidentialAsset(user_id=1, name="TV", icon="tv", is_high_impact=True),
+            # 2: lecturas diarias, vale la más reciente
+            ResidentialProfile(user_id=2, stratum=5, city="Cali"),
+            ConsumptionReading(user_id=2, reading_value=9.0, date=datetime(2025, 5, 1, tzinfo=timezone.utc)),
+            ConsumptionReading(user_id=2, reading_value=6.0, date=datetime(2025, 5, 20, tzinfo=timezone.utc)),
+            # 3: solo factura promedio
+            ResidentialProfile(user_id=3, stratum=4, monthly_bill_avg=77388.0),
+            # 4: sin datos; 5: sin estrato
+            ResidentialProfile(user_id=4, stratum=1),
+            ResidentialProfile(user_id=5, stratum=None, average_kwh_captured=100.0),
+        ])
+        await db.commit()
+
+    async def fake_session():
+        async with factory() as db:
+            yield db
+
+    monkeypatch.setattr(billing_batch, "get_async_session", fake_session)
+    yield factory
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_billing_streams_every_profile_to_csv(session_factory, tmp_path):
+    output = tmp_path / "bills.csv"
+    stats = await PortfolioBillingJob(chunk_size=2).run(str(output), date(2025, 6, 1))
+
+    assert stats["rows"] == 5 and stats["chunks"] == 3
+    assert stats["kwh_sources"] == {"profile": 2, "reading": 1, "bill": 1, "none": 1}
+    assert not (tmp_path / "bills.csv.part").exists()
+
+    with open(output, newline="", encoding="utf-8") as f:
+        rows = {int(r["user_id"]): r for r in csv.DictReader(f)}
+
+    price_2 = EnergyCalculators.get_kwh_price(2)
+    assert int(rows[1]["bill_cop"]) == round(200.0 * price_2)
+    assert float(rows[1]["identified_kwh"]) == 60.0 and float(rows[1]["leak_kwh"]) == 140.0
+    assert int(rows[1]["leak_cost_cop"]) == round(140.0 * price_2)
+    assert rows[1]["tariff_type"] == "Subsidiada"
+    assert float(rows[1]["standby_kwh"]) == 2.5 and int(rows[1]["standby_cost_cop"]) == round(2.5 * price_2)
+    assert float(rows[2]["kwh"]) == 180.0 and rows[2]["tariff_type"] == "Contribución"
+    assert float(rows[3]["kwh"]) == 100.0 and rows[3]["kwh_source"] == "bill"
+    assert int(rows[4]["bill_cop"]) == 0 and float(rows[4]["leak_kwh"]) == 0.0
+    assert int(rows[5]["stratum"]) == 3
+    assert stats["total_bill_cop"] == sum(int(r["bill_cop"]) for r in rows.values())
+
+
+@pytest.mark.asyncio
+async def test_parquet_output_or_clear_error_without_pyarrow(session_factory, tmp_path):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        with pytest.raises(RuntimeError, match="pyarrow"):
+            await PortfolioBillingJob(fmt="parquet").run(str(tmp_path / "bills.parquet"))
+    else:
+        stats = await PortfolioBillingJob(fmt="parquet").run(str(tmp_path / "bills.parquet"))
+        assert stats["rows"] == 5
+
+
+@pytest.mark.asyncio
+async def test_subsidy_comes_from_the_tariff_of_the_billed_month(session_factory, tmp_path, monkeypatch):
+    base = {str(s): 100.0 * s for s in range(1, 7)}
+    engine = TariffEngine({"default_operator": "demo", "operators": {"demo": {"versions": [
+        {"effective_from": "2025-01-01", "bands": {"base": base}, "subsidy": {"2": -0.5, "4": -0.1}},
+        {"effective_from": "2025-07-01", "bands": {"base": base}, "subsidy": {"2": -0.4}},
+    ]}}})
+    monkeypatch.setattr(billing_batch, "get_tariff_engine", lambda: engine)
+
+    rows = {}
+    for month in (date(2025, 6, 1), date(2025, 7, 1)):
+        output = tmp_path / f"bills-{month.month}.csv"
+        await PortfolioBillingJob().run(str(output), month)
+        with open(output, newline="", encoding="utf-8") as f:
+            rows[month.month] = {int(r["user_id"]): r for r in csv.DictReader(f)}
+
+    assert float(rows[6][1]["subsidy_percent"]) == -50.0 and float(rows[7][1]["subsidy_percent"]) == -40.0
+    assert rows[6][3]["tariff_type"] == "Subsidiada" and rows[7][3]["tariff_type"] == "Plena"
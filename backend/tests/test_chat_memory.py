@@ -0,0 +1,62 @@
+"""
+Tests de la memoria del chat: turnos recientes textuales + resumen rodante acotado.
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registra todas las tablas en el metadata
+from app.db.base import Base
+from app.services.chat_memory import ChatMemory
+from app.services.prompt_builder import compact_json, estimate_tokens
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_first_message_has_no_history(db):
+    memory = ChatMemory(recent_turns=2, token_budget=300)
+    assert await memory.load_history(db, 1, "residential") is None
+
+
+@pytest.mark.asyncio
+async def test_long_conversation_stays_within_budget(db):
+    memory = ChatMemory(recent_turns=2, token_budget=300)
+    for i in range(40):
+        await memory.record_exchange(
+            db, 1, "residential",
+            f"Pregunta {i} sobre la nevera. " + "detalle " * 20,
+            f"Respuesta {i}: apaga los equipos en standby. " + "explicación " * 20,
+        )
+
+    history = await memory.load_history(db, 1, "residential")
+    assert estimate_tokens(compact_json(history)) <= memory.token_budget * 1.1
+    # Los últimos turnos siguen textuales y el resumen conserva lo más reciente de lo plegado
+    assert history["recent"][-1][1].startswith("Respuesta 39")
+    assert len(history["recent"]) <= 4
+    assert "U: Pregunta" in history["summary"]
+    assert "Pregunta 0 " not in history["summary"]
+
+
+@pytest.mark.asyncio
+async def test_conversations_are_isolated_and_clearable(db):
+    memory = ChatMemory(recent_turns=2, token_budget=300)
+    await memory.record_exchange(db, 1, "residential", "hola", "hola, ¿en qué te ayudo?")
+    await memory.record_exchange(db, 1, "industrial", "motores", "revisa el factor de carga")
+
+    home = await memory.load_history(db, 1, "residential")
+    assert home["recent"] == [["user", "hola"], ["assistant", "hola, ¿en qué te ayudo?"]]
+
+    await memory.clear(db, 1, "residential")
+    assert await memory.load_history(db, 1, "residential") is None
+    assert await memory.load_history(db, 1, "industrial") is not None
@@ -0,0 +1,97 @@
+"""
+Tests del circuit breaker que protege las llamadas a Gemini.
+"""
+import asyncio
+
+import pytest
+
+from app.core.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock, **kwargs):
+    params = {"window_size": 10, "min_calls": 4, "failure_rate_threshold": 0.5, "open_seconds": 30.0, "clock": clock}
+    params.update(kwargs)
+    return CircuitBreaker(**params)
+
+
+def test_opens_after_failure_rate_threshold():
+    breaker = make_breaker(FakeClock())
+    for _ in range(2):
+        breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_slow_calls_count_as_failures():
+    breaker = make_breaker(FakeClock(), slow_call_seconds=2.0)
+    for _ in range(4):
+        breaker.record_success(5.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_allows_single_probe_and_closes_on_success():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.now = 31.0
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # solo una sonda a la vez
+
+    breaker.record_success(0.2)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_failed_probe_reopens():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record_failure()
+    clock.now = 31.0
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.times_opened == 2
+
+
+@pytest.mark.asyncio
+async def test_call_rejects_immediately_when_open():
+    breaker = make_breaker(FakeClock())
+    for _ in range(4):
+        breaker.record_failure()
+
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(work)
+    assert calls == 0
+
+
+@pytest.mark.asyncio
+async def test_call_timeout_is_recorded_as_failure():
+    breaker = CircuitBreaker(window_size=10, min_calls=1, failure_rate_threshold=1.0)
+
+    async def hang():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await breaker.call(hang, timeout=0.01)
+    assert breaker.state == CircuitBreaker.OPEN
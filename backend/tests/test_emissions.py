@@ -0,0 +1,74 @@
+"""
+Tests del motor de factores de emisión: resolución mensual u horaria, hora local y productos matriciales.
+"""
+from datetime import date, datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.core.emissions import EmissionFactorError, EmissionFactors
+
+HOURLY = [0.10] * 18 + [0.30] * 4 + [0.10] * 2  # punta térmica de 18:00 a 21:59
+
+SPEC = {
+    "utc_offset_hours": -5,
+    "default_factor": 0.2,
+    "series": {
+        "2024-01": 0.15,
+        "2024-03": HOURLY,
+    },
+}
+
+
+@pytest.fixture
+def factors():
+    return EmissionFactors(SPEC)
+
+
+def test_monthly_hourly_and_default_factors(factors):
+    stamps = [
+        datetime(2024, 1, 10, 15, tzinfo=timezone.utc),  # mensual
+        datetime(2024, 2, 10, 15, tzinfo=timezone.utc),  # hueco en la serie -> default
+        datetime(2024, 3, 10, 23, tzinfo=timezone.utc),  # 18:00 en Colombia -> punta
+        datetime(2024, 3, 10, 15, tzinfo=timezone.utc),  # 10:00 local
+        datetime(2030, 1, 1, 15, tzinfo=timezone.utc),   # fuera de la serie -> default
+    ]
+    assert factors.factors_at(stamps).tolist() == [0.15, 0.2, 0.3, 0.1, 0.2]
+    # 2024-02-01 02:00 UTC es todavía enero en hora local
+    assert factors.factors_at([datetime(2024, 2, 1, 2, tzinfo=timezone.utc)])[0] == 0.15
+
+
+def test_impact_is_time_resolved_with_totals(factors):
+    stamps = np.array(["2024-03-10T23:00", "2024-03-10T15:00"], dtype="datetime64[s]")
+    result = factors.impact([100.0, 100.0], stamps)
+    assert result["co2_kg"].tolist() == [30.0, 10.0]
+    assert result["trees"].tolist() == [2, 0]
+    assert result["total_co2_kg"] == 40.0 and result["total_trees"] == 2
+
+
+def test_profile_impact_matches_hour_by_hour_sum(factors):
+    rng = np.random.default_rng(1)
+    profiles = rng.uniform(0, 2, (5, 24))
+    months = [date(2024, 1, 1), date(2024, 3, 1)]
+    co2 = factors.profile_impact(profiles, months)["co2_kg"]
+    assert co2.shape == (5, 2)
+    expected_march = (profiles * np.array(HOURLY)).sum(axis=1) * 31
+    np.testing.assert_allclose(co2[:, 1], np.round(expected_march, 2))
+    np.testing.assert_allclose(co2[:, 0], np.round(profiles.sum(axis=1) * 0.15 * 31, 2))
+    assert factors.mean_factor(date(2024, 3, 15)) == pytest.approx(np.mean(HOURLY))
+
+
+def test_invalid_profile_is_rejected():
+    with pytest.raises(EmissionFactorError):
+        EmissionFactors({"series": {"2024-01": [0.1] * 12}})
+    with pytest.raises(EmissionFactorError):
+        EmissionFactors(SPEC).profile_impact(np.ones(12), [date(2024, 1, 1)])
+
+
+def test_bundled_series_has_hourly_and_monthly_months():
+    bundled = EmissionFactors.from_file()
+    stamps = np.array(["2024-02-10T00:00", "2024-02-10T16:00", "2024-07-10T00:00", "2024-07-10T16:00"],
+                      dtype="datetime64[s]")
+    peak, midday, flat_night, flat_midday = bundled.factors_at(stamps)  # 19:00 y 11:00 en Colombia
+    assert peak > midday and flat_night == flat_midday
+    assert bundled.factors_at(np.array(["2031-01-01T12:00"], dtype="datetime64[s]"))[0] == bundled.default_factor
@@ -191,3 +191,66 @@ class TestSingletonInstance:
     def test_singleton_methods_work(self):
         result = energy_calculators.get_kwh_price(4)
         assert result == 850.0
+
+
+# ============================================================================
+# TEST: API vectorizada (debe coincidir elemento a elemento con la escalar)
+# ============================================================================
+
+class TestVectorizedCalculators:
+    """Las versiones *_array reproducen exactamente los métodos escalares."""
+
+    @pytest.fixture
+    def portfolio(self):
+        import numpy as np
+        rng = np.random.default_rng(42)
+        n = 500
+        kwh = np.round(rng.gamma(2.0, 90.0, n), 3)
+        kwh[:3] = [0.0, 35.0, 153.0]
+        strata = rng.integers(-1, 9, n)  # incluye estratos inválidos (default)
+        occupants = rng.integers(-1, 7, n)
+        return kwh, strata, occupants
+
+    @staticmethod
+    def assert_columns_match(columns, scalar_rows):
+        import numpy as np
+        for key, column in columns.items():
+            expected = [row[key] for row in scalar_rows]
+            if column.dtype.kind == "f":
+                # np.round puede resolver distinto un empate x.x5: a lo sumo una unidad del último decimal
+                np.testing.assert_allclose(column, expected, rtol=0, atol=0.1 + 1e-9, err_msg=key)
+            else:
+                assert column.tolist() == expected, key
+
+    def test_bill_matches_scalar(self, portfolio):
+        kwh, strata, _ = portfolio
+        columns = EnergyCalculators.calculate_bill_from_kwh_array(kwh, strata)
+        self.assert_columns_match(
+            columns, [EnergyCalculators.calculate_bill_from_kwh(k, s) for k, s in zip(kwh.tolist(), strata.tolist())]
+        )
+
+    def test_leak_cost_matches_scalar(self, portfolio):
+        kwh, strata, _ = portfolio
+        columns = EnergyCalculators.calculate_leak_cost_array(kwh / 10, strata)
+        self.assert_columns_match(
+            columns, [EnergyCalculators.calculate_leak_cost(k, s) for k, s in zip((kwh / 10).tolist(), strata.tolist())]
+        )
+
+    def test_stratum_comparison_matches_scalar(self, portfolio):
+        kwh, strata, _ = portfolio
+        columns = EnergyCalculators.calculate_stratum_comparison_array(kwh, strata)
+        self.assert_columns_match(
+            columns, [EnergyCalculators.calculate_stratum_comparison(k, s) for k, s in zip(kwh.tolist(), strata.tolist())]
+        )
+
+    def test_efficiency_score_matches_scalar(self, portfolio):
+        kwh, _, occupants = portfolio
+        scores = EnergyCalculators.calculate_efficiency_score_array(kwh, occupants)
+        assert scores.tolist() == [
+            EnergyCalculators.calculate_efficiency_score(k, o) for k, o in zip(kwh.tolist(), occupants.tolist())
+        ]
+
+    def test_environmental_impact_matches_scalar(self, portfolio):
+        kwh, _, _ = portfolio
+        columns = EnergyCalculators.calculate_environmental_impact_array(kwh)
+        self.assert_columns_match(columns, [EnergyCalculators.calculate_environmental_impact(k) for k in kwh.tolist()])
@@ -0,0 +1,132 @@
+"""
+Tests basados en propiedades del core energético: invariantes que deben cumplirse
+para cualquier entrada válida, no solo para los valores de ejemplo.
+"""
+from types import SimpleNamespace
+
+import numpy as np
+from hypothesis import given, settings
+from hypothesis import strategies as st
+from hypothesis.extra import numpy as hnp
+
+from app.core.energy_logic import EnergyCalculators
+from app.services.industrial import IndustrialService
+
+kwh = st.floats(min_value=0, max_value=50_000, allow_nan=False)
+strata = st.integers(min_value=-2, max_value=9)  # incluye estratos inválidos (default)
+occupants = st.integers(min_value=-1, max_value=20)
+icons = st.sampled_from(["tv", "monitor", "console", "desktop", "fridge", "ac", "washer", "lamp", None])
+assets = st.lists(st.builds(SimpleNamespace, icon=icons, is_high_impact=st.one_of(st.booleans(), st.none())))
+
+
+@given(kwh, kwh, strata)
+def test_bill_is_non_negative_and_monotonic_in_kwh(a, b, stratum):
+    low, high = sorted((a, b))
+    bill_low = EnergyCalculators.calculate_bill_from_kwh(low, stratum)["factura_estimada_cop"]
+    bill_high = EnergyCalculators.calculate_bill_from_kwh(high, stratum)["factura_estimada_cop"]
+    assert 0 <= bill_low <= bill_high
+
+
+@given(kwh, kwh, strata)
+def test_leak_cost_is_non_negative_and_monotonic(a, b, stratum):
+    low, high = sorted((a, b))
+    cost_low = EnergyCalculators.calculate_leak_cost(low, stratum)["fugas_costo_cop"]
+    cost_high = EnergyCalculators.calculate_leak_cost(high, stratum)["fugas_costo_cop"]
+    assert 0 <= cost_low <= cost_high
+
+
+@given(kwh, kwh, occupants)
+def test_efficiency_score_is_bounded_and_never_improves_with_more_kwh(a, b, people):
+    low, high = sorted((a, b))
+    score_low = EnergyCalculators.calculate_efficiency_score(low, people)
+    score_high = EnergyCalculators.calculate_efficiency_score(high, people)
+    assert 0 <= score_high <= score_low <= 100
+
+
+@given(kwh, st.integers(min_value=1, max_value=20))
+def test_efficiency_score_never_drops_with_more_occupants(total, people):
+    assert EnergyCalculators.calculate_efficiency_score(total, people + 1) >= \
+        EnergyCalculators.calculate_efficiency_score(total, people)
+
+
+@given(kwh, strata)
+def test_stratum_comparison_flags_efficiency_consistently(total, stratum):
+    result = EnergyCalculators.calculate_stratum_comparison(total, stratum)
+    assert result["es_eficiente"] == (total <= result["promedio_estrato_kwh"])
+    if result["es_eficiente"]:
+        assert result["diferencia_kwh"] <= 0
+    else:
+        assert result["diferencia_kwh"] >= 0
+
+
+@given(kwh, kwh)
+def test_environmental_impact_is_non_negative_and_monotonic(a, b):
+    low, high = sorted((a, b))
+    impact_low = EnergyCalculators.calculate_environmental_impact(low)
+    impact_high = EnergyCalculators.calculate_environmental_impact(high)
+    assert 0 <= impact_low["co2_kg"] <= impact_high["co2_kg"]
+    assert 0 <= impact_low["trees"] <= impact_high["trees"]
+
+
+@given(assets, assets)
+def test_vampire_estimate_is_additive_and_non_negative(first, second):
+    total = EnergyCalculators.get_vampire_estimate(first + second)
+    assert total >= 0
+    assert np.isclose(
+        total, EnergyCalculators.get_vampire_estimate(first) + EnergyCalculators.get_vampire_estimate(second)
+    )
+
+
+@settings(max_examples=50)
+@given(
+    hnp.arrays(np.float64, st.integers(1, 200), elements=st.floats(0, 50_000, allow_nan=False)),
+    st.data(),
+)
+def test_vectorized_bill_and_score_match_scalar(kwh_array, data):
+    n = len(kwh_array)
+    strata_array = data.draw(hnp.arrays(np.int64, n, elements=strata))
+    people_array = data.draw(hnp.arrays(np.int64, n, elements=occupants))
+
+    bills = EnergyCalculators.calculate_bill_from_kwh_array(kwh_array, strata_array)["factura_estimada_cop"]
+    scores = EnergyCalculators.calculate_efficiency_score_array(kwh_array, people_array)
+
+    assert bills.tolist() == [
+        EnergyCalculators.calculate_bill_from_kwh(k, s)["factura_estimada_cop"]
+        for k, s in zip(kwh_array.tolist(), strata_array.tolist())
+    ]
+    assert scores.tolist() == [
+        EnergyCalculators.calculate_efficiency_score(k, p)
+        for k, p in zip(kwh_array.tolist(), people_array.tolist())
+    ]
+
+
+industrial_assets = st.builds(
+    SimpleNamespace,
+    nominal_power_kw=st.floats(0, 5_000, allow_nan=False),
+    load_factor=st.floats(0.05, 1.0),
+    daily_usage_hours=st.floats(0, 24),
+    op_days_per_month=st.integers(1, 31),
+    efficiency_percentage=st.floats(1.0, 100.0),
+    power_factor=st.floats(0.3, 1.0),
+)
+
+
+@given(industrial_assets)
+def test_asset_waste_is_non_negative_and_bounded_by_consumption(asset):
+    stats = IndustrialService.calculate_asset_consumption(asset)
+    efficiency = asset.efficiency_percentage / 100.0
+    # Pérdidas por eficiencia + penalidad por factor de potencia (máx. 10% de (0.90 - pf))
+    penalty = max(0.0, 0.90 - asset.power_factor) * 0.1
+    assert stats["waste_kwh"] >= 0
+    # waste_kwh y monthly_kwh se redondean por separado a 2 decimales (error <= 0.005 cada uno)
+    assert stats["waste_kwh"] <= stats["monthly_kwh"] * (1.0 - efficiency + penalty) + 0.02
+    assert stats["real_kw"] <= asset.nominal_power_kw + 0.005
+
+
+@given(industrial_assets, st.floats(0, 24))
+def test_asset_consumption_grows_with_usage_hours(asset, extra_hours):
+    more = SimpleNamespace(**{**vars(asset), "daily_usage_hours": min(24.0, asset.daily_usage_hours + extra_hours)})
+    base = IndustrialService.calculate_asset_consumption(asset)
+    longer = IndustrialService.calculate_asset_consumption(more)
+    assert longer["monthly_kwh"] >= base["monthly_kwh"]
+    assert longer["waste_kwh"] >= base["waste_kwh"]
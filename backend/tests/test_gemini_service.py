@@ -0,0 +1,241 @@
+"""
+Tests del GeminiService sin red: el cliente de google-genai se reemplaza por un doble.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.gemini_service import GeminiService
+
+
+class FakeModels:
+    """Imita `client.aio.models` contando las llamadas reales al proveedor."""
+
+    def __init__(self, text: str = '{"response": "ok"}', delay: float = 0.05, error: Exception | None = None):
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def generate_content(self, model: str, contents: str, config=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return SimpleNamespace(text=self.text)
+
+
+def make_service(models: FakeModels) -> GeminiService:
+    service = GeminiService()
+    service.client = SimpleNamespace(aio=SimpleNamespace(models=models))
+    # La caché semántica global se prueba aparte; aquí cada llamada debe llegar al modelo
+    service.chat_cache_enabled = False
+    return service
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_prompts_share_one_call(monkeypatch):
+    models = FakeModels(text='{"response": "Hola"}')
+    service = make_service(models)
+    outcomes = []
+    monkeypatch.setattr(service, "_record_usage", lambda user_id, endpoint, outcome, *args: outcomes.append(outcome))
+
+    results = await asyncio.gather(*[
+        service.get_chat_response("¿Qué consume más?", {"stratum": 3}) for _ in range(5)
+    ])
+
+    assert models.calls == 1
+    assert all(r == {"response": "Hola"} for r in results)
+    stats = service.get_stats()
+    assert stats["coalesced"] == 4
+    assert stats["in_flight"] == 0
+    # Solo el líder registra una llamada facturable
+    assert sorted(outcomes) == ["coalesced"] * 4 + ["ok"]
+
+
+@pytest.mark.asyncio
+async def test_different_prompts_are_not_coalesced():
+    models = FakeModels()
+    service = make_service(models)
+
+    await asyncio.gather(
+        service.get_chat_response("pregunta A", {}),
+        service.get_chat_response("pregunta B", {}),
+    )
+
+    assert models.calls == 2
+    assert service.get_stats()["coalesced"] == 0
+
+
+@pytest.mark.asyncio
+async def test_sequential_calls_are_not_coalesced():
+    models = FakeModels(delay=0)
+    service = make_service(models)
+
+    await service.get_chat_response("misma pregunta", {})
+    await service.get_chat_response("misma pregunta", {})
+
+    assert models.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_shared_failure_reaches_every_waiter():
+    models = FakeModels(error=RuntimeError("boom"))
+    service = make_service(models)
+
+    results = await asyncio.gather(*[service.get_chat_response("hola", {}) for _ in range(3)])
+
+    assert models.calls == 1
+    assert all("corto circuito" in r["response"] for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_followers():
+    models = FakeModels(text='{"response": "Hola"}', delay=0.1)
+    service = make_service(models)
+
+    leader = asyncio.create_task(service.get_chat_response("hola", {}))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(service.get_chat_response("hola", {}))
+    await asyncio.sleep(0.01)
+    leader.cancel()  # el cliente del líder se desconecta
+
+    assert await follower == {"response": "Hola"}
+    assert leader.cancelled()
+    assert models.calls == 1 and service.get_stats()["in_flight"] == 0
+
+
+class FakeStreamingModels(FakeModels):
+    def __init__(self, chunks):
+        super().__init__()
+        self.chunks = chunks
+
+    async def generate_content_stream(self, model: str, contents: str, config=None):
+        async def gen():
+            for c in self.chunks:
+                yield SimpleNamespace(text=c)
+        return gen()
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_response_relays_decoded_tokens():
+    service = make_service(FakeStreamingModels(['{"response": "Apaga ', 'el TV', ' en standby"}']))
+
+    events = [e async for e in service.stream_chat_response("hola", {})]
+
+    assert events[:-1] == [("token", "Apaga "), ("token", "el TV"), ("token", " en standby")]
+    assert events[-1] == ("done", "Apaga el TV en standby")
+
+
+PLANT_DATA = {
+    "company": "Planta",
+    "total_assets": 2,
+    "total_real_demand_kw": 30.0,
+    "total_consumption_monthly_kwh": 10000.0,
+    "total_waste_monthly_kwh": 1500.0,
+    "energy_cost_per_kwh": 0.2,
+    "currency": "USD",
+    "assets_top": [
+        {"name": "M1", "type": "Motor", "waste_kwh": 1200.0, "efficiency": 70.0},
+        {"name": "C1", "type": "Compresor", "waste_kwh": 300.0, "efficiency": 88.0},
+    ],
+}
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_short_circuits_to_rule_based_insights():
+    models = FakeModels(error=RuntimeError("503"), delay=0)
+    service = make_service(models)
+    for _ in range(service._breaker.min_calls):
+        await service.get_dashboard_insights(PLANT_DATA)
+    calls_when_opened = models.calls
+
+    insights = await service.get_dashboard_insights(PLANT_DATA)
+
+    assert models.calls == calls_when_opened
+    assert service.get_stats()["circuit"]["state"] == "open"
+    assert insights["source"] == "rules"
+    assert insights["waste_score"] == 15
+    assert "M1" in insights["top_waste_reason"]
+    assert insights["potential_savings"] == "USD 60"
+
+
+@pytest.mark.asyncio
+async def test_standalone_questions_are_served_from_answer_cache(monkeypatch):
+    from app.services import gemini_service as module
+    from app.services.answer_cache import SemanticAnswerCache
+
+    monkeypatch.setattr(module, "answer_cache", SemanticAnswerCache(max_entries=10))
+    models = FakeModels(text='{"response": "La nevera."}')
+    service = make_service(models)
+    service.chat_cache_enabled = True
+    home = {"stratum": 3, "appliances": ["Nevera (fridge)"]}
+
+    history = {"summary": "Preguntó por su factura", "recent": []}
+    await service.get_chat_response("¿Qué consume más en mi casa?", home)
+    cached = await service.get_chat_response("que consume mas en mi casa", home)
+    # Una pregunta autocontenida se sirve de la caché aunque haya historial...
+    with_history = await service.get_chat_response("¿Qué consume más en mi casa?", home, history=history)
+    # ...pero un seguimiento depende de la conversación y va al modelo
+    await service.get_chat_response("¿Y eso cuánto cuesta al mes?", home, history=history)
+
+    assert cached == with_history == {"response": "La nevera."}
+    assert models.calls == 2
+    assert service.get_stats()["answer_cache"]["hits"] == 2
+
+
+class SequenceModels(FakeModels):
+    """Devuelve una respuesta distinta en cada llamada y guarda la config enviada."""
+
+    def __init__(self, texts):
+        super().__init__(delay=0)
+        self.texts = list(texts)
+        self.configs = []
+
+    async def generate_content(self, model: str, contents: str, config=None):
+        self.configs.append(config)
+        self.text = self.texts[self.calls]
+        return await super().generate_content(model, contents, config)
+
+
+PLANT_REPLY = (
+    '{"waste_score": 40, "top_waste_reason": "Motor", "potential_savings": "USD 90",'
+    ' "recommendation_highlight": "IE4", "ai_interpretation": "Pérdidas en motores."}'
+)
+
+
+@pytest.mark.asyncio
+async def test_insights_declare_schema_and_accept_fenced_json():
+    models = SequenceModels([f"```json\n{PLANT_REPLY}\n```\nNota: valores estimados {{}}"])
+    service = make_service(models)
+
+    insights = await service.get_dashboard_insights(PLANT_DATA)
+
+    assert insights["source"] == "ai" and insights["waste_score"] == 40
+    assert models.configs[0].response_mime_type == "application/json"
+    assert models.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_schema_failure_is_repaired_once_and_counted():
+    models = SequenceModels(['{"waste_score": "alto"}', PLANT_REPLY])
+    service = make_service(models)
+
+    insights = await service.get_dashboard_insights(PLANT_DATA)
+
+    assert insights["source"] == "ai" and models.calls == 2
+    stats = service.get_stats()["replies"]["industrial_insights"]
+    assert stats["malformed"] == 1 and stats["repaired"] == 1 and stats["malformed_rate"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_unrepairable_reply_falls_back_without_more_retries():
+    models = SequenceModels(["no es json", '{"waste_score": 140}', PLANT_REPLY])
+    service = make_service(models)
+
+    insights = await service.get_dashboard_insights(PLANT_DATA)
+
+    assert insights["source"] == "rules"
+    assert models.calls == 2
+    assert service.get_stats()["replies"]["industrial_insights"]["unrepaired"] == 1
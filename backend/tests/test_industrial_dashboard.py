@@ -0,0 +1,84 @@
+"""
+Tests del dashboard industrial agregado en SQL: mismos totales y top de desperdicio que el cálculo en Python.
+"""
+import random
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import app.models  # noqa: F401 - registra todas las tablas en el metadata
+from app.db.base import Base
+from app.db.session import make_session_factory
+from app.models.industrial_asset import IndustrialAsset
+from app.models.industrial_settings import IndustrialSettings
+from app.models.plant_summary import PlantSummary
+from app.models.user import User
+from app.services.industrial import industrial_service
+
+
+def _random_asset(rng: random.Random, user_id: int, i: int) -> IndustrialAsset:
+    # Incluye ceros y nulos, que la física reemplaza por valores por defecto
+    return IndustrialAsset(
+        user_id=user_id, name=f"Equipo {i}", asset_type=rng.choice(["Motor", "Compresor", "Caldera"]),
+        nominal_power_kw=rng.uniform(0, 200),
+        load_factor=rng.choice([None, 0.0, rng.uniform(0.2, 1.0)]),
+        power_factor=rng.choice([None, 0.0, rng.uniform(0.6, 1.0)]),
+        efficiency_percentage=rng.choice([None, rng.uniform(60, 98)]),
+        daily_usage_hours=rng.uniform(0, 24),
+        op_days_per_month=rng.choice([None, 0, rng.randint(10, 31)]),
+    )
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = make_session_factory(engine)  # con el listener de plant_summaries
+    rng = random.Random(7)
+    async with factory() as session:
+        for user_id in (1, 2):
+            session.add(User(id=user_id, username=f"planta{user_id}", email=f"p{user_id}@x.co", hashed_password="x"))
+            session.add_all(_random_asset(rng, user_id, i) for i in range(200))
+        session.add(User(id=3, username="vacia", email="v@x.co", hashed_password="x"))
+        session.add(IndustrialSettings(user_id=1, company_name="Planta 1", energy_cost_per_kwh=650.0, currency_code="COP"))
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_sql_aggregates_match_python_path(db):
+    for user_id in (1, 2):
+        settings = await db.scalar(select(IndustrialSettings).where(IndustrialSettings.user_id == user_id))
+        assets = (await db.execute(
+            select(IndustrialAsset).where(IndustrialAsset.user_id == user_id).order_by(IndustrialAsset.id)
+        )).scalars().all()
+
+        expected_metrics, expected_context = industrial_service.build_dashboard_metrics(assets, settings)
+        metrics, context = await industrial_service.compute_dashboard_metrics(db, user_id)
+
+        assert metrics == expected_metrics
+        assert context == expected_context
+        assert len(context["assets_top"]) == 5 and context["total_assets"] == 200
+
+
+@pytest.mark.asyncio
+async def test_plant_without_assets_gets_empty_state(db):
+    metrics, context = await industrial_service.compute_dashboard_metrics(db, 3)
+    assert context is None and metrics["top_waste_reason"] == "Sin Equipos"
+    assert await industrial_service.aggregate_plants(db, [3]) == {}
+
+
+@pytest.mark.asyncio
+async def test_plant_missing_from_projection_is_computed_from_assets(db):
+    expected, _ = await industrial_service.compute_dashboard_metrics(db, 2)
+    # Fila borrada por fuera de la sesión (o activos cargados sin la proyección)
+    await db.execute(delete(PlantSummary).where(PlantSummary.user_id == 2))
+    await db.commit()
+
+    metrics, context = await industrial_service.compute_dashboard_metrics(db, 2)
+    assert context["total_assets"] == 200
+    assert metrics == pytest.approx(expected)
@@ -0,0 +1,94 @@
+"""
+Tests del job nocturno de insights: mismo contexto que el dashboard y reanudación por checkpoint.
+"""
+import json
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import app.models  # noqa: F401 - registra todas las tablas en el metadata
+from app.db.base import Base
+from app.db.session import make_session_factory
+from app.models.industrial_asset import IndustrialAsset
+from app.models.industrial_settings import IndustrialSettings
+from app.models.user import User
+from app.services import insight_batch
+from app.services.industrial import industrial_service
+from app.services.insight_batch import InsightBatchJob
+from app.services.insight_store import insight_store
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = make_session_factory(engine)  # con el listener de plant_summaries
+
+    async with factory() as db:
+        for user_id in range(1, 6):
+            db.add(User(id=user_id, username=f"planta{user_id}", email=f"p{user_id}@x.co", hashed_password="x"))
+            db.add(IndustrialSettings(user_id=user_id, company_name=f"Planta {user_id}", energy_cost_per_kwh=650.0, currency_code="COP"))
+            for i in range(3):
+                db.add(IndustrialAsset(
+                    user_id=user_id, name=f"Motor {i}", asset_type="Motor", nominal_power_kw=10.0 * (i + 1),
+                    daily_usage_hours=8, efficiency_percentage=80.0 + i, location="Planta",
+                ))
+        await db.commit()
+
+    yield factory
+    await engine.dispose()
+
+
+@pytest.fixture
+def patched(monkeypatch, session_factory):
+    calls = []
+
+    async def fake_session():
+        async with session_factory() as db:
+            yield db
+
+    async def fake_insights(plant_data, user_id=None):
+        calls.append(plant_data["company"])
+        return {"waste_score": 10, "source": "ai"}
+
+    monkeypatch.setattr(insight_batch, "get_async_session", fake_session)
+    monkeypatch.setattr(insight_batch.gemini_service, "get_dashboard_insights", fake_insights)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_batch_stores_insights_with_dashboard_context_hash(patched, session_factory, tmp_path):
+    job = InsightBatchJob(chunk_size=2, concurrency=2, checkpoint_path=str(tmp_path / "ckpt.json"))
+    stats = await job.run(["industrial"])
+
+    assert stats["industrial_users"] == 5 and stats["industrial_ai"] == 5
+    assert not (tmp_path / "ckpt.json").exists()
+
+    async with session_factory() as db:
+        _, plant_data = await industrial_service.compute_dashboard_metrics(db, 3)
+        snapshot = await insight_store.get(db, 3, "industrial")
+        # El dashboard encuentra el insight del lote como fresco, sin volver a llamar a Gemini
+        assert not insight_store.is_stale(snapshot, insight_store.context_hash(plant_data))
+
+
+@pytest.mark.asyncio
+async def test_batch_resumes_after_last_checkpointed_user(patched, tmp_path):
+    checkpoint = tmp_path / "ckpt.json"
+    checkpoint.write_text(json.dumps({"last_user_id": {"industrial": 2}}))
+
+    job = InsightBatchJob(chunk_size=2, checkpoint_path=str(checkpoint))
+    await job.run(["industrial"])
+
+    assert sorted(patched) == ["Planta 3", "Planta 4", "Planta 5"]
+
+
+@pytest.mark.asyncio
+async def test_batch_skips_users_with_fresh_insights(patched, tmp_path):
+    await InsightBatchJob(checkpoint_path=str(tmp_path / "a.json")).run(["industrial"])
+    patched.clear()
+
+    stats = await InsightBatchJob(checkpoint_path=str(tmp_path / "b.json")).run(["industrial"])
+
+    assert patched == [] and stats["industrial_skipped_fresh"] == 5
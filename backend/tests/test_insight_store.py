@@ -0,0 +1,99 @@
+"""
+Tests de la política de frescura del InsightStore (stale-while-revalidate).
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registra todas las tablas en el metadata
+from app.db.base import Base
+from app.models.ai_insight import AIInsightSnapshot
+from app.models.user import User
+from app.services.insight_store import InsightStore
+
+
+def make_snapshot(context, age_seconds, source="ai"):
+    return AIInsightSnapshot(
+        user_id=1,
+        profile_type="industrial",
+        payload={},
+        context_hash=InsightStore.context_hash(context),
+        source=source,
+        generated_at=datetime.now(timezone.utc) - timedelta(seconds=age_seconds),
+    )
+
+
+def test_context_hash_ignores_key_order():
+    assert InsightStore.context_hash({"a": 1, "b": 2}) == InsightStore.context_hash({"b": 2, "a": 1})
+
+
+def test_fresh_snapshot_with_same_data_is_served_as_is():
+    store = InsightStore()
+    context = {"total_kwh": 100}
+    assert not store.is_stale(make_snapshot(context, 10), InsightStore.context_hash(context))
+
+
+def test_snapshot_older_than_window_is_stale():
+    store = InsightStore()
+    context = {"total_kwh": 100}
+    snapshot = make_snapshot(context, store.freshness_seconds + 1)
+    assert store.is_stale(snapshot, InsightStore.context_hash(context))
+
+
+def test_changed_data_makes_snapshot_stale():
+    store = InsightStore()
+    snapshot = make_snapshot({"total_kwh": 100}, 10)
+    assert store.is_stale(snapshot, InsightStore.context_hash({"total_kwh": 120}))
+
+
+def test_rule_based_snapshot_is_retried_sooner():
+    store = InsightStore()
+    context = {"total_kwh": 100}
+    snapshot = make_snapshot(context, store.fallback_retry_seconds + 1, source="rules")
+    assert store.is_stale(snapshot, InsightStore.context_hash(context))
+
+
+def test_naive_timestamps_from_sqlite_are_treated_as_utc():
+    store = InsightStore()
+    context = {"total_kwh": 100}
+    snapshot = make_snapshot(context, 10)
+    snapshot.generated_at = snapshot.generated_at.replace(tzinfo=None)
+    assert not store.is_stale(snapshot, InsightStore.context_hash(context))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_first_saves_upsert_one_row(tmp_path):
+    # Archivo (no :memory:) para que cada sesión tenga su propia conexión
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'insights.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as db:
+        db.add(User(id=1, username="planta", email="p@x.co", hashed_password="x"))
+        await db.commit()
+
+    store = InsightStore()
+    get = store.get
+
+    async def slow_get(*args):
+        snapshot = await get(*args)
+        await asyncio.sleep(0.05)  # las dos visitas leen "no existe" antes de escribir
+        return snapshot
+
+    store.get = slow_get
+
+    async def first_visit(text):
+        async with factory() as db:
+            await store.save(db, 1, "industrial", {"ai_interpretation": text}, "hash")
+
+    await asyncio.gather(first_visit("a"), first_visit("b"))
+    async with factory() as db:
+        assert await db.scalar(select(func.count(AIInsightSnapshot.id))) == 1
+        await store.save(db, 1, "industrial", {"ai_interpretation": "c", "source": "rules"}, "otro")
+        snapshot = await get(db, 1, "industrial")
+        assert snapshot.payload["ai_interpretation"] == "c" and snapshot.source == "rules"
+    await engine.dispose()
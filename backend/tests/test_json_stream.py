@@ -0,0 +1,60 @@
+"""
+Tests del parser incremental usado por el chat en streaming.
+"""
+import pytest
+
+from app.core.json_stream import JsonFieldStreamParser
+
+
+def feed_all(chunks):
+    parser = JsonFieldStreamParser("response")
+    deltas = [parser.feed(c) for c in chunks]
+    return parser, "".join(deltas)
+
+
+def test_value_is_emitted_before_object_closes():
+    parser = JsonFieldStreamParser("response")
+    assert parser.feed('{ "respo') == ""
+    assert parser.feed('nse": "Hola, ') == "Hola, "
+    assert parser.feed("revisa la nevera") == "revisa la nevera"
+    assert not parser.done
+    parser.feed('" }')
+    assert parser.done
+    assert parser.result() == {"response": "Hola, revisa la nevera"}
+
+
+@pytest.mark.parametrize("split", range(1, 12))
+def test_escapes_split_across_chunks(split):
+    raw = '{"response": "L\\u00ednea 1\\nL\\u00ednea \\"2\\""}'
+    parser, text = feed_all([raw[:split + 14], raw[split + 14:]])
+    assert text == 'Línea 1\nLínea "2"'
+    assert parser.done
+
+
+def test_surrogate_pair_split_between_chunks():
+    parser, text = feed_all(['{"response": "ok \\ud83d', '\\udca1"}'])
+    assert text == "ok 💡"
+
+
+@pytest.mark.parametrize("escape", ["\\uZZ12", "\\u+1a2", "\\u12 4"])
+def test_malformed_unicode_escape_is_emitted_raw(escape):
+    parser, text = feed_all(['{"response": "a ' + escape[:3], escape[3:] + ' b"}'])
+    assert text == "a " + escape + " b"
+    assert parser.done
+
+
+def test_markdown_fence_is_skipped():
+    parser, text = feed_all(["```json\n", '{"response": "Ahorra"}', "\n```"])
+    assert text == "Ahorra"
+
+
+def test_plain_text_reply_is_relayed():
+    parser, text = feed_all(["Claro, ", "tu nevera consume más."])
+    assert text == "Claro, tu nevera consume más."
+    assert parser.result() == {"response": "Claro, tu nevera consume más."}
+
+
+def test_object_without_field_falls_back_to_full_parse():
+    parser, text = feed_all(['{"answer": ', '"otro"}'])
+    assert text == ""
+    assert parser.result() == {"answer": "otro"}
@@ -0,0 +1,84 @@
+"""
+Tests del gobernador de llamadas salientes al LLM (concurrencia, rate limit y prioridades).
+"""
+import asyncio
+
+import pytest
+
+from app.core.llm_governor import GovernorTimeout, LLMGovernor, Priority
+
+
+def make_governor(**kwargs):
+    params = {
+        "max_concurrency": 1,
+        "rate_per_second": 1000.0,
+        "burst": 1000,
+        "max_wait": {Priority.INTERACTIVE: 1.0, Priority.DASHBOARD: 1.0, Priority.BACKGROUND: 1.0},
+    }
+    params.update(kwargs)
+    return LLMGovernor(**params)
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_by_priority_then_fifo():
+    governor = make_governor()
+    await governor.acquire(Priority.DASHBOARD)  # ocupa el único cupo
+    order = []
+
+    async def worker(name, priority):
+        async with governor.slot(priority):
+            order.append(name)
+
+    tasks = [
+        asyncio.create_task(worker("background", Priority.BACKGROUND)),
+        asyncio.create_task(worker("dashboard-1", Priority.DASHBOARD)),
+        asyncio.create_task(worker("chat", Priority.INTERACTIVE)),
+        asyncio.create_task(worker("dashboard-2", Priority.DASHBOARD)),
+    ]
+    await asyncio.sleep(0)
+    governor.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["chat", "dashboard-1", "dashboard-2", "background"]
+    assert governor.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_waiter_gives_up_after_class_max_wait():
+    governor = make_governor(max_wait={Priority.INTERACTIVE: 1.0, Priority.DASHBOARD: 0.01, Priority.BACKGROUND: 1.0})
+    await governor.acquire(Priority.INTERACTIVE)
+
+    with pytest.raises(GovernorTimeout):
+        await governor.acquire(Priority.DASHBOARD)
+
+    stats = governor.stats()["classes"]["dashboard"]
+    assert stats["timeouts"] == 1 and stats["queued"] == 0
+    governor.release()
+    # El cupo liberado no se entrega al llamador que ya se rindió
+    assert governor.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_call_rate():
+    governor = make_governor(max_concurrency=10, rate_per_second=50.0, burst=2)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for _ in range(5):
+        async with governor.slot(Priority.DASHBOARD):
+            pass
+    # 2 de ráfaga + 3 a 50/s: al menos ~60 ms
+    assert loop.time() - start >= 0.05
+    assert governor.stats()["classes"]["dashboard"]["admitted"] == 5
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    governor = make_governor()
+    await governor.acquire(Priority.INTERACTIVE)
+    waiter = asyncio.create_task(governor.acquire(Priority.BACKGROUND))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    governor.release()
+    assert governor.stats()["in_flight"] == 0
@@ -0,0 +1,128 @@
+"""
+Tests de las estadísticas de pares: precisión y merge del sketch, carga inicial y actualización incremental.
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registra todas las tablas en el metadata
+from app.core.quantile_sketch import LogHistogram
+from app.db.base import Base
+from app.models.residential import ConsumptionReading, ResidentialProfile
+from app.models.user import User
+from app.services.peer_stats import PeerStatistics
+
+
+def test_sketch_quantiles_are_within_relative_accuracy():
+    values = np.random.default_rng(3).lognormal(5, 0.6, 20_000)
+    sketch = LogHistogram(relative_accuracy=0.02)
+    sketch.add(values)
+    for q in (0.1, 0.25, 0.5, 0.75, 0.9):
+        exact = np.quantile(values, q, method="lower")
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+    assert sketch.rank(np.median(values)) == pytest.approx(0.5, abs=0.02)
+
+
+def test_sketch_merge_and_remove():
+    rng = np.random.default_rng(4)
+    a, b = rng.uniform(50, 400, 500), rng.uniform(100, 900, 300)
+    left, right, union = LogHistogram(), LogHistogram(), LogHistogram()
+    left.add(a)
+    right.add(b)
+    union.add(np.concatenate([a, b]))
+    assert np.array_equal(left.copy().merge(right).counts, union.counts)
+
+    union.remove(b)
+    assert np.array_equal(union.counts, left.counts)
+    assert LogHistogram().quantile(0.5) is None
+    with pytest.raises(ValueError):
+        left.merge(LogHistogram(relative_accuracy=0.05))
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        # 30 hogares de estrato 3 en Cali (100..390 kWh) y 5 de estrato 3 en Pasto
+        for user_id in range(1, 36):
+            city = "Cali" if user_id <= 30 else "Pasto"
+            session.add(User(id=user_id, username=f"h{user_id}", email=f"h{user_id}@x.co", hashed_password="x"))
+            session.add(ResidentialProfile(
+                user_id=user_id, stratum=3, city=city, occupants=2,
+                average_kwh_captured=90.0 + 10 * user_id if user_id <= 30 else None,
+            ))
+        session.add(ConsumptionReading(
+            user_id=31, reading_value=5.0, date=datetime(2024, 5, 1, tzinfo=timezone.utc)
+        ))
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_load_and_compare_with_scope_fallback(db):
+    stats = PeerStatistics(relative_accuracy=0.01, min_peers=20, refresh_seconds=3600)
+    assert await stats.load(db) == 31  # los hogares de Pasto sin lectura ni factura no aportan
+
+    cali = stats.compare(3, " cali ", 245.0, 2)
+    assert cali["scope"] == "stratum_city" and cali["peers"] == 30
+    assert cali["percentile_kwh"] == pytest.approx(50, abs=3)
+    assert cali["median_kwh"] == pytest.approx(240, rel=0.02)
+    assert cali["efficiency_percentile"] == pytest.approx(100 - cali["percentile_kwh_per_person"])
+
+    # Pasto tiene un solo hogar con datos: se compara contra todo el estrato
+    pasto = stats.compare(3, "Pasto", 150.0, 2)
+    assert pasto["scope"] == "stratum" and pasto["peers"] == 31
+    assert stats.member(31) == (150.0, 75.0)
+
+
+@pytest.mark.asyncio
+async def test_new_reading_replaces_household_contribution(db):
+    stats = PeerStatistics(relative_accuracy=0.01, min_peers=1, refresh_seconds=3600)
+    await stats.load(db)
+    before = stats.compare(3, "Pasto", 150.0, 2)["peers"]
+
+    db.add(ConsumptionReading(user_id=31, reading_value=20.0, date=datetime(2024, 6, 1, tzinfo=timezone.utc)))
+    db.add(ConsumptionReading(user_id=32, reading_value=8.0, date=datetime(2024, 6, 1, tzinfo=timezone.utc)))
+    await db.commit()
+    await stats.refresh_user(db, 31)
+    await stats.refresh_user(db, 32)
+
+    assert stats.member(31) == (600.0, 300.0)
+    pasto = stats.compare(3, "Pasto", 400.0, 2)
+    assert pasto["scope"] == "stratum_city" and pasto["peers"] == before + 1
+    assert stats.merged("kwh", [("city", "cali"), ("city", "pasto")]).count == 32
+
+
+@pytest.mark.asyncio
+async def test_background_load_keeps_updates_made_while_loading(db, monkeypatch):
+    stats = PeerStatistics(relative_accuracy=0.01, min_peers=1, refresh_seconds=0)
+    assert stats.compare(3, "Cali", 245.0, 2) is None  # sin carga inicial no hay pares
+    stream = db.stream
+
+    async def stale_stream(query):
+        # La carga recorre una foto tomada antes de que llegue una lectura nueva
+        rows = (await stream(query)).all()
+        db.add(ConsumptionReading(user_id=32, reading_value=8.0, date=datetime(2024, 6, 1, tzinfo=timezone.utc)))
+        await db.commit()
+        await stats.refresh_user(db, 32)
+
+        async def replay():
+            for row in await rows:
+                yield row
+        return replay()
+
+    async def sessions():
+        yield db
+
+    monkeypatch.setattr(db, "stream", stale_stream)
+    await stats.run(sessions)
+    assert stats.member(32) == (240.0, 120.0)
+    assert stats.stats()["households"] == 32
@@ -0,0 +1,119 @@
+"""
+Tests de la proyección plant_summaries: deltas en la misma transacción, reconstrucción y verificación.
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import app.models  # noqa: F401 - registra todas las tablas en el metadata
+from app.db.base import Base
+from app.db.session import AppSession, make_session_factory
+from app.models.industrial_asset import IndustrialAsset
+from app.models.plant_summary import PlantSummary
+from app.models.user import User
+from app.services.plant_summary import PLANT_TOTAL, plant_summary
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = make_session_factory(engine)  # con el listener de plant_summaries
+    async with factory() as session:
+        session.add_all([
+            User(id=1, username="planta", email="p@x.co", hashed_password="x"),
+            User(id=2, username="otra", email="o@x.co", hashed_password="x"),
+        ])
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+def _motor(name, location, kw=10.0, **extra):
+    return IndustrialAsset(
+        user_id=1, name=name, asset_type="Motor", nominal_power_kw=kw, daily_usage_hours=8,
+        location=location, **extra,
+    )
+
+
+async def _rows(db):
+    result = await db.execute(
+        select(PlantSummary).order_by(PlantSummary.user_id, PlantSummary.zone).execution_options(populate_existing=True)
+    )
+    return {(r.user_id, r.zone): r for r in result.scalars()}
+
+
+@pytest.mark.asyncio
+async def test_insert_update_delete_keep_projection_consistent(db):
+    a, b, c = _motor("A", "Molinos"), _motor("B", "Molinos", power_factor=0.7), _motor("C", None, kw=40.0)
+    db.add_all([a, b, c])
+    await db.commit()
+
+    rows = await _rows(db)
+    assert set(rows) == {(1, PLANT_TOTAL), (1, "Molinos"), (1, "General")}
+    assert rows[(1, PLANT_TOTAL)].asset_count == 3 and rows[(1, "Molinos")].asset_count == 2
+    assert await plant_summary.check(db) == []
+
+    # Edición que cambia de zona y de física, y un borrado
+    b.location, b.nominal_power_kw = "Calderas", 25.0
+    await db.delete(c)
+    await db.commit()
+
+    rows = await _rows(db)
+    assert set(rows) == {(1, PLANT_TOTAL), (1, "Molinos"), (1, "Calderas")}  # "General" quedó vacía
+    assert rows[(1, PLANT_TOTAL)].asset_count == 2
+    assert await plant_summary.check(db) == []
+
+    # Cambiar solo el nombre no altera la proyección
+    a.name = "A renombrado"
+    await db.commit()
+    assert await plant_summary.check(db) == []
+
+
+@pytest.mark.asyncio
+async def test_rollback_discards_deltas(db):
+    db.add(_motor("A", "Molinos"))
+    await db.flush()
+    assert (await _rows(db))[(1, PLANT_TOTAL)].asset_count == 1
+    await db.rollback()
+    assert await _rows(db) == {}
+
+
+@pytest.mark.asyncio
+async def test_bulk_writes_are_detected_and_fixed_by_rebuild(db):
+    db.add(_motor("A", "Molinos"))
+    await db.commit()
+    # insert() masivo: no pasa por la sesión ORM
+    await db.execute(insert(IndustrialAsset), [
+        {"user_id": 2, "name": f"M{i}", "asset_type": "Motor", "nominal_power_kw": 5.0, "daily_usage_hours": 4}
+        for i in range(3)
+    ])
+    await db.commit()
+
+    mismatches = await plant_summary.check(db)
+    assert {(m["user_id"], m["zone"]) for m in mismatches} == {(2, PLANT_TOTAL), (2, "General")}
+
+    assert await plant_summary.rebuild(db, [2]) == 2
+    assert await plant_summary.check(db) == []
+    assert (await plant_summary.plant_totals(db, [1, 2]))[2].asset_count == 3
+
+
+@pytest.mark.asyncio
+async def test_rebuild_query_groups_on_user_location_index(db):
+    sql = str(plant_summary.aggregate_query([1]).compile(compile_kwargs={"literal_binds": True}))
+    plan = " ".join(str(row) for row in (await db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all())
+    assert "ix_industrial_assets_user_id_location" in plan
+
+
+@pytest.mark.asyncio
+async def test_listener_is_scoped_to_app_sessions(db):
+    # Una sesión que no sale de make_session_factory no mantiene la proyección
+    async with AsyncSession(db.bind) as other:
+        other.add(_motor("Fuera", "Molinos"))
+        await other.commit()
+    assert await _rows(db) == {}
+
+    with pytest.raises(ValueError, match="mssql"):
+        plant_summary.register(AppSession, "mssql")
@@ -0,0 +1,52 @@
+"""
+Tests del constructor de prompts con presupuesto de tokens para plantas grandes.
+"""
+from types import SimpleNamespace
+
+from app.services.industrial import IndustrialService
+from app.services.prompt_builder import PlantPromptBuilder, compact_json
+
+
+def make_asset(i, asset_type="Motor", location="Planta 1", efficiency=85.0, power=10.0):
+    return SimpleNamespace(
+        name=f"A{i}", asset_type=asset_type, location=location, nominal_power_kw=power,
+        efficiency_percentage=efficiency, load_factor=0.75, power_factor=0.95,
+        daily_usage_hours=8.0, op_days_per_month=22,
+    )
+
+
+def test_groups_aggregate_by_type_and_location():
+    assets = [make_asset(1), make_asset(2), make_asset(3, asset_type="Bomba", location="Bodega")]
+    context = PlantPromptBuilder(token_budget=10_000, top_n=10).build_plant_context(assets)
+
+    rows = {(r[0], r[1]): r for r in context["by_type_location"]["rows"]}
+    motor = rows[("Motor", "Planta 1")]
+    expected_kwh = IndustrialService.calculate_asset_consumption(assets[0])["monthly_kwh"] * 2
+    assert motor[2] == 2
+    assert motor[4] == round(expected_kwh)
+    assert context["total_assets"] == 3
+
+
+def test_top_assets_are_the_largest_waste_contributors():
+    assets = [make_asset(i, efficiency=95.0) for i in range(50)]
+    assets.append(make_asset(99, efficiency=50.0, power=200.0))
+    context = PlantPromptBuilder(token_budget=10_000, top_n=5).build_plant_context(assets)
+
+    top = context["top_waste_assets"]["rows"]
+    assert len(top) == 5
+    assert top[0][0] == "A99"
+    assert [r[5] for r in top] == sorted((r[5] for r in top), reverse=True)
+
+
+def test_large_inventory_stays_within_token_budget():
+    assets = [
+        make_asset(i, asset_type=f"Tipo{i % 40}", location=f"Zona{i % 25}", efficiency=60 + i % 35)
+        for i in range(5000)
+    ]
+    builder = PlantPromptBuilder(token_budget=800, top_n=50)
+    context = builder.build_plant_context(assets)
+
+    assert builder.estimate_tokens(compact_json(context)) <= 800
+    # Los totales se conservan aunque se recorte el detalle
+    assert context["total_assets"] == 5000
+    assert sum(r[2] for r in context["by_type_location"]["rows"]) == 5000
@@ -3,6 +3,7 @@ from httpx import AsyncClient
 from app.db.base import Base
 from app.db.session import get_async_engine
 import app.db.session
+from app.services.insight_store import insight_store
 
 @pytest.fixture(scope="function", autouse=True)
 async def prepare_db():
@@ -14,6 +15,8 @@ async def prepare_db():
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
     yield
+    # Let background insight writes finish before the engine goes away
+    await insight_store.drain()
     # Dispose of the engine and reset it again for the next test
     await engine.dispose()
     app.db.session._engine = None
@@ -88,6 +91,22 @@ async def test_consumption_readings(async_client: AsyncClient):
     history = response.json()
     assert len(history) == 1
     assert history[0]["reading_value"] == 150.5
+    # Sin perfil se valora con la tarifa vigente del estrato 3
+    assert history[0]["tariff_kwh"] == 657.80
+    assert history[0]["cost_cop"] == round(150.5 * 657.80)
+    assert history[0]["co2_kg"] == round(150.5 * 0.164, 2)
+
+def test_bill_readings_returns_schemas_without_touching_orm_rows():
+    from datetime import datetime, timezone
+    from app.models.residential import ConsumptionReading
+    from app.services.residential import residential_service
+
+    reading = ConsumptionReading(
+        id=1, user_id=1, reading_value=10.0, reading_type="manual", date=datetime(2024, 6, 1, tzinfo=timezone.utc)
+    )
+    [billed] = residential_service.bill_readings([reading], 4)
+    assert billed.tariff_kwh == 773.88 and billed.cost_cop == round(10.0 * 773.88)
+    assert not hasattr(reading, "tariff_kwh") and not hasattr(reading, "cost_cop")
 
 @pytest.mark.asyncio
 async def test_dashboard_insights(async_client: AsyncClient):
@@ -100,3 +119,11 @@ async def test_dashboard_insights(async_client: AsyncClient):
     assert "vampire_cost_monthly" in data
     assert "ai_advice" in data
     assert "missions" in data
+
+@pytest.mark.asyncio
+async def test_standby_estimate(async_client: AsyncClient):
+    response = await async_client.get("/api/v1/residential/standby")
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"standby_kwh_monthly", "standby_cost_monthly", "kwh_price"}
+    assert data["standby_cost_monthly"] == round(data["standby_kwh_monthly"] * data["kwh_price"])
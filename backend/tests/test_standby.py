@@ -0,0 +1,63 @@
+"""
+Tests del modelo standby: la tabla en memoria y el GROUP BY en SQL dan lo mismo; caché por hogar.
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registra todas las tablas en el metadata
+from app.core.energy_logic import EnergyCalculators
+from app.db.base import Base
+from app.models.residential import ResidentialAsset
+from app.models.user import User
+from app.services.standby import StandbyModel
+
+HOMES = {
+    1: [("tv", True), ("tv", False), ("fridge", True), ("ac", False), ("washer", True)],
+    2: [("console", None), ("desktop", True), ("ac", True), ("fridge", False)],
+    3: [("lamp", False)],
+}
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        for user_id, assets in HOMES.items():
+            session.add(User(id=user_id, username=f"hogar{user_id}", email=f"h{user_id}@x.co", hashed_password="x"))
+            for icon, high in assets:
+                session.add(ResidentialAsset(user_id=user_id, name=icon, icon=icon, is_high_impact=high))
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_sql_group_by_matches_in_memory_table(db):
+    model = StandbyModel(max_entries=10, ttl_seconds=60)
+
+    totals = await model.kwh_by_user(db)
+
+    for user_id, assets in HOMES.items():
+        rows = [ResidentialAsset(icon=icon, is_high_impact=high) for icon, high in assets]
+        assert totals.get(user_id, 0.0) == pytest.approx(EnergyCalculators.get_vampire_estimate(rows))
+    assert totals[1] == pytest.approx(2.5 + 0.7 + 8.0)
+
+
+@pytest.mark.asyncio
+async def test_user_result_is_cached_until_invalidated(db):
+    model = StandbyModel(max_entries=10, ttl_seconds=60)
+    assert await model.get_user_kwh(db, 4) == 0.0  # sin equipos
+
+    first = await model.get_user_kwh(db, 2)
+    db.add(ResidentialAsset(user_id=2, name="TV", icon="tv", is_high_impact=True))
+    await db.commit()
+    assert await model.get_user_kwh(db, 2) == first
+
+    model.invalidate(2)
+    assert await model.get_user_kwh(db, 2) == pytest.approx(first + 2.5)
+    assert model.stats() == {"entries": 2, "hits": 1, "misses": 3}
@@ -0,0 +1,101 @@
+"""
+Tests del motor de tarifas versionadas: vigencia por fecha local, franjas horarias y pasada vectorizada.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.core.energy_logic import EnergyCalculators
+from app.core.tariffs import TariffEngine, TariffError
+
+BASE_2024 = {str(s): 100.0 * s for s in range(1, 7)}
+BASE_2025 = {str(s): 110.0 * s for s in range(1, 7)}
+
+SCHEDULES = {
+    "default_operator": "demo",
+    "operators": {
+        "demo": {
+            "utc_offset_hours": -5,
+            "default_stratum": 3,
+            "versions": [
+                # Desordenadas a propósito: el motor las ordena por vigencia
+                {
+                    "effective_from": "2025-01-01",
+                    "bands": {"base": BASE_2025, "punta": {"4": 600.0}},
+                    "hours": {"punta": [18, 19, 20]},
+                    "subsidy": {"1": -0.5, "3": -0.1, "6": 0.2},
+                },
+                {"effective_from": "2024-01-01", "bands": {"base": BASE_2024}, "subsidy": {"1": -0.6}},
+            ],
+        }
+    },
+}
+
+
+@pytest.fixture
+def engine():
+    return TariffEngine(SCHEDULES)
+
+
+def test_version_switches_on_local_effective_date(engine):
+    # 2025-01-01 04:59 UTC es todavía 31 de diciembre en Colombia (UTC-5)
+    before = datetime(2025, 1, 1, 4, 59, tzinfo=timezone.utc)
+    after = datetime(2025, 1, 1, 5, 0, tzinfo=timezone.utc)
+    assert engine.price(2, before) == 200.0
+    assert engine.price(2, after) == 220.0
+    # Fechas anteriores a la primera versión usan la primera
+    assert engine.price(2, date(2020, 5, 1)) == 200.0
+
+
+def test_time_of_use_band_falls_back_to_base_price(engine):
+    peak = datetime(2025, 3, 3, 19, 30, tzinfo=timezone(timedelta(hours=-5)))
+    assert engine.price(4, peak) == 600.0
+    assert engine.price(5, peak) == 550.0  # la franja punta no fija precio para el estrato 5
+    assert engine.price(4, peak + timedelta(hours=2)) == 440.0
+
+
+def test_unknown_stratum_uses_default_stratum(engine):
+    assert engine.price(0, date(2024, 6, 1)) == engine.price(3, date(2024, 6, 1)) == 300.0
+    assert engine.price(9, date(2024, 6, 1)) == 300.0
+
+
+def test_subsidy_follows_the_version_in_force(engine):
+    strata = [1, 3, 4, 6, 0]
+    assert engine.subsidies(strata, [date(2024, 6, 1)]).tolist() == [-0.6, 0.0, 0.0, 0.0, 0.0]
+    # Los estratos sin entrada son tarifa plena; el desconocido usa el estrato por defecto
+    assert engine.subsidies(strata, [date(2025, 6, 1)]).tolist() == [-0.5, -0.1, 0.0, 0.2, -0.1]
+
+
+def test_vectorized_bill_matches_scalar_lookups(engine):
+    rng = np.random.default_rng(7)
+    start = np.datetime64("2023-11-01T00:00:00")
+    timestamps = start + rng.integers(0, 600 * 24 * 3600, 1000).astype("timedelta64[s]")
+    strata = rng.integers(0, 8, 1000)
+    kwh = rng.uniform(0, 20, 1000)
+
+    costs = engine.bill(kwh, strata, timestamps)
+
+    expected = [
+        k * engine.price(int(s), t.astype(datetime)) for k, s, t in zip(kwh, strata, timestamps, strict=True)
+    ]
+    np.testing.assert_allclose(costs, expected)
+
+
+def test_bundled_schedule_matches_current_calculator_prices():
+    engine = TariffEngine.from_file()
+    today = datetime.now(timezone.utc)
+    for stratum in range(0, 8):
+        assert engine.price(stratum, today) == EnergyCalculators.get_kwh_price(stratum)
+    for stratum in range(1, 7):
+        assert engine.subsidies(stratum, [today])[0] == EnergyCalculators.get_stratum_subsidy(stratum)
+
+
+def test_inconsistent_schedules_are_rejected():
+    broken = {"default_operator": "x", "operators": {"x": {"versions": [
+        {"effective_from": "2024-01-01", "bands": {"base": {"1": 1.0}}}
+    ]}}}
+    with pytest.raises(TariffError):
+        TariffEngine(broken)
+    with pytest.raises(TariffError):
+        TariffEngine(SCHEDULES).operator("otro")
@@ -0,0 +1,138 @@
+"""
+Tests del ledger de uso del LLM: escritura por lotes, cuotas diarias y reporte agregado.
+"""
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 - registra todas las tablas en el metadata
+from app.db.base import Base
+from app.models.llm_usage import LLMUsageEvent
+from app.services import usage_ledger as module
+from app.services.usage_ledger import UsageLedger
+
+
+@pytest_asyncio.fixture
+async def session_factory(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def fake_session():
+        async with factory() as db:
+            yield db
+
+    monkeypatch.setattr(module, "get_async_session", fake_session)
+    yield factory
+    await engine.dispose()
+
+
+def record(ledger, user_id, outcome="ok", endpoint="chat"):
+    ledger.record(
+        user_id=user_id, endpoint=endpoint, model="gemini", outcome=outcome,
+        prompt="x" * 400, response="y" * 40, latency_seconds=0.5,
+    )
+
+
+@pytest.mark.asyncio
+async def test_events_are_buffered_and_written_in_batches(session_factory):
+    ledger = UsageLedger(batch_size=3, flush_seconds=60)
+    for _ in range(2):
+        record(ledger, 1)
+
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count(LLMUsageEvent.id))) == 0
+
+    await ledger.flush()
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count(LLMUsageEvent.id))) == 2
+
+
+@pytest.mark.asyncio
+async def test_explicit_flush_waits_for_a_deferred_flush_in_progress(session_factory, monkeypatch):
+    ledger = UsageLedger(batch_size=1, flush_seconds=60)
+    inserting, release = asyncio.Event(), asyncio.Event()
+
+    async def blocked_session():
+        async with session_factory() as db:
+            execute = db.execute
+
+            async def slow_execute(*args, **kwargs):
+                inserting.set()
+                await release.wait()
+                return await execute(*args, **kwargs)
+
+            db.execute = slow_execute
+            yield db
+
+    monkeypatch.setattr(module, "get_async_session", blocked_session)
+    record(ledger, 1)  # lote lleno: el flush diferido arranca de inmediato
+    await asyncio.wait_for(inserting.wait(), 1)
+    record(ledger, 1)  # queda en el buffer mientras el primer lote se escribe
+
+    explicit = asyncio.create_task(ledger.flush())
+    await asyncio.sleep(0.01)
+    assert not explicit.done()  # espera el lote en vuelo en vez de cancelarlo
+    release.set()
+    await asyncio.wait_for(explicit, 1)
+
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count(LLMUsageEvent.id))) == 2
+    assert ledger.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_daily_request_quota_counts_persisted_and_new_calls(session_factory):
+    ledger = UsageLedger(batch_size=10, flush_seconds=60, daily_request_quota=3, daily_token_quota=0)
+    record(ledger, 1)
+    record(ledger, 1, outcome="cached")  # no llega al proveedor: no consume cuota
+    await ledger.flush()
+
+    # Un proceso nuevo siembra sus contadores desde el ledger
+    fresh = UsageLedger(batch_size=10, flush_seconds=60, daily_request_quota=3, daily_token_quota=0)
+    assert not await fresh.is_over_quota(1)
+    record(fresh, 1)
+    assert not await fresh.is_over_quota(1)
+    record(fresh, 1, outcome="error")
+    assert await fresh.is_over_quota(1)
+    assert not await fresh.is_over_quota(2)
+    await fresh.flush()
+
+
+@pytest.mark.asyncio
+async def test_report_aggregates_by_user_and_endpoint(session_factory):
+    ledger = UsageLedger(batch_size=10, flush_seconds=60)
+    record(ledger, 1)
+    record(ledger, 1, outcome="error")
+    record(ledger, 1, outcome="quota", endpoint="industrial_insights")
+    record(ledger, 1, outcome="coalesced")  # esperó la llamada de otro: sin tokens ni cuota
+    record(ledger, 2)
+
+    async with session_factory() as db:
+        rows = await ledger.report(db, days=1)
+        own = await ledger.report(db, days=1, user_id=2)
+
+    chat = next(r for r in rows if r["user_id"] == 1 and r["endpoint"] == "chat")
+    assert chat["calls"] == 3 and chat["provider_calls"] == 2 and chat["errors"] == 1 and chat["coalesced"] == 1
+    assert chat["prompt_tokens"] == 200 and chat["avg_latency_ms"] == 500.0
+    insights = next(r for r in rows if r["endpoint"] == "industrial_insights")
+    assert insights["fallbacks"] == 1 and insights["provider_calls"] == 0
+    assert [r["user_id"] for r in own] == [2]
+
+
+@pytest.mark.asyncio
+async def test_flush_leaves_no_deferred_task_behind(session_factory):
+    ledger = UsageLedger(batch_size=10, flush_seconds=60)
+    record(ledger, 1)  # programa un flush diferido que duerme 60 s
+    deferred = ledger._flush_task
+    assert not deferred.done()
+
+    await ledger.flush()
+    assert deferred.done()  # cancelado y terminado: nada pendiente al cerrar el loop
+    async with session_factory() as db:
+        assert await db.scalar(select(func.count(LLMUsageEvent.id))) == 1
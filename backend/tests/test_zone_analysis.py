@@ -0,0 +1,74 @@
+"""
+Tests del análisis por zonas: lectura de la proyección por zona y caché por planta.
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import app.models  # noqa: F401 - registra todas las tablas en el metadata
+from app.db.base import Base
+from app.db.session import make_session_factory
+from app.models.industrial_asset import IndustrialAsset
+from app.models.user import User
+from app.services.industrial import IndustrialService
+from app.services.zone_analysis import ZoneAnalysis
+
+ASSETS = [
+    # (ubicación, kW, eficiencia)
+    ("Molinos", 50.0, 92.0),
+    ("Molinos", 20.0, 80.0),
+    ("Calderas", 100.0, 70.0),
+    (None, 10.0, 88.0),
+    ("General", 5.0, 90.0),
+]
+
+
+@pytest_asyncio.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = make_session_factory(engine)  # con el listener de plant_summaries
+    async with factory() as session:
+        for user_id in (1, 2):
+            session.add(User(id=user_id, username=f"planta{user_id}", email=f"p{user_id}@x.co", hashed_password="x"))
+        for location, kw, eff in ASSETS:
+            session.add(IndustrialAsset(
+                user_id=1, name=f"{location} {kw}", asset_type="Motor", nominal_power_kw=kw,
+                daily_usage_hours=10, efficiency_percentage=eff, location=location,
+            ))
+        session.add(IndustrialAsset(user_id=2, name="Otra", asset_type="Motor", nominal_power_kw=1.0, daily_usage_hours=1))
+        await session.commit()
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_zones_match_per_asset_physics(db):
+    zones = {z["name"]: z for z in await ZoneAnalysis().compute(db, 1)}
+
+    assert set(zones) == {"Molinos", "Calderas", "General"}
+    assert zones["General"]["machines"] == 2  # sin ubicación + "General"
+
+    molinos = [IndustrialAsset(nominal_power_kw=kw, daily_usage_hours=10, efficiency_percentage=eff)
+               for loc, kw, eff in ASSETS if loc == "Molinos"]
+    kwh = [IndustrialService.calculate_asset_consumption(a)["monthly_kwh"] for a in molinos]
+    assert zones["Molinos"]["consumption"] == round(sum(kwh))
+    assert zones["Molinos"]["efficiency"] == round((92.0 * kwh[0] + 80.0 * kwh[1]) / sum(kwh), 1)
+    assert zones["Calderas"]["status"] == "critical" and zones["Molinos"]["status"] == "optimal"
+    assert await ZoneAnalysis().compute(db, 3) == []
+
+
+@pytest.mark.asyncio
+async def test_zones_are_cached_until_invalidated(db):
+    analysis = ZoneAnalysis(max_entries=10, ttl_seconds=60)
+    first = await analysis.get_user_zones(db, 1)
+
+    db.add(IndustrialAsset(user_id=1, name="Nuevo", asset_type="Motor", nominal_power_kw=30.0,
+                           daily_usage_hours=5, location="Empaque"))
+    await db.commit()
+    assert await analysis.get_user_zones(db, 1) == first
+
+    analysis.invalidate(1)
+    assert "Empaque" in {z["name"] for z in await analysis.get_user_zones(db, 1)}
+    assert analysis.stats() == {"entries": 1, "hits": 1, "misses": 2}